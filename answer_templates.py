@@ -0,0 +1,208 @@
+import os
+import re
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from schema import COLUMN_DEFINITIONS
+from sql_ast import parse_select
+
+# ------------------- Template Answer Configuration -------------------
+# Set FAST_ANSWERS=0 to always ask the LLM to write the answer
+FAST_ANSWERS = os.getenv("FAST_ANSWERS", "1") != "0"
+
+# Columns holding dollar amounts, formatted as currency
+CURRENCY_COLUMNS = [name for name, description in COLUMN_DEFINITIONS.items() if description.endswith("Dollar")]
+
+# Fields of the prescribed contract-details list format, in display order
+LIST_FIELDS = ["recipient_name", "recipient_uei", "naics", "naics_description", "awarding_agency_name"]
+
+# Records shown in a list answer
+LIST_PREVIEW_ROWS = 5
+
+# Questions asking to see records rather than a figure
+LIST_REQUEST_PATTERN = re.compile(r"\b(list|show|display|give|details?|name|which|what are)\b", re.IGNORECASE)
+
+# Entity nouns used in template answers, checked in order against the question
+ENTITY_NOUNS = [
+    (r"task orders?", "task orders"),
+    (r"contractors?|recipients?|vendors?|compan(?:y|ies)", "contractors"),
+    (r"contracts?", "contracts"),
+    (r"awards?", "awards"),
+    (r"agenc(?:y|ies)", "agencies"),
+]
+
+# Wording for single-value aggregates
+AGGREGATE_WORDS = {"sum": "total", "avg": "average", "max": "highest", "min": "lowest"}
+
+# A projection that is one aggregate call over a column or *, optionally aliased; anything
+# computed from it (ratios, differences, FILTER clauses, casts) is left to the LLM
+_BARE_AGGREGATE = re.compile(r"(count|sum|avg|max|min)\s*\(\s*(?:distinct\s+)?(\*|1|(?:[a-z_][a-z0-9_]*\.)?"
+                             r"\"?([a-z_][a-z0-9_]*)\"?)\s*\)(?:\s+(?:as\s+)?\"?[a-z_][a-z0-9_]*\"?)?",
+                             re.IGNORECASE)
+
+
+def results_footer(record_count: int) -> str:
+    """Returns the closing sentence the answer prompt prescribes for a record count."""
+    if record_count == 0:
+        return "No results to display."
+    if record_count <= 20:
+        return "Full results can be viewed in the table below."
+    return "Full results can be viewed in the table below or downloaded as a CSV."
+
+
+def format_value(value, currency: bool = False) -> str:
+    """Formats a value with thousands separators, and as dollars when currency is True."""
+    if isinstance(value, (bool, np.bool_)) or value is None or (not isinstance(value, str) and pd.isna(value)):
+        return str(value)
+    if isinstance(value, (int, float, Decimal, np.number)):
+        if currency:
+            return f"${float(value):,.2f}"
+        if float(value).is_integer():
+            return f"{int(value):,}"
+        return f"{float(value):,.2f}"
+    return str(value)
+
+
+def format_code(value) -> str:
+    """Formats an identifier such as a NAICS code, dropping any trailing .0 from float storage."""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def entity_noun(question: str) -> str:
+    """Picks the plural noun for what the question is about, e.g. "contracts" or "awards"."""
+    for pattern, noun in ENTITY_NOUNS:
+        if re.search(rf"\b(?:{pattern})\b", question, re.IGNORECASE):
+            return noun
+    return "records"
+
+
+def counted(count: int, noun: str) -> str:
+    """Returns e.g. "1 contract" or "1,234 contracts"."""
+    if count == 1:
+        noun = "agency" if noun == "agencies" else noun[:-1]
+    return f"{format_value(count)} {noun}"
+
+
+def bare_aggregate(sql_query: str):
+    """
+    Returns (function, column) when the query selects exactly one bare
+    aggregate call, e.g. ("sum", "total_obligation") or ("count", None) for
+    COUNT(*); None for any other projection.
+    """
+    query = parse_select(sql_query)
+    if query is None or len(query.columns) != 1:
+        return None
+    match = _BARE_AGGREGATE.fullmatch(query.columns[0].strip())
+    if match is None:
+        return None
+    return match.group(1).lower(), match.group(3).lower() if match.group(3) else None
+
+
+def _scalar_answer(question: str, sql_query: str, value) -> str:
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, Decimal, np.number)) or pd.isna(value):
+        return None
+    selected = bare_aggregate(sql_query)
+    if selected is None:
+        return None
+    aggregate, argument = selected
+
+    if aggregate == "count":
+        verb = "is" if value == 1 else "are"
+        return f"There {verb} {counted(value, entity_noun(question))}."
+    currency_column = argument if argument in CURRENCY_COLUMNS else None
+    if currency_column and aggregate in AGGREGATE_WORDS:
+        label = currency_column.replace("_", " ")
+        word = AGGREGATE_WORDS[aggregate]
+        subject = label if label.startswith(word) else f"{word} {label}"
+        return f"The {subject} is {format_value(value, currency=True)}."
+    return None
+
+
+def column_label(column: str) -> str:
+    """Returns a column's display label, e.g. "Total Obligation" for total_obligation."""
+    return column.replace("_", " ").title().replace("Uei", "UEI").replace("Naics", "NAICS")
+
+
+def format_field(column: str, value) -> str:
+    """Formats a result value by its column: dollars, codes and identifiers, or plain numbers."""
+    if column in CURRENCY_COLUMNS:
+        return format_value(value, currency=True)
+    if column == "naics" or column.endswith(("_code", "_id", "uei", "piid")):
+        return format_code(value)
+    return format_value(value)
+
+
+def _found_line(noun: str, total: int, shown: int) -> str:
+    return (f"Found {counted(total, noun)}. Here are the first {shown}:" if total > shown
+            else f"Found {counted(total, noun)}:")
+
+
+def _list_answer(noun: str, df: pd.DataFrame, total: int) -> str:
+    rows = df.head(LIST_PREVIEW_ROWS)
+    lines = [_found_line(noun, total, len(rows))]
+    for number, record in enumerate(rows.itertuples(index=False), start=1):
+        record = record._asdict()
+        lines.append(f"{number}. Recipient: {record['recipient_name']}, UEI: {record['recipient_uei']}, "
+                     f"NAICS: {format_code(record['naics'])} - {record['naics_description']}, "
+                     f"Agency: {record['awarding_agency_name']}")
+    return "\n".join(lines)
+
+
+def _records_answer(noun: str, df: pd.DataFrame, total: int) -> str:
+    rows = df.head(LIST_PREVIEW_ROWS)
+    lines = [_found_line(noun, total, len(rows))]
+    for number, record in enumerate(rows.to_dict("records"), start=1):
+        fields = ", ".join(f"{column_label(str(column))}: {format_field(str(column), value)}"
+                           for column, value in record.items())
+        lines.append(f"{number}. {fields}")
+    return "\n".join(lines)
+
+
+def template_answer(user_query: str, sql_query: str, df: pd.DataFrame, total_count: int = None,
+                    followup_of: str = None, error: str = None):
+    """
+    Writes the answer without the LLM when the result has a shape whose
+    answer the prompt guidelines fully determine:
+    - no rows, or a query that failed
+    - a single bare count or dollar aggregate
+    - a list of records in the prescribed contract-details format
+    - any list of records when the question is a recognised follow-up
+    Anything else returns None, so the LLM is used.
+
+    Args:
+        user_query: Original natural language question
+        sql_query: SQL query that was executed
+        df: The result rows available (possibly only the first few)
+        total_count: Total rows in the result when df only holds a preview of it
+        followup_of: For a recognised follow-up (followups.py), the question whose
+            result it rewrote; its entities name the records listed
+        error: Why the query did not run or failed, when it did
+
+    Returns:
+        The answer text, or None when the shape needs the LLM
+    """
+    if not FAST_ANSWERS:
+        return None
+    total = len(df) if total_count is None else total_count
+    noun = entity_noun(user_query)
+    if noun == "records" and followup_of:
+        noun = entity_noun(followup_of)
+
+    if error:
+        # The empty frame says nothing about the data, so the zero-row wording does not apply
+        return f"The query could not be completed ({error}). Try rephrasing or narrowing the question."
+    if total == 0:
+        return (f"No {noun} match these criteria; the filters may be too narrow, "
+                f"or the names may be written differently in the data. {results_footer(0)}")
+
+    if total == 1 and df.shape == (1, 1):
+        answer = _scalar_answer(user_query, sql_query, df.iat[0, 0])
+        return f"{answer} {results_footer(1)}" if answer else None
+
+    if followup_of and set(df.columns) != set(LIST_FIELDS):
+        return f"{_records_answer(noun, df, total)}\n\n{results_footer(total)}"
+    if set(LIST_FIELDS) <= set(df.columns) and (followup_of or LIST_REQUEST_PATTERN.search(user_query)):
+        return f"{_list_answer(noun, df, total)}\n\n{results_footer(total)}"
+    return None
@@ -0,0 +1,228 @@
+import json
+import uuid
+import asyncio
+import logging
+from typing import Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from db import pool_metrics
+from schema import TABLE_NAME
+from paging import PAGE_SIZE
+from query_cache import get_sql_cache
+from result_cache import get_result_cache
+from instrumentation import render_prometheus
+from session_store import SESSION_STORE_CONFIG, get_session_store
+from single_flight import LLM_FLIGHTS, DB_FLIGHTS
+from entity_index import get_entity_index
+from partitions import get_partition_catalog
+from resources import registry, close_resources
+from export import FORMATS, EXPORT_FLIGHTS, ExportUnavailable, get_export_cache
+from pipeline import (ConversationSession, agenerate_sql_query, astream_query, guard_sql_query,
+                      execute_sql_page)
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Closes the LLM client and database pools when the server shuts down."""
+    yield
+    for closing in close_resources():
+        try:
+            await closing
+        except Exception as e:
+            logger.warning("Closing a resource failed: %s", e)
+
+app = FastAPI(title="GovSearch AI", description="Natural language queries over government contract data",
+              lifespan=lifespan)
+
+# ------------------- Session Management -------------------
+# Conversations live in the session store, so any worker process can serve
+# any session; a per-session lock serializes questions within one conversation
+# in this process while different sessions run concurrently
+session_store = get_session_store()
+session_locks = OrderedDict()
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    """Returns the lock serializing requests for a session in this process."""
+    lock = session_locks.get(session_id)
+    if lock is None:
+        lock = session_locks[session_id] = asyncio.Lock()
+    session_locks.move_to_end(session_id)
+    # Forget locks of the least recently used sessions once nobody holds them
+    while len(session_locks) > SESSION_STORE_CONFIG["max_sessions"]:
+        oldest_id, oldest_lock = next(iter(session_locks.items()))
+        if oldest_lock.locked():
+            break
+        session_locks.pop(oldest_id)
+    return lock
+
+async def load_session(session_id: str, create: bool = True) -> ConversationSession:
+    """
+    Loads a conversation from the session store.
+
+    Args:
+        session_id: The session identifier
+        create: Whether to start a new conversation instead of raising 404 when it is missing
+
+    Returns:
+        The ConversationSession for the identifier
+    """
+    session = await asyncio.to_thread(session_store.load, session_id, ConversationSession.from_state)
+    if session is None:
+        if not create:
+            raise HTTPException(status_code=404, detail="Unknown session")
+        session = ConversationSession(session_id)
+    return session
+
+async def save_session(session: ConversationSession):
+    """Writes a conversation back to the session store, trimmed to the per-session limits."""
+    await asyncio.to_thread(session_store.save, session.session_id, session.to_state())
+
+async def last_result(session_id: str) -> dict:
+    """Returns the session's last response, which the results endpoints re-read."""
+    session = await load_session(session_id, create=False)
+    response = session.last_response
+    if response is None:
+        raise HTTPException(status_code=404, detail="No results for this session")
+    if response["pool"] is None:
+        # The guard rejected the query, so there is nothing to re-run
+        raise HTTPException(status_code=409, detail="The last query was rejected by the query guard and not run")
+    return response
+
+# ------------------- Serialization -------------------
+def frame_to_json(df: pd.DataFrame) -> dict:
+    """Converts a DataFrame to {"columns": [...], "data": [[...], ...]} with JSON-safe values."""
+    return json.loads(df.to_json(orient="split", index=False, date_format="iso", default_handler=str))
+
+def response_to_json(session: ConversationSession, response: dict) -> dict:
+    """Converts a pipeline response into the JSON body returned to clients."""
+    body = {key: value for key, value in response.items() if key != "first_page"}
+    body["session_id"] = session.session_id
+    body["first_page"] = frame_to_json(response["first_page"])
+    body["page_size"] = PAGE_SIZE
+    return body
+
+class QueryRequest(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+
+# ------------------- Endpoints -------------------
+@app.post("/sql")
+async def generate_sql(request: QueryRequest):
+    """Generates SQL for a question and reports the cost guard's decision, without running it."""
+    session_id = request.session_id or uuid.uuid4().hex
+    async with session_lock(session_id):
+        session = await load_session(session_id)
+        session.start_request()
+        sql_query = await agenerate_sql_query(request.question, session)
+        decision = await asyncio.to_thread(guard_sql_query, sql_query, session)
+        info = dict(session.request_info)
+    return {"session_id": session_id, "sql_query": sql_query, "exec_sql": decision.sql_query,
+            "guard": {"action": decision.action, "reason": decision.reason},
+            "sql_cache_hit": info.get("sql_cache_hit", False)}
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    """Answers a question: generates and guards the SQL, fetches the first page and writes the answer."""
+    session_id = request.session_id or uuid.uuid4().hex
+    async with session_lock(session_id):
+        session = await load_session(session_id)
+        response = None
+        async for event in astream_query(request.question, session):
+            if event["event"] == "response":
+                response = event["response"]
+        await save_session(session)
+    return response_to_json(session, response)
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """
+    Same as /query, but streams newline-delimited JSON events: "response" with
+    the SQL and first page, "token" for each piece of the answer, then "done".
+    Failures are reported as an "error" event.
+    """
+    session_id = request.session_id or uuid.uuid4().hex
+
+    async def events():
+        async with session_lock(session_id):
+            try:
+                session = await load_session(session_id)
+                async for event in astream_query(request.question, session):
+                    if event["event"] == "response":
+                        event = {"event": "response", "response": response_to_json(session, event["response"])}
+                    yield json.dumps(event) + "\n"
+                await save_session(session)
+            except Exception as e:
+                logger.exception("Query failed")
+                yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/sessions/{session_id}/results")
+async def results_page(session_id: str, page: int = Query(0, ge=0)):
+    """Returns one zero-based page of the session's last result."""
+    response = await last_result(session_id)
+    # Pages are re-read through the result cache; the stored session keeps only the SQL
+    df_page, _ = await asyncio.to_thread(execute_sql_page, response["exec_sql"], None, page,
+                                         False, response["pool"])
+    return {"page": page, "page_size": PAGE_SIZE, "rows": frame_to_json(df_page)}
+
+@app.get("/sessions/{session_id}/results.{fmt}")
+async def results_export(session_id: str, fmt: str):
+    """
+    Returns the session's full last result as a CSV or Parquet file. The file
+    is written from a COPY stream on first request and reused until the table
+    changes, so repeated downloads do not re-run the query.
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown export format: {fmt}")
+    response = await last_result(session_id)
+    try:
+        exported = await asyncio.to_thread(get_export_cache().export, response["exec_sql"], fmt, response["pool"])
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = FORMATS[fmt]
+    return FileResponse(exported.path, media_type=media_type, filename=f"query_results.{extension}")
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forgets a conversation."""
+    await asyncio.to_thread(session_store.delete, session_id)
+    session_locks.pop(session_id, None)
+    return {"deleted": session_id}
+
+@app.get("/metrics")
+def metrics():
+    """Reports pool, cache, export, coalescing, entity index, partition, resource and session store usage."""
+    return {"pools": {name: pool_metrics(name) for name in ("default", "background") if pool_metrics(name)},
+            "sql_cache": get_sql_cache().stats(),
+            "result_cache": get_result_cache(TABLE_NAME).stats(),
+            "exports": get_export_cache().stats(),
+            "coalescing": {"llm": LLM_FLIGHTS.stats(), "db": DB_FLIGHTS.stats(), "export": EXPORT_FLIGHTS.stats()},
+            "entity_index": get_entity_index().stats(),
+            "partitions": get_partition_catalog().stats(),
+            "resources": registry.stats(),
+            "sessions": session_store.stats()}
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+def metrics_prometheus():
+    """Exports stage timings, database time, token counts, result sizes and cache hits for Prometheus."""
+    pools = {name: pool_metrics(name) for name in ("default", "background")}
+    store_stats = session_store.stats()
+    gauges = {
+        "govsearch_pool_connections": ("Pooled database connections by state",
+                                       {(("pool", name), ("state", state)): stats[state]
+                                        for name, stats in pools.items() if stats for state in ("in_use", "idle")}),
+        "govsearch_sessions": ("Conversations held in the session store", {(): store_stats["sessions"]}),
+        "govsearch_session_bytes": ("Serialized size of all stored conversations", {(): store_stats["bytes"]}),
+        "govsearch_in_flight_calls": ("LLM calls and queries currently running that others can join",
+                                      {(("layer", flights.name),): flights.stats()["in_flight"]
+                                       for flights in (LLM_FLIGHTS, DB_FLIGHTS)}),
+    }
+    return render_prometheus(gauges)
@@ -0,0 +1,500 @@
+import os
+import io
+import re
+import csv
+import json
+import time
+import random
+import hashlib
+import argparse
+import resource
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+# Point the pipeline at the benchmark database before db.py reads DB_*
+for _key in ("NAME", "USER", "PASSWORD", "HOST", "PORT"):
+    if os.getenv(f"BENCH_DB_{_key}"):
+        os.environ[f"DB_{_key}"] = os.environ[f"BENCH_DB_{_key}"]
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import pipeline
+from db import get_pool, pool_metrics
+from schema import TABLE_NAME, COLUMN_DEFINITIONS, SAMPLE_DATA
+from query_cache import get_sql_cache, normalize_question
+from result_cache import get_result_cache
+from instrumentation import start_trace
+from partitions import PARTITION_CONFIG, create_partitioned_table, fiscal_year, pruning_report, print_pruning_report
+from copy_fetch import FETCH_CONFIG, fetch_frame
+
+# ------------------- Benchmark Configuration -------------------
+BENCH_CONFIG = {
+    "rows": int(os.getenv("BENCH_ROWS", "10000")),
+    "sessions": int(os.getenv("BENCH_SESSIONS", "4")),
+    "rounds": int(os.getenv("BENCH_ROUNDS", "1")),
+    "recordings": os.getenv("BENCH_RECORDINGS", ".cache/llm_recordings.json"),
+    "baseline": os.getenv("BENCH_BASELINE", "benchmark_baseline.json"),
+    # Simulated model latency: delay before the first token and between tokens
+    "llm_latency_ms": float(os.getenv("BENCH_LLM_LATENCY_MS", "0")),
+    "llm_token_ms": float(os.getenv("BENCH_LLM_TOKEN_MS", "0")),
+    # Relative slowdown of a p50/p95/p99 latency that counts as a regression
+    "regression_threshold": float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.10")),
+}
+
+# Stages timed for every question, plus database time split into pool wait, execute and fetch
+STAGES = ["generate_sql", "execute_sql", "refine_answer", "total", "db_wait", "db_execute", "db_fetch"]
+
+# Marks the fixture table so the seeder never touches a real tm_awards table
+FIXTURE_COMMENT = "govsearch benchmark fixture"
+
+# ------------------- Question Corpus -------------------
+# Representative questions with the SQL the stub returns for them when no
+# recording exists. Each session asks them in order, so the follow-up
+# questions see the previous answer in their conversation.
+CORPUS = [
+    {"question": "How many contracts did the Department of Defense award?",
+     "sql": "SELECT COUNT(*) AS contract_count FROM tm_awards WHERE awarding_agency_name ILIKE '%Defense%'"},
+    {"question": "List those contracts",
+     "sql": "SELECT recipient_name, recipient_uei, naics, naics_description, awarding_agency_name FROM tm_awards "
+            "WHERE awarding_agency_name ILIKE '%Defense%'"},
+    {"question": "What is the total obligation by awarding agency?",
+     "sql": "SELECT awarding_agency_name, SUM(total_obligation) AS total_obligation FROM tm_awards "
+            "GROUP BY awarding_agency_name ORDER BY total_obligation DESC"},
+    {"question": "Who are the top 5 contractors by total obligation amount?",
+     "sql": "SELECT recipient_name, SUM(total_obligation) AS total_obligation FROM tm_awards "
+            "GROUP BY recipient_name ORDER BY total_obligation DESC LIMIT 5"},
+    {"question": "List all active task orders from the Department of Energy",
+     "sql": "SELECT recipient_name, recipient_uei, naics, naics_description, awarding_agency_name FROM tm_awards "
+            "WHERE active_task_order <> 0 AND awarding_agency_name ILIKE '%Energy%'"},
+    {"question": "How many contracts were signed in 2021?",
+     "sql": "SELECT COUNT(*) AS contract_count FROM tm_awards WHERE date_signed >= '2021-01-01' AND date_signed < '2022-01-01'"},
+    {"question": "What is the total value of contracts in California?",
+     "sql": "SELECT SUM(base_and_all_options) AS total_value FROM tm_awards WHERE state_name ILIKE 'California'"},
+    {"question": "Show details of the largest contract by value",
+     "sql": "SELECT * FROM tm_awards ORDER BY base_and_all_options DESC NULLS LAST LIMIT 1"},
+    {"question": "Which NAICS codes have the most awards?",
+     "sql": "SELECT naics, naics_description, COUNT(*) AS award_count FROM tm_awards "
+            "GROUP BY naics, naics_description ORDER BY award_count DESC LIMIT 10"},
+    {"question": "Show me all contracts worth more than $1 million",
+     "sql": "SELECT award_id, recipient_name, awarding_agency_name, base_and_all_options FROM tm_awards "
+            "WHERE base_and_all_options > 1000000"},
+]
+
+# ------------------- Record/Replay LLM Stub -------------------
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model that answers from recorded responses instead of calling Azure.
+
+    In "record" mode each prompt is sent to the wrapped model and the response
+    is saved under a key made of the pipeline stage and the question; in
+    "replay" mode the saved response is returned, falling back to the corpus
+    SQL and a templated answer so the benchmark runs with no recordings at all.
+    Optional delays simulate model latency and token streaming.
+    """
+    mode: str = "replay"
+    recordings: dict = {}
+    delegate: Any = None
+    latency_ms: float = 0.0
+    token_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    @staticmethod
+    def _recording_key(prompt: str) -> str:
+        # The SQL prompt ends with 'User Query: "..."'; the answer prompt starts with 'USER QUESTION: "..."'
+        if "User Query:" in prompt:
+            stage, match = "sql", re.search(r'User Query: "(.*?)"\s*\n', prompt, re.DOTALL)
+        else:
+            stage, match = "answer", re.search(r'USER QUESTION: "(.*?)"\s*\n', prompt, re.DOTALL)
+        question = normalize_question(match.group(1)) if match else hashlib.sha256(prompt.encode()).hexdigest()
+        return f"{stage}:{question}"
+
+    @staticmethod
+    def _fallback(key: str, prompt: str) -> str:
+        stage, question = key.split(":", 1)
+        if stage == "sql":
+            for item in CORPUS:
+                if normalize_question(item["question"]) == question:
+                    return item["sql"]
+            return f"SELECT COUNT(*) FROM {TABLE_NAME}"
+        match = re.search(r"TOTAL RECORD COUNT: (\d+)", prompt)
+        count = int(match.group(1)) if match else 0
+        if count == 0:
+            return "No records match this question. No results to display."
+        footer = ("Full results can be viewed in the table below." if count <= 20 else
+                  "Full results can be viewed in the table below or downloaded as a CSV.")
+        return f"There were {count:,} records found. {footer}"
+
+    def _respond(self, messages) -> str:
+        prompt = messages[-1].content
+        key = self._recording_key(prompt)
+        if self.mode == "record":
+            text = self.delegate.invoke(messages).content
+            self.recordings[key] = text
+            return text
+        return self.recordings.get(key) or self._fallback(key, prompt)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._respond(messages)
+        time.sleep((self.latency_ms + self.token_ms * len(text.split())) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self.latency_ms / 1000)
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            time.sleep(self.token_ms / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+def load_recordings(path: str) -> dict:
+    """Loads recorded LLM responses, or an empty dict if the file does not exist."""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def save_recordings(path: str, recordings: dict):
+    """Writes recorded LLM responses as JSON."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(recordings, f, indent=2, sort_keys=True)
+
+# ------------------- Synthetic Fixture -------------------
+def column_type(description: str) -> str:
+    """Maps the type suffix of a COLUMN_DEFINITIONS description to a PostgreSQL type."""
+    suffix = description.rsplit(". ", 1)[-1]
+    return {"NumberInt 32": "integer", "NumberInt 64": "bigint", "Dollar": "numeric(18, 2)",
+            "ISO Date": "date"}.get(suffix, "text")
+
+def synthetic_rows(rows: int, seed: int = 42):
+    """
+    Yields synthetic tm_awards rows built from SAMPLE_DATA. Text columns reuse
+    sample values; numbers and dates vary around the sample range; award IDs
+    are unique.
+
+    Args:
+        rows: Number of rows to generate
+        seed: Random seed, so the same fixture is generated every time
+    """
+    rng = random.Random(seed)
+    columns = list(COLUMN_DEFINITIONS)
+    types = {column: column_type(COLUMN_DEFINITIONS[column]) for column in columns}
+    epoch = datetime.date(2015, 1, 1)
+    for i in range(rows):
+        row = []
+        for column in columns:
+            samples = SAMPLE_DATA.get(column) or [""]
+            kind = types[column]
+            if column in ("award_id", "generated_unique_award_id", "piid"):
+                value = f"{rng.choice(samples)}_{i}"
+            elif kind == "numeric(18, 2)":
+                value = f"{rng.lognormvariate(12, 2):.2f}"
+            elif kind == "date":
+                value = (epoch + datetime.timedelta(days=rng.randrange(3650))).isoformat()
+            elif column == "number_of_actions":
+                value = str(rng.randint(1, 20))
+            else:
+                value = rng.choice(samples)
+            row.append(value)
+        yield row
+
+def seed_fixture(conn, rows: int, seed: int = 42, batch_rows: int = 100000, partitioned: bool = False):
+    """
+    Creates and fills the synthetic tm_awards table with COPY. An existing
+    table is only replaced when it is a previous benchmark fixture; a fixture
+    with the same size, seed and layout is kept as is.
+
+    Args:
+        conn: Connection to the benchmark database
+        rows: Number of rows to generate
+        seed: Random seed for the generator
+        batch_rows: Rows sent per COPY batch
+        partitioned: Create tm_awards range-partitioned by fiscal year (partitions.py)
+    """
+    fixture_id = f"{FIXTURE_COMMENT} rows={rows} seed={seed}" + (" partitioned" if partitioned else "")
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL, obj_description(to_regclass(%s), 'pg_class')",
+                    (TABLE_NAME, TABLE_NAME))
+        exists, comment = cur.fetchone()
+        if exists and not (comment or "").startswith(FIXTURE_COMMENT):
+            raise RuntimeError(f"{TABLE_NAME} exists and is not a benchmark fixture; refusing to replace it")
+        if comment == fixture_id:
+            return
+        columns = ", ".join(f"{name} {column_type(desc)}" for name, desc in COLUMN_DEFINITIONS.items())
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+        if partitioned:
+            # Synthetic dates start on 2015-01-01; partitions run through the years ahead of today
+            create_partitioned_table(cur, columns, 2015,
+                                     fiscal_year(datetime.date.today()) + PARTITION_CONFIG["years_ahead"])
+        else:
+            cur.execute(f"CREATE TABLE {TABLE_NAME} ({columns})")
+        cur.execute(f"COMMENT ON TABLE {TABLE_NAME} IS %s", (fixture_id,))
+
+        # Stream rows to COPY in batches so large fixtures are never built in memory
+        buffer, pending = io.StringIO(), 0
+        writer = csv.writer(buffer)
+        for row in synthetic_rows(rows, seed):
+            writer.writerow(row)
+            pending += 1
+            if pending == batch_rows:
+                buffer.seek(0)
+                cur.copy_expert(f"COPY {TABLE_NAME} FROM STDIN WITH (FORMAT csv)", buffer)
+                buffer, pending = io.StringIO(), 0
+                writer = csv.writer(buffer)
+        if pending:
+            buffer.seek(0)
+            cur.copy_expert(f"COPY {TABLE_NAME} FROM STDIN WITH (FORMAT csv)", buffer)
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute(f"ANALYZE {TABLE_NAME}")
+    conn.commit()
+
+# ------------------- Load Driver -------------------
+def run_session(session_index: int, rounds: int, timings: dict, lock: threading.Lock):
+    """
+    Asks every corpus question in one conversation and records stage timings.
+
+    Args:
+        session_index: Index of the simulated session
+        rounds: Times the corpus is repeated
+        timings: Shared stage -> list of milliseconds
+        lock: Guards timings
+    """
+    session = pipeline.ConversationSession(f"bench-{session_index}")
+    for _ in range(rounds):
+        for item in CORPUS:
+            session.start_request()
+            trace = start_trace(session.session_id, item["question"])
+            stage_ms = {}
+            started = time.perf_counter()
+            sql_query = pipeline.generate_sql_query(item["question"], session)
+            stage_ms["generate_sql"] = (time.perf_counter() - started) * 1000
+
+            mark = time.perf_counter()
+            df = pipeline.execute_sql_query(sql_query, session)
+            stage_ms["execute_sql"] = (time.perf_counter() - mark) * 1000
+
+            mark = time.perf_counter()
+            answer = pipeline.refine_answer(item["question"], sql_query, df.head(5), session, total_count=len(df))
+            stage_ms["refine_answer"] = (time.perf_counter() - mark) * 1000
+            stage_ms["total"] = (time.perf_counter() - started) * 1000
+            for phase, ms in trace.finish()["db_ms"].items():
+                stage_ms[f"db_{phase}"] = ms
+
+            session.record_exchange(item["question"], answer, sql_query, len(df))
+            with lock:
+                for stage, ms in stage_ms.items():
+                    timings[stage].append(ms)
+                if session.request_info.get("error"):
+                    timings["errors"].append(session.request_info["error"])
+
+def summarize(values: List[float]) -> dict:
+    """Returns count, mean and p50/p95/p99 of a list of milliseconds."""
+    if not values:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "mean_ms": round(float(np.mean(values)), 2), "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+def run_benchmark(sessions: int, rounds: int, warm_cache: bool = False) -> dict:
+    """
+    Runs the corpus from concurrent sessions and builds the report.
+
+    Args:
+        sessions: Number of concurrent simulated sessions
+        rounds: Times each session repeats the corpus
+        warm_cache: Keep the SQL and result caches from earlier runs in this process
+
+    Returns:
+        Report with per-stage latency percentiles, throughput, peak RSS and errors
+    """
+    if not warm_cache:
+        get_sql_cache().backend.clear()
+        get_result_cache(TABLE_NAME).clear()
+    timings = {stage: [] for stage in STAGES}
+    timings["errors"] = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        futures = [executor.submit(run_session, i, rounds, timings, lock) for i in range(sessions)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    questions = len(timings["total"])
+    return {
+        "stages": {stage: summarize(timings[stage]) for stage in STAGES},
+        "questions": questions,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_qps": round(questions / elapsed, 3) if elapsed else 0.0,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "errors": timings["errors"][:10],
+        "error_count": len(timings["errors"]),
+        "pool": pool_metrics(),
+        "sql_cache": get_sql_cache().stats(),
+        "result_cache": get_result_cache(TABLE_NAME).stats(),
+    }
+
+# ------------------- Fetch Engine Comparison -------------------
+# Full-result list queries read with each fetch engine by --compare-fetch
+FETCH_QUERIES = [
+    f"SELECT * FROM {TABLE_NAME}",
+    f"SELECT recipient_name, awarding_agency_name, naics, total_obligation, date_signed FROM {TABLE_NAME}",
+    f"SELECT awarding_agency_name, count(*) AS awards, sum(total_obligation) AS total FROM {TABLE_NAME} "
+    f"GROUP BY awarding_agency_name",
+]
+
+def compare_fetch_engines(repeats: int) -> list:
+    """
+    Reads each FETCH_QUERIES result with the cursor engine (chunks of tuples
+    from a server-side cursor) and the COPY engine, on the same connection.
+
+    Args:
+        repeats: Reads per query and engine
+
+    Returns:
+        List of (query, engine, timing summary, rows, frame MB) tuples
+    """
+    rows = []
+    with get_pool().connection() as conn:
+        for sql_query in FETCH_QUERIES:
+            for engine in ("cursor", "copy"):
+                config = dict(FETCH_CONFIG, engine=engine)
+                times = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    df = fetch_frame(conn, sql_query, config)
+                    times.append((time.perf_counter() - started) * 1000)
+                    conn.rollback()
+                rows.append((sql_query, engine, summarize(times), len(df),
+                             df.memory_usage(deep=True).sum() / 2 ** 20))
+    return rows
+
+def print_fetch_comparison(rows: list):
+    """Prints the fetch engine comparison with COPY's speedup over the cursor per query."""
+    print(f"{'engine':<8}{'rows':>10}{'p50 ms':>12}{'p95 ms':>12}{'frame MB':>10}{'speedup':>9}  query")
+    cursor_p50 = {}
+    for sql_query, engine, stats, count, frame_mb in rows:
+        if engine == "cursor":
+            cursor_p50[sql_query] = stats["p50_ms"]
+        speedup = cursor_p50.get(sql_query, 0) / stats["p50_ms"] if stats["p50_ms"] else 0.0
+        print(f"{engine:<8}{count:>10}{stats['p50_ms']:>12.1f}{stats['p95_ms']:>12.1f}{frame_mb:>10.1f}"
+              f"{speedup:>8.2f}x  {sql_query[:60]}")
+
+# ------------------- Baseline Comparison -------------------
+def compare_to_baseline(report: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compares a report with a saved baseline.
+
+    Args:
+        report: The current benchmark report
+        baseline: A previously saved report
+        threshold: Relative increase in latency (or drop in throughput) counted as a regression
+
+    Returns:
+        List of (metric, baseline value, current value, relative change, regressed) tuples
+    """
+    rows = []
+    for stage in STAGES:
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old = baseline.get("stages", {}).get(stage, {}).get(metric)
+            new = report["stages"].get(stage, {}).get(metric)
+            if old and new is not None:
+                change = (new - old) / old
+                rows.append((f"{stage}.{metric}", old, new, change, change > threshold))
+    for metric, higher_is_better in (("throughput_qps", True), ("peak_rss_mb", False)):
+        old, new = baseline.get(metric), report.get(metric)
+        if old and new is not None:
+            change = (new - old) / old
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((metric, old, new, change, regressed))
+    return rows
+
+def print_report(report: dict, comparison: Optional[list] = None):
+    """Prints the report, and the baseline comparison if one was made."""
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for stage, stats in report["stages"].items():
+        if stats["count"]:
+            print(f"{stage:<16}{stats['count']:>8}{stats['p50_ms']:>12.1f}{stats['p95_ms']:>12.1f}{stats['p99_ms']:>12.1f}")
+    print(f"throughput: {report['throughput_qps']:.2f} questions/s over {report['elapsed_s']:.1f} s")
+    print(f"peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if report["error_count"]:
+        print(f"errors: {report['error_count']} (first: {report['errors'][0]})")
+    if comparison:
+        print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+        for metric, old, new, change, regressed in comparison:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{metric:<28}{old:>12.2f}{new:>12.2f}{change:>+10.1%}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the GovSearch AI query pipeline")
+    parser.add_argument("--rows", type=int, default=BENCH_CONFIG["rows"], help="synthetic tm_awards rows")
+    parser.add_argument("--seed", action="store_true", help="create or refresh the synthetic fixture first")
+    parser.add_argument("--random-seed", type=int, default=42, help="seed for the fixture generator")
+    parser.add_argument("--sessions", type=int, default=BENCH_CONFIG["sessions"], help="concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=BENCH_CONFIG["rounds"], help="corpus repetitions per session")
+    parser.add_argument("--llm", choices=["replay", "record"], default="replay", help="stub mode")
+    parser.add_argument("--recordings", default=BENCH_CONFIG["recordings"], help="recorded LLM responses")
+    parser.add_argument("--llm-latency-ms", type=float, default=BENCH_CONFIG["llm_latency_ms"])
+    parser.add_argument("--llm-token-ms", type=float, default=BENCH_CONFIG["llm_token_ms"])
+    parser.add_argument("--warm-cache", action="store_true", help="do not clear the SQL and result caches")
+    parser.add_argument("--baseline", default=BENCH_CONFIG["baseline"], help="baseline report path")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the baseline")
+    parser.add_argument("--output", help="also write the report as JSON to this path")
+    parser.add_argument("--threshold", type=float, default=BENCH_CONFIG["regression_threshold"])
+    parser.add_argument("--compare-fetch", action="store_true",
+                        help="compare the cursor and COPY fetch engines on the fixture instead of running the corpus")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="runs per query and side for --compare-fetch and --compare-pruning")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="seed tm_awards range-partitioned by fiscal year of date_signed")
+    parser.add_argument("--compare-pruning", action="store_true",
+                        help="time partition-pruned and unpruned plans on a partitioned fixture instead of the corpus")
+    args = parser.parse_args()
+
+    # Swap the Azure model for the record/replay stub
+    recordings = load_recordings(args.recordings)
+    pipeline.llm = ReplayChatModel(mode=args.llm, recordings=recordings,
+                                   delegate=pipeline.chat_model() if args.llm == "record" else None,
+                                   latency_ms=args.llm_latency_ms, token_ms=args.llm_token_ms)
+
+    if args.seed:
+        with get_pool().connection() as conn:
+            seed_fixture(conn, args.rows, args.random_seed, partitioned=args.partitioned)
+
+    if args.compare_fetch:
+        print_fetch_comparison(compare_fetch_engines(args.repeats))
+        return
+
+    if args.compare_pruning:
+        with get_pool().connection() as conn:
+            print_pruning_report(pruning_report(conn, repeat=args.repeats))
+        return
+
+    report = run_benchmark(args.sessions, args.rounds, args.warm_cache)
+    report["config"] = {"rows": args.rows, "sessions": args.sessions, "rounds": args.rounds, "llm": args.llm,
+                        "llm_latency_ms": args.llm_latency_ms, "llm_token_ms": args.llm_token_ms,
+                        "warm_cache": args.warm_cache}
+    if args.llm == "record":
+        save_recordings(args.recordings, recordings)
+
+    comparison = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            comparison = compare_to_baseline(report, json.load(f), args.threshold)
+    print_report(report, comparison)
+
+    for path in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    if comparison and any(row[-1] for row in comparison):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from db import get_pool
+from schema import TABLE_NAME, COLUMN_DEFINITIONS
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Column Profile Configuration -------------------
+PROFILE_CONFIG = {
+    # Set SCHEMA_PROFILE=0 to send the hand-written SAMPLE_DATA instead of profiled values
+    "enabled": os.getenv("SCHEMA_PROFILE", "1") != "0",
+    "path": os.getenv("SCHEMA_PROFILE_PATH", ".cache/column_profile.json"),
+    # Seconds between background refreshes of the snapshot
+    "refresh_interval": float(os.getenv("SCHEMA_PROFILE_REFRESH_SECONDS", "86400")),
+    # Most common values kept per column
+    "top_k": int(os.getenv("SCHEMA_PROFILE_TOP_K", "10")),
+    # Percentage of table pages read for columns the planner has no statistics for
+    "sample_percent": float(os.getenv("SCHEMA_PROFILE_SAMPLE_PERCENT", "1")),
+}
+
+# Bumped when the snapshot layout changes; snapshots in another format are rebuilt
+SNAPSHOT_FORMAT = 1
+
+# Seconds before a failed refresh is retried
+RETRY_SECONDS = 300
+
+# Profile of one column. values are the most common values, most frequent first
+# (or evenly spaced examples when no value repeats); distinct is an estimate.
+ColumnProfile = namedtuple("ColumnProfile", ["values", "distinct", "null_fraction", "min", "max"])
+
+# A complete set of column profiles; version increases with every refresh
+ProfileSnapshot = namedtuple("ProfileSnapshot", ["version", "generated_at", "source", "columns"])
+
+
+def column_kind(column: str) -> str:
+    """Returns "number", "date" or "text" from the type suffix of a COLUMN_DEFINITIONS description."""
+    description = COLUMN_DEFINITIONS.get(column, "")
+    if description.endswith(("Dollar", "NumberInt 32", "NumberInt 64")):
+        return "number"
+    if description.endswith("ISO Date"):
+        return "date"
+    return "text"
+
+
+def _order_key(kind: str):
+    """Sort key comparing values of a column kind; dates compare as ISO text."""
+    if kind != "number":
+        return str
+
+    def number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("inf")
+    return number
+
+
+def _spread(values: list, count: int) -> list:
+    """Picks `count` evenly spaced items, keeping the first and last."""
+    if len(values) <= count:
+        return list(values)
+    step = (len(values) - 1) / (count - 1) if count > 1 else 0
+    return [values[round(i * step)] for i in range(count)]
+
+
+# ------------------- Profiling -------------------
+def profile_from_stats(conn, top_k: int) -> dict:
+    """
+    Profiles columns from the planner statistics in pg_stats, without reading
+    the table: most common values, n_distinct (negative values are a fraction
+    of the row count), null fraction and the ends of the histogram.
+
+    Returns:
+        Dictionary of column name to ColumnProfile, for analyzed columns only
+    """
+    with conn.cursor() as cur:
+        # A partitioned table's row estimate is the sum of its partitions'
+        cur.execute("SELECT sum(GREATEST(reltuples, 0)) FROM pg_class WHERE oid IN "
+                    "(SELECT relid FROM pg_partition_tree(to_regclass(%s)) WHERE isleaf)", (TABLE_NAME,))
+        # sum() is NULL when the table does not exist or has no partitions
+        rows = cur.fetchone()[0] or 0
+        cur.execute("SELECT attname, null_frac, n_distinct, most_common_vals::text::text[], "
+                    "histogram_bounds::text::text[] FROM pg_stats "
+                    "WHERE schemaname = current_schema() AND tablename = %s", (TABLE_NAME,))
+        stats = cur.fetchall()
+    profiles = {}
+    for column, null_fraction, n_distinct, common, bounds in stats:
+        if column not in COLUMN_DEFINITIONS:
+            continue
+        common, bounds = common or [], bounds or []
+        kind = column_kind(column)
+        ordered = sorted(common + bounds[:1] + bounds[-1:], key=_order_key(kind))
+        distinct = int(-n_distinct * rows) if n_distinct < 0 else int(n_distinct)
+        profiles[column] = ColumnProfile(values=common[:top_k] or _spread(bounds, min(top_k, 3)),
+                                         distinct=distinct, null_fraction=round(null_fraction, 4),
+                                         min=ordered[0] if ordered else None, max=ordered[-1] if ordered else None)
+    return profiles
+
+
+def profile_from_sample(conn, columns, top_k: int, sample_percent: float) -> dict:
+    """
+    Profiles columns from a TABLESAMPLE of the table's pages, for columns with
+    no planner statistics (a table that was never analyzed). The table is
+    sampled once into a temporary table, dropped at commit, and each column
+    is counted from there. The distinct count is that of the sample, a lower
+    bound.
+
+    Returns:
+        Dictionary of column name to ColumnProfile
+    """
+    profiles = {}
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE profile_sample ON COMMIT DROP AS SELECT {', '.join(columns)} "
+                    f"FROM {TABLE_NAME} TABLESAMPLE SYSTEM (%s) REPEATABLE (42)", (sample_percent,))
+        for column in columns:
+            cur.execute(f"SELECT {column}::text, count(*) FROM profile_sample GROUP BY 1 ORDER BY 2 DESC")
+            counts = cur.fetchall()
+            total = sum(count for _, count in counts)
+            nulls = sum(count for value, count in counts if value is None)
+            values = [value for value, count in counts if value is not None]
+            ordered = sorted(values, key=_order_key(column_kind(column)))
+            # Values seen once in a sample are examples, not common values
+            common = [value for value, count in counts if value is not None and count > 1]
+            profiles[column] = ColumnProfile(values=common[:top_k] or _spread(ordered, min(top_k, 3)),
+                                             distinct=len(values),
+                                             null_fraction=round(nulls / total, 4) if total else 0.0,
+                                             min=ordered[0] if ordered else None,
+                                             max=ordered[-1] if ordered else None)
+    return profiles
+
+
+# ------------------- Snapshots -------------------
+class ColumnProfiler:
+    """
+    Holds the current profile snapshot: loaded from disk at startup, rebuilt
+    from pg_stats (or TABLESAMPLE) in a background thread when it is older
+    than refresh_interval, and saved again for the next start.
+    """
+    def __init__(self, config: dict = None):
+        self.config = config or PROFILE_CONFIG
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._failed_at = None
+
+    def load(self, path: str = None) -> bool:
+        """Loads the saved snapshot; returns False when there is none or it is in another format."""
+        path = path or self.config["path"]
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if payload.get("format") != SNAPSHOT_FORMAT:
+            return False
+        columns = {column: ColumnProfile(**profile) for column, profile in payload["columns"].items()
+                   if column in COLUMN_DEFINITIONS}
+        self.snapshot = ProfileSnapshot(payload["version"], payload["generated_at"], payload["source"], columns)
+        return True
+
+    def save(self, path: str = None):
+        """Writes the snapshot as JSON, replacing the previous file atomically."""
+        path = path or self.config["path"]
+        snapshot = self.snapshot
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {"format": SNAPSHOT_FORMAT, "version": snapshot.version, "generated_at": snapshot.generated_at,
+                   "source": snapshot.source,
+                   "columns": {column: profile._asdict() for column, profile in snapshot.columns.items()}}
+        with open(path + ".tmp", "w") as f:
+            json.dump(payload, f, separators=(",", ":"), default=str)
+        os.replace(path + ".tmp", path)
+
+    def refresh(self) -> ProfileSnapshot:
+        """
+        Profiles every column and installs the result as a new snapshot version.
+        Planner statistics are used where they exist; the remaining columns are
+        sampled.
+
+        Returns:
+            The new ProfileSnapshot
+        """
+        started = time.perf_counter()
+        with get_pool().connection() as conn:
+            columns = profile_from_stats(conn, self.config["top_k"])
+            missing = [column for column in COLUMN_DEFINITIONS if column not in columns]
+            if missing:
+                columns.update(profile_from_sample(conn, missing, self.config["top_k"],
+                                                   self.config["sample_percent"]))
+            conn.commit()
+        source = "pg_stats" if not missing else "tablesample" if len(missing) == len(COLUMN_DEFINITIONS) else "mixed"
+        previous = self.snapshot.version if self.snapshot else 0
+        self.snapshot = ProfileSnapshot(previous + 1, time.time(), source, columns)
+        self.save()
+        logger.info("Column profile v%d from %s in %.2fs", previous + 1, source, time.perf_counter() - started)
+        return self.snapshot
+
+    def refresh_if_due(self):
+        """Starts a background refresh when the snapshot is missing or older than refresh_interval."""
+        now = time.time()
+        with self._lock:
+            fresh = self.snapshot is not None and now - self.snapshot.generated_at < self.config["refresh_interval"]
+            failed_recently = self._failed_at is not None and now - self._failed_at < RETRY_SECONDS
+            if self._refreshing or fresh or failed_recently:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="column-profile-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning("Column profile refresh failed: %s", e)
+            self._failed_at = time.time()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+# Module state survives Streamlit reruns, so the snapshot is loaded once per process
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_column_profiler() -> ColumnProfiler:
+    """Returns the process-wide profiler, loading the saved snapshot on first use."""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                profiler = ColumnProfiler()
+                profiler.load()
+                _profiler = profiler
+    return _profiler
+
+
+def current_snapshot():
+    """
+    Returns the current ProfileSnapshot, or None when profiling is disabled or
+    no snapshot exists yet. Schedules a background refresh when one is due.
+    """
+    if not PROFILE_CONFIG["enabled"]:
+        return None
+    profiler = get_column_profiler()
+    profiler.refresh_if_due()
+    return profiler.snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile tm_awards columns for the SQL generation prompt")
+    parser.add_argument("--show", action="store_true", help="print the saved snapshot instead of refreshing")
+    args = parser.parse_args()
+    profiler = get_column_profiler()
+    snapshot = profiler.snapshot if args.show else profiler.refresh()
+    if snapshot is None:
+        raise SystemExit("No saved snapshot")
+    print(f"version {snapshot.version} from {snapshot.source}")
+    for column, profile in snapshot.columns.items():
+        print(f"{column}: ~{profile.distinct} distinct, {profile.null_fraction:.1%} null, "
+              f"{profile.min!r}..{profile.max!r}, top {profile.values[:3]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,169 @@
+import os
+from prompt_schema import count_tokens
+
+# ------------------- Memory Configuration -------------------
+MEMORY_CONFIG = {
+    # Tokens of recent turns kept verbatim in prompts; older turns are summarized
+    "token_budget": int(os.getenv("MEMORY_TOKEN_BUDGET", "600")),
+    # Longest an assistant message may be in the prompt; longer ones are clipped
+    "message_max_tokens": int(os.getenv("MEMORY_MESSAGE_MAX_TOKENS", "200")),
+    # Most questions, filters, entity types and result counts kept in the summary
+    "summary_max_items": int(os.getenv("MEMORY_SUMMARY_MAX_ITEMS", "5")),
+}
+
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """
+    Shortens text to whole lines fitting in max_tokens, noting how many lines
+    were left out. Long formatted lists keep their first entries.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines() or [text]
+    kept = []
+    for line in lines:
+        if count_tokens("\n".join(kept + [line])) > max_tokens:
+            break
+        kept.append(line)
+    if not kept:
+        # A single very long line: keep roughly max_tokens worth of characters
+        return text[:max_tokens * 4] + " ..."
+    return "\n".join(kept) + f"\n... ({len(lines) - len(kept)} more lines)"
+
+
+class ConversationMemory:
+    """
+    Conversation history for prompts with a token budget. The most recent
+    turns are kept verbatim (long answers clipped) while they fit the budget;
+    older turns are folded into a structured summary of the questions asked,
+    the filters used, the entities mentioned and the result counts. The
+    summary is updated incrementally as turns are folded, so it is never
+    recomputed from the full history.
+    """
+    def __init__(self, config: dict = None):
+        self.config = config or MEMORY_CONFIG
+        # Verbatim turns: {"user", "assistant", "where", "results_count", "entities", "tokens"}
+        self.turns = []
+        self.summary = {"turns": 0, "questions": [], "filters": [], "entities": {}, "counts": []}
+        self._summary_text = None
+
+    def add_exchange(self, user_message: str, ai_message: str, where_clause: str = None,
+                     results_count: int = None, entities: dict = None):
+        """
+        Adds a question and its answer, then folds the oldest turns into the
+        summary until the verbatim turns fit the token budget.
+
+        Args:
+            user_message: The user's question
+            ai_message: The assistant's answer
+            where_clause: WHERE clause of the SQL that answered the question
+            results_count: Rows the SQL returned
+            entities: Entity counts mentioned in the answer
+        """
+        assistant = clip_text(ai_message, self.config["message_max_tokens"])
+        self.turns.append({
+            "user": user_message,
+            "assistant": assistant,
+            "where": where_clause,
+            "results_count": results_count,
+            "entities": entities or {},
+            "tokens": count_tokens(f"User: {user_message}\nAssistant: {assistant}"),
+        })
+        # The latest turn is always kept verbatim
+        while len(self.turns) > 1 and sum(turn["tokens"] for turn in self.turns) > self.config["token_budget"]:
+            self._fold(self.turns.pop(0))
+
+    def fold_oldest(self, count: int = 1) -> int:
+        """
+        Folds up to `count` of the oldest verbatim turns into the summary, for
+        callers that must shrink the memory below its token budget (such as a
+        session store with a size limit). Unlike add_exchange, it may fold the
+        latest turn too.
+
+        Returns:
+            Number of turns folded
+        """
+        folded = min(count, len(self.turns))
+        for turn in self.turns[:folded]:
+            self._fold(turn)
+        del self.turns[:folded]
+        return folded
+
+    def drop_summary_item(self) -> bool:
+        """
+        Drops the oldest entry from the longest list in the summary, for callers
+        that must shrink the memory further once no verbatim turns are left.
+
+        Returns:
+            False when the summary has nothing left to drop
+        """
+        summary = self.summary
+        name = max(("questions", "filters", "entities", "counts"), key=lambda key: len(summary[key]))
+        if not summary[name]:
+            return False
+        if name == "entities":
+            summary[name].pop(next(iter(summary[name])))
+        else:
+            summary[name].pop(0)
+        self._summary_text = None
+        return True
+
+    def _fold(self, turn: dict):
+        limit = self.config["summary_max_items"]
+        summary = self.summary
+        summary["turns"] += 1
+        summary["questions"] = (summary["questions"] + [turn["user"]])[-limit:]
+        if turn["where"]:
+            filters = [f for f in summary["filters"] if f != turn["where"]]
+            summary["filters"] = (filters + [turn["where"]])[-limit:]
+        # Entity types mentioned again move to the end, so the oldest are dropped first
+        entities = {k: v for k, v in summary["entities"].items() if k not in turn["entities"]}
+        entities.update(turn["entities"])
+        summary["entities"] = dict(list(entities.items())[-limit:])
+        if turn["results_count"] is not None:
+            summary["counts"] = (summary["counts"] + [[turn["user"], turn["results_count"]]])[-limit:]
+        self._summary_text = None
+
+    def summary_text(self) -> str:
+        """Renders the summary of folded turns, cached until the next fold."""
+        if self._summary_text is None:
+            summary = self.summary
+            if not summary["turns"]:
+                self._summary_text = ""
+            else:
+                lines = [f"Summary of {summary['turns']} earlier turn(s):"]
+                lines.append("- Questions: " + " | ".join(summary["questions"]))
+                if summary["filters"]:
+                    lines.append("- Filters used: " + " | ".join(summary["filters"]))
+                if summary["entities"]:
+                    lines.append("- Entities mentioned: " + ", ".join(
+                        f"{count:,} {entity_type}(s)" for entity_type, count in summary["entities"].items()))
+                if summary["counts"]:
+                    lines.append("- Result counts: " + " | ".join(
+                        f"\"{question}\": {count:,} rows" for question, count in summary["counts"]))
+                self._summary_text = "\n".join(lines)
+        return self._summary_text
+
+    def history_text(self) -> str:
+        """Returns the conversation history for prompts: the summary, then the verbatim turns."""
+        parts = [self.summary_text()] if self.summary["turns"] else []
+        parts.extend(f"User: {turn['user']}\nAssistant: {turn['assistant']}" for turn in self.turns)
+        return "\n".join(parts)
+
+    def last_entities(self) -> dict:
+        """Entity counts mentioned in the most recent answer."""
+        return dict(self.turns[-1]["entities"]) if self.turns else {}
+
+    def prompt_tokens(self) -> int:
+        """Approximate tokens the history adds to a prompt."""
+        return count_tokens(self.summary_text()) + sum(turn["tokens"] for turn in self.turns)
+
+    def to_state(self) -> dict:
+        return {"turns": self.turns, "summary": self.summary}
+
+    @classmethod
+    def from_state(cls, state: dict, config: dict = None):
+        memory = cls(config)
+        memory.turns = list(state.get("turns", []))
+        memory.summary.update(state.get("summary", {}))
+        return memory
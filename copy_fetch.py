@@ -0,0 +1,206 @@
+import io
+import os
+import uuid
+import pandas as pd
+from schema import COLUMN_DEFINITIONS
+from paging import strip_sql, is_select, read_frame
+from instrumentation import db_phase
+
+# ------------------- Fetch Engine Configuration -------------------
+FETCH_CONFIG = {
+    # "copy" reads full results with COPY ... TO STDOUT; "cursor" builds the frame from a server-side cursor
+    "engine": os.getenv("FETCH_ENGINE", "copy"),
+    # Rows the "cursor" engine fetches per round trip; only one chunk of row tuples is held at a time
+    "chunk_rows": int(os.getenv("QUERY_STREAM_CHUNK_SIZE", "2000")),
+    # Text columns whose distinct values are at most this share of the rows become categoricals
+    "category_max_ratio": float(os.getenv("FETCH_CATEGORY_MAX_RATIO", "0.5")),
+    # ...in results of at least this many rows; small frames gain nothing from categories
+    "category_min_rows": int(os.getenv("FETCH_CATEGORY_MIN_ROWS", "1000")),
+}
+
+# Written by COPY for NULL, so empty strings stay distinguishable from missing values
+NULL_MARKER = r"\N"
+
+# Result column kinds by PostgreSQL type OID, for columns not in COLUMN_DEFINITIONS
+TYPE_KINDS = {
+    16: "bool",
+    20: "int", 21: "int", 23: "int",
+    700: "float", 701: "float", 1700: "float",
+    1082: "datetime", 1114: "datetime",
+}
+
+
+def schema_kind(column: str):
+    """Returns the kind documented by the type suffix of a COLUMN_DEFINITIONS description, or None."""
+    description = COLUMN_DEFINITIONS.get(column)
+    if description is None:
+        return None
+    if description.endswith("Dollar"):
+        return "float"
+    if description.endswith(("NumberInt 32", "NumberInt 64")):
+        return "int"
+    if description.endswith("ISO Date"):
+        return "datetime"
+    return "text"
+
+
+def column_kinds(description) -> list:
+    """
+    Decides how each result column is parsed: by its COLUMN_DEFINITIONS type
+    when it is a table column, otherwise by its PostgreSQL type (counts, sums
+    and other computed columns).
+
+    Args:
+        description: cursor.description of the query
+
+    Returns:
+        List of "int", "float", "bool", "datetime" or "text", one per column
+    """
+    return [schema_kind(column.name) or TYPE_KINDS.get(column.type_code, "text") for column in description]
+
+
+def convert_column(series: pd.Series, kind: str) -> pd.Series:
+    """Converts a column read as text to its kind; values that do not parse leave it as text."""
+    try:
+        if kind == "datetime":
+            return pd.to_datetime(series, format="ISO8601")
+        if kind == "bool":
+            return series.map({"t": True, "f": False})
+        numbers = pd.to_numeric(series)
+        if kind == "int":
+            return numbers.astype("Int64" if numbers.isna().any() else "int64")
+        return numbers.astype("float64")
+    except (ValueError, TypeError, OverflowError):
+        return series
+
+
+def parse_copy(data, columns: list, kinds: list, config: dict = None) -> pd.DataFrame:
+    """
+    Parses the CSV written by COPY into typed columns. Numbers are parsed by
+    pandas' C reader straight into numeric arrays; dates are converted in one
+    vectorized pass, and low-cardinality text becomes categorical.
+
+    Args:
+        data: BytesIO holding the COPY output (no header row)
+        columns: Result column names
+        kinds: Column kinds from column_kinds()
+        config: Fetch configuration (defaults to FETCH_CONFIG)
+
+    Returns:
+        DataFrame with one typed column per result column
+    """
+    config = config or FETCH_CONFIG
+    if not data.getbuffer().nbytes:
+        return pd.DataFrame(columns=columns)
+    # Positions, not names: a result may repeat a column name. Plain int64 parses fastest;
+    # integer columns holding NULLs need the nullable Int64
+    typed = {i: "int64" if kind == "int" else "float64"
+             for i, kind in enumerate(kinds) if kind in ("int", "float")}
+    nullable = {i: "Int64" if dtype == "int64" else dtype for i, dtype in typed.items()}
+    read = dict(header=None, na_values=[NULL_MARKER], keep_default_na=False, encoding="utf-8")
+    for attempt in [typed] + ([nullable] if nullable != typed else []):
+        try:
+            df = pd.read_csv(data, dtype={i: attempt.get(i, object) for i in range(len(columns))}, **read)
+            break
+        except ValueError:
+            data.seek(0)
+    else:
+        # A column documented as numeric holds something else; convert column by column instead
+        attempt = {}
+        df = pd.read_csv(data, dtype=object, **read)
+    for i, kind in enumerate(kinds):
+        if i not in attempt and kind != "text":
+            df[i] = convert_column(df[i], kind)
+    if len(df) >= config["category_min_rows"]:
+        for i in range(len(columns)):
+            if df[i].dtype != object:
+                continue
+            # One hashing pass both counts the distinct values and builds the categorical
+            codes, uniques = pd.factorize(df[i])
+            if len(uniques) <= config["category_max_ratio"] * len(df):
+                df[i] = pd.Categorical.from_codes(codes, uniques)
+    df.columns = columns
+    return df
+
+
+def read_frame_copy(conn, sql_query: str, config: dict = None) -> pd.DataFrame:
+    """
+    Runs a SELECT through COPY (...) TO STDOUT and parses the CSV stream into
+    a typed DataFrame, skipping the Python tuple per row that cursor fetches
+    build. The result's column types come from a LIMIT 0 run of the query.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SELECT to run
+        config: Fetch configuration (defaults to FETCH_CONFIG)
+
+    Returns:
+        DataFrame of the query's rows
+    """
+    query = strip_sql(sql_query)
+    buffer = io.BytesIO()
+    with conn.cursor() as cur:
+        with db_phase("execute"):
+            cur.execute(f"SELECT * FROM ({query}) AS describe_q LIMIT 0")
+            description = cur.description
+        # COPY runs the query and streams its rows in one step; it is timed as fetch
+        with db_phase("fetch"):
+            cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '{NULL_MARKER}')", buffer)
+            buffer.seek(0)
+            return parse_copy(buffer, [column.name for column in description], column_kinds(description), config)
+
+
+def read_frame_cursor(conn, sql_query: str, config: dict = None) -> pd.DataFrame:
+    """
+    Runs a SELECT through a named (server-side) cursor and builds the DataFrame
+    chunk by chunk, so the rows arrive chunk_rows at a time and only one
+    chunk's Python tuples exist at once instead of the whole result's.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SELECT to run
+        config: Fetch configuration (defaults to FETCH_CONFIG)
+
+    Returns:
+        DataFrame of the query's rows
+    """
+    config = config or FETCH_CONFIG
+    chunks = []
+    with conn.cursor(name=f"govsearch_{uuid.uuid4().hex}") as cur:
+        cur.itersize = config["chunk_rows"]
+        with db_phase("execute"):
+            cur.execute(strip_sql(sql_query))
+        with db_phase("fetch"):
+            while True:
+                rows = cur.fetchmany(config["chunk_rows"])
+                # A named cursor describes its columns after the first fetch
+                columns = [column.name for column in cur.description]
+                if rows or not chunks:
+                    chunks.append(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True))
+                if len(rows) < config["chunk_rows"]:
+                    break
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def fetch_frame(conn, sql_query: str, config: dict = None) -> pd.DataFrame:
+    """
+    Reads a full query result with the configured engine: COPY into typed
+    columns, or chunked reads from a server-side cursor. Statements neither
+    can wrap (anything but SELECT, WITH and VALUES) use a plain cursor. Result
+    pages (paging.fetch_page) always use the cursor: for a page-sized result
+    the LIMIT 0 describe query costs more than COPY saves.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SQL statement to run
+        config: Fetch configuration (defaults to FETCH_CONFIG)
+
+    Returns:
+        DataFrame of the query's rows
+    """
+    config = config or FETCH_CONFIG
+    if not is_select(sql_query):
+        return read_frame(conn, sql_query)
+    if config["engine"] == "cursor":
+        return read_frame_cursor(conn, sql_query, config)
+    return read_frame_copy(conn, sql_query, config)
@@ -0,0 +1,359 @@
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import psycopg2
+from instrumentation import record_db_time
+
+# Load environment variables from .env file
+load_dotenv()
+
+# ------------------- PostgreSQL Configuration -------------------
+# Database connection parameters retrieved from environment variables
+DB_CONFIG = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT")
+}
+
+# Pool sizing and per-connection session settings
+POOL_CONFIG = {
+    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    # Seconds a caller waits for a free connection before giving up
+    "checkout_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    # Idle connections older than this many seconds are pinged before reuse
+    "health_check_interval": float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")),
+    "statement_timeout_ms": int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "60000")),
+    "application_name": os.getenv("DB_APPLICATION_NAME", "govsearch-ai"),
+}
+
+# Low-priority lane for expensive queries: few connections, so they cannot crowd
+# out interactive traffic, and a longer (but still hard) statement timeout
+BACKGROUND_POOL_CONFIG = dict(
+    POOL_CONFIG,
+    min_size=0,
+    max_size=int(os.getenv("DB_BACKGROUND_POOL_MAX_SIZE", "2")),
+    checkout_timeout=float(os.getenv("DB_BACKGROUND_POOL_TIMEOUT", "120")),
+    statement_timeout_ms=int(os.getenv("DB_BACKGROUND_STATEMENT_TIMEOUT_MS", "300000")),
+    application_name=os.getenv("DB_APPLICATION_NAME", "govsearch-ai") + "-background",
+)
+
+# Named pools available through get_pool()
+POOL_CONFIGS = {
+    "default": POOL_CONFIG,
+    "background": BACKGROUND_POOL_CONFIG,
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+
+# ------------------- Connection Pool -------------------
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections that are opened once and reused
+    across queries. Connections are health checked on checkout and configured
+    with a statement timeout and application name when they are created.
+    """
+    def __init__(self, db_config, min_size=1, max_size=10, checkout_timeout=30.0,
+                 health_check_interval=30.0, statement_timeout_ms=60000,
+                 application_name="govsearch-ai"):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.db_config = {k: v for k, v in db_config.items() if v is not None}
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.statement_timeout_ms = statement_timeout_ms
+        self.application_name = application_name
+        # Idle connections paired with the time they were returned to the pool
+        self._idle = deque()
+        self._in_use = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Slots reserved by checkouts that are opening or pinging a connection outside the lock
+        self._pending = 0
+        # Counters reported by metrics()
+        self._waiters = 0
+        self._created = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._checkouts = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._created += 1
+
+    def _connect(self):
+        """Opens a new connection with the pool's session settings applied."""
+        return psycopg2.connect(
+            **self.db_config,
+            application_name=self.application_name,
+            options=f"-c statement_timeout={self.statement_timeout_ms}"
+        )
+
+    def _is_healthy(self, conn, idle_since):
+        """Checks that an idle connection is still usable before handing it out."""
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _discard(self, conn):
+        self._discarded += 1
+        self._close(conn)
+
+    def _reserve(self, deadline):
+        """
+        Claims a slot under the lock: an idle connection to check, or room for
+        a new one (returned as None). Waits while the pool is at its size limit.
+        """
+        while True:
+            if self._closed:
+                raise PoolTimeout("Connection pool is closed")
+            if self._idle:
+                self._pending += 1
+                return self._idle.pop()
+            # Connections being opened or checked count toward the size limit
+            if len(self._in_use) + self._pending < self.max_size:
+                self._pending += 1
+                return None, None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timeouts += 1
+                raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s "
+                                  f"({self.max_size} in use)")
+            self._waiters += 1
+            try:
+                self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def getconn(self):
+        """
+        Checks a connection out of the pool, waiting up to checkout_timeout
+        seconds when every connection is in use. Opening a connection and
+        pinging an idle one happen outside the pool lock, so a slow server
+        does not hold up other checkouts and returns.
+
+        Returns:
+            An open psycopg2 connection that must be returned with putconn()
+        """
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            with self._cond:
+                conn, idle_since = self._reserve(deadline)
+            created = conn is None
+            try:
+                if created:
+                    conn = self._connect()
+                elif not self._is_healthy(conn, idle_since):
+                    self._close(conn)
+                    conn = None
+            except BaseException:
+                # Give the reserved slot back
+                with self._cond:
+                    self._pending -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._pending -= 1
+                if conn is None:
+                    self._discarded += 1
+                    self._cond.notify()
+                    continue
+                if created:
+                    self._created += 1
+                if self._closed:
+                    self._close(conn)
+                    raise PoolTimeout("Connection pool is closed")
+                return self._checked_out(conn, started)
+
+    def _checked_out(self, conn, started):
+        elapsed = time.monotonic() - started
+        self._in_use.add(conn)
+        self._checkouts += 1
+        self._checkout_time_total += elapsed
+        self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        record_db_time("wait", elapsed)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Returns a connection to the pool, resetting any open transaction.
+
+        Args:
+            conn: Connection previously obtained from getconn()
+            discard: Close the connection instead of keeping it for reuse
+        """
+        # The rollback is a round trip, so it runs before the lock is taken
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that checks out a connection and always returns it.
+        Connections that fail with an interface or operational error are discarded.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.InterfaceError, psycopg2.OperationalError) as e:
+            # A cancelled statement leaves the connection usable
+            broken = not isinstance(e, psycopg2.extensions.QueryCanceledError)
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def metrics(self) -> dict:
+        """
+        Returns a snapshot of pool usage for monitoring.
+
+        Returns:
+            Dictionary with connection counts, waiters and checkout latency
+        """
+        with self._cond:
+            avg_ms = (self._checkout_time_total / self._checkouts * 1000) if self._checkouts else 0.0
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "connecting": self._pending,
+                "waiters": self._waiters,
+                "checkouts": self._checkouts,
+                "checkout_latency_avg_ms": round(avg_ms, 3),
+                "checkout_latency_max_ms": round(self._checkout_time_max * 1000, 3),
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "checkout_timeouts": self._timeouts,
+            }
+
+    def close(self):
+        """Closes all idle connections and rejects further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+
+# ------------------- Process-wide Pools -------------------
+# Module state survives Streamlit reruns, so each pool is built once per process
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(name: str = "default") -> ConnectionPool:
+    """
+    Returns a process-wide connection pool, creating it on first use.
+
+    Args:
+        name: Pool name from POOL_CONFIGS ("default" or "background")
+
+    Returns:
+        The shared ConnectionPool instance
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = ConnectionPool(DB_CONFIG, **POOL_CONFIGS[name])
+    return pool
+
+
+def pool_metrics(name: str = "default") -> dict:
+    """Returns metrics for a shared pool, or an empty dict if it has not been created yet."""
+    pool = _pools.get(name)
+    return pool.metrics() if pool is not None else {}
+
+
+@atexit.register
+def close_pool():
+    """Closes all shared pools; a later get_pool() call builds fresh ones."""
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+# ------------------- Online Index Builds -------------------
+def create_index_concurrently(cur, name: str, table: str, key: str) -> str:
+    """
+    Builds an index while the table stays writable. CREATE INDEX CONCURRENTLY
+    is not supported on a partitioned table, so there the index is created on
+    the parent alone (ON ONLY, a catalog change that leaves it invalid), built
+    concurrently on each partition and attached; the parent index becomes
+    valid once every partition's index is attached. Re-running resumes an
+    interrupted build: invalid leftovers on plain tables are dropped and
+    rebuilt, and partitions whose index is already attached are skipped.
+
+    Args:
+        cur: Cursor on a connection in autocommit mode
+        name: Index name
+        table: Table to index
+        key: Method and key, e.g. "(last_modified_date)" or "USING gin (recipient_name gin_trgm_ops)"
+
+    Returns:
+        "exists", "created" or "rebuilt"
+    """
+    cur.execute("SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%s)", (name,))
+    row = cur.fetchone()
+    if row is not None and row[0]:
+        return "exists"
+    status = "created" if row is None else "rebuilt"
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    kind = cur.fetchone()
+    if kind is None or kind[0] != "p":
+        if row is not None:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cur.execute(f"CREATE INDEX CONCURRENTLY {name} ON {table} {key}")
+        return status
+    # An invalid partitioned index is kept; attaching the missing partitions completes it
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {key}")
+    cur.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname", (table,))
+    for partition, in cur.fetchall():
+        # tm_awards_x_idx is built on tm_awards_fy2024 as tm_awards_fy2024_x_idx
+        partition_index = partition + name[len(table):] if name.startswith(table) else f"{partition}_{name}"
+        create_index_concurrently(cur, partition_index, partition, key)
+        cur.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+    return status
@@ -0,0 +1,332 @@
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from db import get_pool
+from schema import TABLE_NAME
+from prompt_schema import STOPWORDS, COLUMN_SYNONYMS
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Entity Index Configuration -------------------
+ENTITY_CONFIG = {
+    # Set ENTITY_RESOLUTION=0 to leave name matching to the LLM's ILIKE filters
+    "enabled": os.getenv("ENTITY_RESOLUTION", "1") != "0",
+    # The index is saved here so a restart does not have to re-read every distinct name
+    "path": os.getenv("ENTITY_INDEX_PATH", ".cache/entity_index.json"),
+    # Seconds between incremental refreshes from tm_awards
+    "refresh_interval": float(os.getenv("ENTITY_INDEX_REFRESH_SECONDS", "3600")),
+    # Names stored under more spellings than this are left to ILIKE
+    "max_variants": int(os.getenv("ENTITY_MAX_VARIANTS", "25")),
+}
+
+# Columns whose stored spellings are indexed
+ENTITY_COLUMNS = ["awarding_agency_name", "awarding_sub_agency_name", "awarding_agency_office_name",
+                  "recipient_name", "parent_recipient_name"]
+AGENCY_COLUMNS = {"awarding_agency_name", "awarding_sub_agency_name"}
+
+# Abbreviations expanded before names are compared
+ABBREVIATIONS = {
+    "dept": "department", "admin": "administration", "natl": "national", "govt": "government",
+    "svc": "service", "svcs": "services", "intl": "international", "mgmt": "management",
+    "assn": "association", "univ": "university", "tech": "technology", "sys": "systems",
+}
+
+# Trailing company-form words that do not distinguish one vendor from another
+COMPANY_SUFFIXES = {"inc", "incorporated", "llc", "corp", "corporation", "co", "company", "ltd", "limited",
+                    "lp", "llp", "plc", "pllc"}
+
+# Agency acronyms users type, by the canonical name they stand for
+AGENCY_ACRONYMS = {
+    "dod": "department of defense", "doe": "department of energy", "dhs": "department of homeland security",
+    "hhs": "department of health and human services", "doj": "department of justice",
+    "usda": "department of agriculture", "gsa": "general services administration",
+    "nasa": "national aeronautics and space administration", "epa": "environmental protection agency",
+}
+
+# A name resolved from the question: the words matched, the column and every stored spelling
+EntityMatch = namedtuple("EntityMatch", ["mention", "column", "variants"])
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def name_words(text: str) -> list:
+    """Lowercase words of a name or question with abbreviations expanded; '&' reads as 'and'."""
+    text = text.lower().replace("&", " and ").replace("'", "")
+    return [ABBREVIATIONS.get(word, word) for word in _WORD.findall(text)]
+
+
+def canonical_name(value: str) -> str:
+    """
+    The form under which spellings of one name are grouped: lowercase words,
+    abbreviations expanded, inverted names ("HOMELAND SECURITY, DEPARTMENT OF")
+    put back in reading order, and trailing company forms (Inc, LLC) dropped.
+    """
+    head, comma, tail = value.rpartition(",")
+    if comma and re.search(r"\bof\s*$", tail, re.IGNORECASE):
+        value = f"{tail} {head}"
+    words = name_words(value)
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def sql_values(column: str, variants) -> str:
+    """Renders an equality filter matching any of the stored spellings."""
+    quoted = ", ".join("'" + variant.replace("'", "''") + "'" for variant in variants)
+    return f"{column} = ANY(ARRAY[{quoted}])"
+
+
+# ------------------- Entity Index -------------------
+class EntityIndex:
+    """
+    Distinct agency and vendor names from tm_awards, grouped by canonical name.
+    Questions are matched against it as word n-grams, longest first, so
+    "Department of Defense" resolves to every stored spelling of that name
+    ("DEPT OF DEFENSE", "Department of Defense", "DEFENSE, DEPARTMENT OF").
+
+    The index is saved as JSON and refreshed incrementally with the names on
+    rows modified since the last refresh. Spellings that disappear from the
+    table stay until a full rebuild.
+    """
+    def __init__(self, config: dict = None):
+        self.config = config or ENTITY_CONFIG
+        # canonical name -> {column: sorted stored spellings}
+        self.entries = {}
+        self.watermark = None
+        self.refreshed_at = None
+        self.max_words = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def add(self, column: str, values):
+        """Adds stored spellings of a column to the index."""
+        entries = self.entries
+        for value in values:
+            if not value or not value.strip():
+                continue
+            canonical = canonical_name(value)
+            if not canonical:
+                continue
+            variants = entries.setdefault(canonical, {}).setdefault(column, [])
+            if value not in variants:
+                variants.append(value)
+                variants.sort()
+            self.max_words = max(self.max_words, canonical.count(" ") + 1)
+
+    def _matchable(self, canonical: str, original: list, first: bool) -> bool:
+        """Single words only match when they are written as names, not as question vocabulary."""
+        if " " in canonical:
+            return True
+        if canonical in STOPWORDS or canonical in COLUMN_SYNONYMS:
+            return False
+        word = original[0]
+        if word.isupper():
+            return len(word) >= 3
+        # Capitalization says nothing about the first word of a sentence
+        return not first and word[:1].isupper() and len(word) >= 4
+
+    def _lookup(self, words: list, original: list, first: bool):
+        """Returns {column: spellings} for a phrase of the question, or None."""
+        phrase = " ".join(words)
+        found = {}
+        entry = self.entries.get(phrase)
+        if entry and self._matchable(phrase, original, first):
+            found.update(entry)
+        expansion = AGENCY_ACRONYMS.get(phrase)
+        if expansion in self.entries:
+            # Acronyms stand for agencies, not vendors that happen to share the letters
+            for column, variants in self.entries[expansion].items():
+                if column in AGENCY_COLUMNS:
+                    found[column] = sorted(set(found.get(column, [])) | set(variants))
+        return found or None
+
+    def resolve(self, question: str) -> list:
+        """
+        Finds agency and vendor names in a question.
+
+        Args:
+            question: The user's question
+
+        Returns:
+            List of EntityMatch, one per name and column, in question order
+        """
+        text = question.replace("&", " and ").replace("'", "")
+        original = re.findall(r"[A-Za-z0-9]+", text)
+        words = name_words(text)
+        matches = []
+        index = 0
+        while index < len(words):
+            # Longest phrase first, so "Department of Energy" wins over "Energy"
+            entry = None
+            for size in range(min(self.max_words, len(words) - index), 0, -1):
+                entry = self._lookup(words[index:index + size], original[index:index + size], index == 0)
+                if entry:
+                    break
+            if not entry:
+                index += 1
+                continue
+            mention = " ".join(original[index:index + size])
+            matches.extend(EntityMatch(mention, column, tuple(variants)) for column, variants in entry.items()
+                           if len(variants) <= self.config["max_variants"])
+            index += size
+        return matches
+
+    # ------------------- Persistence -------------------
+    def save(self, path: str = None):
+        """Writes the index as JSON, replacing the previous file atomically."""
+        path = path or self.config["path"]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            payload = {"watermark": self.watermark, "refreshed_at": self.refreshed_at, "entries": self.entries}
+        with open(path + ".tmp", "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def load(self, path: str = None) -> bool:
+        """Loads a saved index; returns False when there is none or it cannot be read."""
+        path = path or self.config["path"]
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return False
+        entries = payload.get("entries", {})
+        with self._lock:
+            self.entries = entries
+            self.watermark = payload.get("watermark")
+            self.refreshed_at = payload.get("refreshed_at")
+            self.max_words = max((name.count(" ") + 1 for name in entries), default=0)
+        return True
+
+    # ------------------- Refresh -------------------
+    def refresh(self, full: bool = False) -> dict:
+        """
+        Reads names from tm_awards: every distinct name on a full rebuild (or
+        when the index is empty), otherwise only names on rows whose
+        last_modified_date is on or after the day of the previous refresh (it is
+        a date, so rows changed later that day would otherwise be missed; adding
+        a name twice changes nothing). The result is saved.
+
+        Args:
+            full: Rebuild from every distinct name
+
+        Returns:
+            Dictionary with the mode, names read and seconds taken
+        """
+        started = time.perf_counter()
+        full = full or not self.entries or self.watermark is None
+        rebuilt = EntityIndex(self.config)
+        if not full:
+            rebuilt.entries = {name: {column: list(variants) for column, variants in entry.items()}
+                               for name, entry in self.entries.items()}
+            rebuilt.max_words = self.max_words
+        names = 0
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            # A full rebuild scans every name; the pool's timeout is meant for interactive queries
+            cur.execute("SET LOCAL statement_timeout = 0")
+            cur.execute(f"SELECT max(last_modified_date)::text FROM {TABLE_NAME}")
+            watermark = cur.fetchone()[0]
+            for column in ENTITY_COLUMNS:
+                if full:
+                    cur.execute(f"SELECT DISTINCT {column} FROM {TABLE_NAME}")
+                else:
+                    cur.execute(f"SELECT DISTINCT {column} FROM {TABLE_NAME} WHERE last_modified_date >= %s",
+                                (self.watermark,))
+                values = [row[0] for row in cur.fetchall()]
+                names += len(values)
+                rebuilt.add(column, values)
+            conn.commit()
+        # Readers keep using the old entries until the new ones are complete
+        with self._lock:
+            self.entries, self.max_words = rebuilt.entries, rebuilt.max_words
+            self.watermark = watermark or self.watermark
+            self.refreshed_at = time.time()
+        self.save()
+        return {"mode": "full" if full else "incremental", "names_read": names, "entities": len(self.entries),
+                "seconds": round(time.perf_counter() - started, 3)}
+
+    def refresh_if_due(self):
+        """Starts a background refresh when the index is older than refresh_interval."""
+        with self._lock:
+            due = (self.refreshed_at is None
+                   or time.time() - self.refreshed_at >= self.config["refresh_interval"])
+            if not due or self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="entity-index-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            report = self.refresh()
+            logger.info("Entity index refreshed: %s", report)
+        except Exception as e:
+            logger.warning("Entity index refresh failed: %s", e)
+            # Wait a full interval before retrying
+            with self._lock:
+                self.refreshed_at = time.time()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entities": len(self.entries), "watermark": self.watermark, "refreshed_at": self.refreshed_at,
+                    "refreshing": self._refreshing}
+
+
+# Module state survives Streamlit reruns, so the index is loaded once per process
+_entity_index = None
+_entity_index_lock = threading.Lock()
+
+
+def get_entity_index() -> EntityIndex:
+    """Returns the process-wide entity index, loading the saved copy on first use."""
+    global _entity_index
+    if _entity_index is None:
+        with _entity_index_lock:
+            if _entity_index is None:
+                index = EntityIndex()
+                index.load()
+                _entity_index = index
+    return _entity_index
+
+
+def resolve_entities(question: str) -> list:
+    """
+    Resolves agency and vendor names in a question to their stored spellings,
+    refreshing the index in the background when it is due.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        List of EntityMatch (empty when resolution is disabled)
+    """
+    if not ENTITY_CONFIG["enabled"]:
+        return []
+    index = get_entity_index()
+    index.refresh_if_due()
+    return index.resolve(question)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the agency and vendor name index")
+    parser.add_argument("--full", action="store_true", help="rebuild from every distinct name")
+    parser.add_argument("--resolve", metavar="QUESTION", help="print the names resolved in a question and exit")
+    args = parser.parse_args()
+    index = get_entity_index()
+    if args.resolve:
+        for match in index.resolve(args.resolve):
+            print(f"{match.mention}: {sql_values(match.column, match.variants)}")
+        return
+    print(index.refresh(args.full))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
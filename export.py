@@ -0,0 +1,250 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+import pandas as pd
+from db import get_pool
+from schema import TABLE_NAME
+from paging import strip_sql, is_select
+from copy_fetch import NULL_MARKER, TYPE_KINDS, convert_column
+from result_cache import RESULT_CACHE_VERSION_SOURCE, sql_fingerprint, is_cacheable, read_table_version
+from single_flight import SingleFlight, COALESCE_REQUESTS
+from instrumentation import db_phase
+
+# pyarrow is optional; without it only CSV exports are available
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Export Configuration -------------------
+EXPORT_CONFIG = {
+    # Generated files are kept here and reused for the same query and table data
+    "path": os.getenv("EXPORT_CACHE_PATH", ".cache/exports"),
+    # Oldest files are deleted once the directory holds more than this
+    "max_bytes": int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))),
+    # Files used more recently than this many seconds are never deleted, so a download in progress survives
+    "min_age": float(os.getenv("EXPORT_CACHE_MIN_AGE", "300")),
+    "parquet_compression": os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd"),
+    # Rows per Parquet row group; also the rows held in memory while converting
+    "parquet_chunk_rows": int(os.getenv("EXPORT_PARQUET_CHUNK_ROWS", "100000")),
+}
+
+# Media type and file extension per export format
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Parquet column types by the kinds copy_fetch derives from PostgreSQL type OIDs
+ARROW_TYPES = {
+    "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+    "datetime": pa.timestamp("us"), "text": pa.string(),
+} if pa is not None else {}
+
+# A generated export: where it is, its format and size, and whether it was reused
+ExportFile = namedtuple("ExportFile", ["path", "format", "bytes", "cached"])
+
+# Identical exports requested at the same moment are generated once
+EXPORT_FLIGHTS = SingleFlight("export", COALESCE_REQUESTS)
+
+
+class ExportUnavailable(Exception):
+    """Raised for export formats whose optional dependency is not installed."""
+
+
+# ------------------- Writers -------------------
+def write_csv(conn, sql_query: str, path: str):
+    """
+    Streams a SELECT's result into a CSV file with a header row. psycopg2
+    writes the COPY stream to the file as it arrives, so the result is never
+    held in memory.
+    """
+    with open(path, "wb") as f, conn.cursor() as cur, db_phase("fetch"):
+        cur.copy_expert(f"COPY ({strip_sql(sql_query)}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+
+
+def write_parquet(conn, sql_query: str, path: str, config: dict = None):
+    """
+    Writes a SELECT's result as a compressed Parquet file. The rows are first
+    spooled to a temporary CSV file with COPY, then converted one row group at
+    a time; column types come from the result's PostgreSQL types.
+    """
+    config = config or EXPORT_CONFIG
+    query = strip_sql(sql_query)
+    with tempfile.TemporaryFile(dir=os.path.dirname(path)) as spool:
+        with conn.cursor() as cur:
+            with db_phase("execute"):
+                cur.execute(f"SELECT * FROM ({query}) AS describe_q LIMIT 0")
+                description = cur.description
+            with db_phase("fetch"):
+                cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '{NULL_MARKER}')", spool)
+        empty = spool.tell() == 0
+        spool.seek(0)
+        columns = [column.name for column in description]
+        kinds = [TYPE_KINDS.get(column.type_code, "text") for column in description]
+        schema = pa.schema([(column, ARROW_TYPES[kind]) for column, kind in zip(columns, kinds)])
+        with pq.ParquetWriter(path, schema, compression=config["parquet_compression"]) as writer:
+            if empty:
+                # An empty result is a file with the schema and no row groups
+                return
+            chunks = pd.read_csv(spool, header=None, dtype=object, na_values=[NULL_MARKER], keep_default_na=False,
+                                 encoding="utf-8", chunksize=config["parquet_chunk_rows"])
+            for chunk in chunks:
+                for i, kind in enumerate(kinds):
+                    if kind != "text":
+                        chunk[i] = convert_column(chunk[i], kind)
+                chunk.columns = columns
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# ------------------- Export Cache -------------------
+class ExportCache:
+    """
+    Export files on disk, named after the query fingerprint, the table's data
+    version and the format. A file is generated on the first request and
+    served again until the table changes or it is evicted; once the directory
+    outgrows max_bytes, the least recently used files are deleted.
+    """
+    def __init__(self, config: dict = None):
+        self.config = config or EXPORT_CONFIG
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, conn, sql_query: str, fmt: str) -> str:
+        if not is_cacheable(sql_query):
+            # Never reused, but still written and evicted like any other export
+            return uuid.uuid4().hex
+        version = read_table_version(conn, TABLE_NAME, RESULT_CACHE_VERSION_SOURCE)
+        return hashlib.sha256(f"{sql_fingerprint(sql_query)}|{version}|{fmt}".encode("utf-8")).hexdigest()[:32]
+
+    def export(self, sql_query: str, fmt: str = "csv", pool_name: str = "default") -> ExportFile:
+        """
+        Returns the export file for a query's full result, generating it if needed.
+
+        Args:
+            sql_query: The SELECT whose result is exported
+            fmt: "csv" or "parquet"
+            pool_name: Connection pool to run on ("default" or "background")
+
+        Returns:
+            ExportFile for the generated or reused file
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        if fmt == "parquet" and pa is None:
+            raise ExportUnavailable("Parquet export requires pyarrow")
+        if not is_select(sql_query):
+            raise ValueError("Only SELECT results can be exported")
+        directory = self.config["path"]
+        os.makedirs(directory, exist_ok=True)
+        with get_pool(pool_name).connection() as conn:
+            key = self._key(conn, sql_query, fmt)
+            path = os.path.join(directory, f"{key}.{FORMATS[fmt][1]}")
+            if os.path.exists(path):
+                # Marks the file as recently used for eviction
+                os.utime(path)
+                with self._lock:
+                    self.hits += 1
+                return ExportFile(path, fmt, os.path.getsize(path), True)
+
+            def generate():
+                partial = f"{path}.{uuid.uuid4().hex}.part"
+                try:
+                    if fmt == "csv":
+                        write_csv(conn, sql_query, partial)
+                    else:
+                        write_parquet(conn, sql_query, partial, self.config)
+                    os.replace(partial, path)
+                finally:
+                    if os.path.exists(partial):
+                        os.remove(partial)
+                return path
+
+            _, shared = EXPORT_FLIGHTS.do(path, generate)
+        with self._lock:
+            self.misses += 1
+        if not shared:
+            self.cleanup(keep=path)
+        return ExportFile(path, fmt, os.path.getsize(path), shared)
+
+    def cleanup(self, keep: str = None) -> int:
+        """
+        Deletes least recently used files until the directory fits within
+        max_bytes, sparing files used within min_age seconds. Partial files left
+        by an interrupted export are deleted once they are older than that.
+
+        Args:
+            keep: A path never to delete (the file just generated)
+
+        Returns:
+            Number of files deleted
+        """
+        directory = self.config["path"]
+        now = time.time()
+        files = []
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for mtime, size, path in sorted(files):
+            recent = now - mtime < self.config["min_age"]
+            if path.endswith(".part"):
+                # Still being written, unless it is old
+                evict = not recent
+            else:
+                evict = total > self.config["max_bytes"] and not recent and path != keep
+            if not evict:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+        if deleted:
+            with self._lock:
+                self.evictions += deleted
+            logger.info("Export cache deleted %d files", deleted)
+        return deleted
+
+    def stats(self) -> dict:
+        """
+        Returns cache counters for monitoring.
+
+        Returns:
+            Dictionary with hits, misses, files, bytes on disk and evictions
+        """
+        directory = self.config["path"]
+        sizes = [entry.stat().st_size for entry in os.scandir(directory)
+                 if entry.is_file()] if os.path.isdir(directory) else []
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "files": len(sizes), "bytes": sum(sizes),
+                    "max_bytes": self.config["max_bytes"], "evictions": self.evictions,
+                    "parquet": pa is not None}
+
+
+# Module state survives Streamlit reruns, so the counters are kept once per process
+_export_cache = None
+_export_cache_lock = threading.Lock()
+
+
+def get_export_cache() -> ExportCache:
+    """Returns the process-wide export cache, creating it on first use."""
+    global _export_cache
+    if _export_cache is None:
+        with _export_cache_lock:
+            if _export_cache is None:
+                _export_cache = ExportCache()
+    return _export_cache
@@ -0,0 +1,307 @@
+import os
+import re
+from collections import namedtuple
+from schema import TABLE_NAME, COLUMN_DEFINITIONS
+from answer_templates import LIST_FIELDS
+from sql_ast import SelectQuery, parse_select, render_select, output_name, is_aggregate, base_table
+
+# ------------------- Follow-up Rewrite Configuration -------------------
+# Set FOLLOWUP_REWRITES=0 to send every follow-up question to the LLM
+FOLLOWUP_REWRITES = os.getenv("FOLLOWUP_REWRITES", "1") != "0"
+
+# Words that name a column in follow-ups, besides the column names themselves
+COLUMN_ALIASES = {
+    "amount": "total_obligation",
+    "dollar amount": "total_obligation",
+    "obligation": "total_obligation",
+    "obligated amount": "total_obligation",
+    "spending": "total_obligation",
+    "value": "base_and_all_options",
+    "contract value": "base_and_all_options",
+    "ceiling": "base_and_all_options",
+    "exercised options": "base_exercised_options",
+    "agency": "awarding_agency_name",
+    "awarding agency": "awarding_agency_name",
+    "department": "awarding_agency_name",
+    "sub agency": "awarding_sub_agency_name",
+    "subagency": "awarding_sub_agency_name",
+    "office": "awarding_agency_office_name",
+    "recipient": "recipient_name",
+    "contractor": "recipient_name",
+    "vendor": "recipient_name",
+    "company": "recipient_name",
+    "awardee": "recipient_name",
+    "uei": "recipient_uei",
+    "parent company": "parent_recipient_name",
+    "naics code": "naics",
+    "industry": "naics_description",
+    "date": "date_signed",
+    "signed date": "date_signed",
+    "signing date": "date_signed",
+    "expiration date": "end_date",
+    "last modified": "last_modified_date",
+    "state": "state_code",
+    "city": "primary_place_of_performance_city_name",
+    "country": "country_name",
+    "title": "description",
+    "psc": "product_or_service_code",
+    "product code": "product_or_service_code",
+    "service code": "product_or_service_code",
+    "task order id": "piid",
+    "pricing": "type_of_contract_pricing",
+    "set aside": "type_of_set_aside",
+    "offers": "number_of_offers_received",
+}
+
+# Every phrase naming a column: aliases, column names with spaces and raw column names
+COLUMN_PHRASES = {**{name.replace("_", " "): name for name in COLUMN_DEFINITIONS},
+                  **{name: name for name in COLUMN_DEFINITIONS}, **COLUMN_ALIASES}
+
+# Words naming the single aggregate of a grouped result, e.g. "sort them by count"
+AGGREGATE_SORT_WORDS = ["count", "number", "total", "sum", "average"]
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                "nine": 9, "ten": 10, "twenty": 20, "fifty": 50, "hundred": 100}
+_NUMBER = r"(?P<n>\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+DESCENDING_PATTERN = (r"desc(?:ending)?|(?:highest|largest|biggest|most recent|newest|latest)(?:\s+ones?)?\s+first"
+                      r"|high(?:est)?\s+to\s+low(?:est)?")
+ASCENDING_PATTERN = (r"asc(?:ending)?|(?:lowest|smallest|oldest|earliest)(?:\s+ones?)?\s+first"
+                     r"|low(?:est)?\s+to\s+high(?:est)?|alphabetical(?:ly)?")
+LIMIT_PATTERNS = [rf"\b(?P<word>top|first|limit(?:\s+(?:it|them|to))*|only|just)\s+{_NUMBER}\b",
+                  rf"\b{_NUMBER}\s+of\s+(?:them|those|these)\b"]
+SORT_VERB_PATTERN = r"\b(?:sort|order|rank)(?:ed)?\b"
+LIST_PATTERN = r"\b(?:list|show|display|give|name|see|what\s+(?:are|were)|details?|info(?:rmation)?)\b"
+REFERENCE_PATTERN = r"\b(?:them|those|these|they|it|same|above|previous|prior|results?)\b"
+ADD_PATTERN = r"\b(?:also|too|as\s+well|include|including|add|plus|along\s+with|with)\b"
+ONLY_PATTERN = r"\b(?:only|just|instead)\b"
+# "show all of them" asks for every row, past the previous query's LIMIT
+ALL_PATTERN = r"\ball\b"
+_COUNT_DISTINCT = re.compile(r"\s*count\s*\(\s*distinct\s+((?:\"?\w+\"?\.)?\"?[a-z_][\w$]*\"?)\s*\)"
+                             r"(?:\s+(?:as\s+)?\"?[a-z_][\w$]*\"?)?\s*", re.IGNORECASE)
+
+# Words a follow-up may contain besides the parts it was recognised from;
+# any other word (a name, a year, a new condition) sends the question to the LLM
+FILLER_WORDS = {
+    "please", "can", "could", "would", "will", "you", "i", "id", "like", "want", "need", "to", "let", "me",
+    "us", "now", "then", "again", "the", "a", "an", "of", "and", "for", "each", "every", "their",
+    "its", "are", "is", "rows", "records", "entries", "ones", "contracts", "contract", "awards", "award",
+    "task", "orders", "order", "in",
+}
+
+# A rewritten follow-up: the SQL to run, what kind of rewrite it was, a short
+# description, and whether the previous result was grouped (so its rows are groups)
+FollowUp = namedtuple("FollowUp", ["sql", "kind", "description", "grouped"])
+
+
+def _phrase_pattern(phrases) -> str:
+    """Alternation of phrases, longest first, allowing plural forms and flexible spacing."""
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return "|".join(re.escape(phrase).replace(r"\ ", r"\s+") + r"(?:s|es)?" for phrase in ordered)
+
+
+def _consume(pattern: str, text: str):
+    """Returns the first match of pattern in text and the text with that match blanked out."""
+    match = re.search(pattern, text)
+    if match is None:
+        return None, text
+    return match, text[:match.start()] + " " + text[match.end():]
+
+
+def _sort_target(phrase: str, query, phrase_columns: dict):
+    """
+    Returns the ORDER BY expression for a sort phrase on the previous query, or
+    None when the result cannot be sorted that way without the LLM.
+    """
+    outputs = [output_name(column) for column in query.columns]
+    phrase = re.sub(r"\s+", " ", phrase)
+    if query.group_by:
+        # Grouped results sort by one of their output columns
+        aggregates = [name for column, name in zip(query.columns, outputs)
+                      if re.fullmatch(r"[a-z_][\w$]*", name) and name not in query.group_by
+                      and column.strip().lower() != name]
+        if phrase in AGGREGATE_SORT_WORDS or phrase.rstrip("s") in AGGREGATE_SORT_WORDS:
+            return aggregates[0] if len(aggregates) == 1 else None
+        if phrase.replace(" ", "_") in outputs:
+            return phrase.replace(" ", "_")
+        column = phrase_columns.get(phrase)
+        if column in outputs:
+            return column
+        matching = [name for expr, name in zip(query.columns, outputs)
+                    if name in aggregates and column and re.search(rf"\b{column}\b", expr, re.IGNORECASE)]
+        return matching[0] if len(matching) == 1 else None
+    column = phrase_columns.get(phrase)
+    if column is None or (query.distinct and column not in outputs and "*" not in query.columns):
+        # SELECT DISTINCT can only be ordered by selected columns
+        return None
+    return column
+
+
+def _lookup(phrase: str, phrases):
+    """Returns the known phrase a matched, possibly plural, phrase stands for."""
+    phrase = re.sub(r"\s+", " ", phrase)
+    for candidate in (phrase, phrase[:-1], phrase[:-2]):
+        if candidate in phrases:
+            return candidate
+    return None
+
+
+def rewrite_followup(question: str, previous_sql: str):
+    """
+    Rewrites the previous query for a follow-up question that only changes how
+    its result is presented, so no LLM call is needed. Recognised follow-ups:
+    - listing the records behind a count or total ("list those 12 contracts", "show them")
+    - adding or swapping projected columns ("also show the amounts", "only the recipient names")
+    - sorting ("sort them by date signed, newest first", "top 5 by amount")
+    - limiting ("just the first 10") or lifting the previous limit ("show all of them")
+    A limited result is re-sorted as a subquery, so it keeps the same rows.
+    Questions with any other words, such as a new filter, return None.
+
+    Args:
+        question: The user's follow-up question
+        previous_sql: The SQL that answered the previous question
+
+    Returns:
+        FollowUp with the rewritten SQL, or None when the question needs the LLM
+    """
+    if not FOLLOWUP_REWRITES or not previous_sql:
+        return None
+    query = parse_select(previous_sql)
+    if query is None or base_table(query) != TABLE_NAME:
+        return None
+    grouped = bool(query.group_by)
+    scalar = is_aggregate(query) and not grouped
+
+    text = question.lower()
+    # "those 12 contracts" repeats the previous count rather than asking for 12 rows
+    text = re.sub(r"\b(those|these|the|all)\s+\d[\d,]*\b", r"\1", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+
+    descending, text = _consume(rf"\b(?:{DESCENDING_PATTERN})\b", text)
+    ascending, text = _consume(rf"\b(?:{ASCENDING_PATTERN})\b", text)
+    limit = limit_word = None
+    for pattern in LIMIT_PATTERNS:
+        match, text = _consume(pattern, text)
+        if match:
+            limit = int(NUMBER_WORDS.get(match.group("n"), match.group("n")))
+            limit_word = match.groupdict().get("word")
+            break
+
+    # Phrases naming a column, plus the previous query's output names for sorting grouped results
+    phrase_columns = dict(COLUMN_PHRASES)
+    sort_phrases = list(phrase_columns)
+    if grouped:
+        sort_phrases += AGGREGATE_SORT_WORDS + [name.replace("_", " ") for name in map(output_name, query.columns)]
+    sort_match, text = _consume(rf"(?:{SORT_VERB_PATTERN}\s+(?:(?:them|those|these|it|the\s+results?)\s+)?)?"
+                                rf"\bby\s+(?:the\s+|their\s+|its\s+)?(?P<phrase>{_phrase_pattern(sort_phrases)})\b",
+                                text)
+    sort_by = None
+    if sort_match:
+        phrase = _lookup(sort_match.group("phrase"), set(sort_phrases)) or sort_match.group("phrase")
+        sort_by = _sort_target(phrase, query, phrase_columns)
+        if sort_by is None:
+            return None
+    elif descending or ascending:
+        # A direction without a recognised sort column
+        return None
+
+    # Remaining column mentions change the projection
+    columns = []
+    while True:
+        match, text = _consume(rf"\b(?:{_phrase_pattern(phrase_columns)})\b", text)
+        if match is None:
+            break
+        column = phrase_columns[_lookup(match.group(0), phrase_columns)]
+        if column not in columns:
+            columns.append(column)
+
+    text, listed = re.subn(LIST_PATTERN, " ", text)
+    text, references = re.subn(REFERENCE_PATTERN, " ", text)
+    text, adds = re.subn(ADD_PATTERN, " ", text)
+    text, only = re.subn(ONLY_PATTERN, " ", text)
+    text, everything = re.subn(ALL_PATTERN, " ", text)
+    if any(word not in FILLER_WORDS for word in text.split()):
+        return None
+    details = re.search(r"\bdetails?\b", question, re.IGNORECASE) is not None
+
+    # The question must refer to the previous result, not just ask for records afresh
+    if not (references or details or sort_by or limit is not None or (columns and (adds or only))):
+        return None
+    if not (listed or sort_by or limit is not None or columns):
+        return None
+    if grouped and columns:
+        return None
+    if scalar and query.having:
+        return None
+
+    kinds, described = [], []
+    rewritten = query
+    distinct_count = _COUNT_DISTINCT.fullmatch(query.columns[0]) if scalar and len(query.columns) == 1 else None
+    if distinct_count:
+        # A count of distinct values becomes the list of those values, so it matches the count
+        column = output_name(distinct_count.group(1))
+        if columns or (sort_by and sort_by != column):
+            return None
+        rewritten = query._replace(distinct=True, columns=(column,), order_by=(column,), limit=None, offset=None)
+        kinds.append("list")
+        described.append(f"listed the distinct {column} values behind the previous count")
+    elif scalar:
+        if any(re.search(r"\bdistinct\b", column, re.IGNORECASE) for column in query.columns):
+            return None
+        # A count or total becomes the list of records it was computed over
+        rewritten = query._replace(distinct=False, columns=tuple(LIST_FIELDS), order_by=(), limit=None, offset=None)
+        kinds.append("list")
+        described.append("listed the records behind the previous count")
+    elif details and not grouped and not query.distinct and "*" not in query.columns:
+        outputs = [output_name(column) for column in query.columns]
+        missing = [field for field in LIST_FIELDS if field not in outputs]
+        if missing:
+            rewritten = rewritten._replace(columns=tuple(missing) + rewritten.columns)
+            kinds.append("list")
+            described.append("added the contract detail fields")
+
+    if columns:
+        outputs = [output_name(column) for column in rewritten.columns]
+        if only:
+            rewritten = rewritten._replace(columns=tuple(columns))
+            described.append("showing only " + ", ".join(columns))
+        elif "*" not in rewritten.columns:
+            added = [column for column in columns if column not in outputs]
+            rewritten = rewritten._replace(columns=rewritten.columns + tuple(added))
+            if added:
+                described.append("added " + ", ".join(added))
+        kinds.append("projection")
+
+    if everything and rewritten.limit is not None and limit is None:
+        rewritten = rewritten._replace(limit=None, offset=None)
+        kinds.append("all")
+        described.append(f"removed the previous limit of {query.limit:,} rows")
+
+    if sort_by:
+        # "top 5 by amount" means the largest first
+        desc = descending is not None or (ascending is None and limit_word == "top")
+        order_by = (f"{sort_by} DESC NULLS LAST" if desc else f"{sort_by} ASC",)
+        if rewritten.limit is not None or rewritten.offset:
+            # Re-sorting a limited result re-sorts the same rows, so the previous query becomes a subquery
+            if sort_by not in [output_name(column) for column in rewritten.columns] and "*" not in rewritten.columns:
+                return None
+            rewritten = SelectQuery(False, ("*",), f"({render_select(rewritten)}) AS previous", None, (), None,
+                                    order_by, None, None)
+        else:
+            rewritten = rewritten._replace(order_by=order_by)
+        kinds.append("sort")
+        described.append(f"sorted by {sort_by} {'descending' if desc else 'ascending'}")
+
+    if limit is not None:
+        # A limit narrows the previous result; it never reaches past the rows it had
+        if query.limit is not None and not everything:
+            limit = min(limit, query.limit)
+        rewritten = rewritten._replace(limit=limit, offset=None)
+        kinds.append("limit")
+        described.append(f"limited to {limit:,} rows")
+
+    if not kinds:
+        # A plain "show them" re-runs the previous query
+        kinds.append("repeat")
+        described.append("repeated the previous query")
+    return FollowUp(render_select(rewritten), "+".join(kinds), "; ".join(described), grouped)
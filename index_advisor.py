@@ -0,0 +1,326 @@
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from collections import namedtuple, Counter
+from db import get_pool, create_index_concurrently
+from schema import TABLE_NAME, COLUMN_DEFINITIONS
+from sql_ast import parse_select, base_table, split_top_level
+from instrumentation import TRACE_LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Index Advisor Configuration -------------------
+ADVISOR_CONFIG = {
+    # A column must be used this many times in the log before an index is proposed
+    "min_uses": int(os.getenv("INDEX_ADVISOR_MIN_USES", "2")),
+}
+
+# Proposed index: "trigram" (GIN with gin_trgm_ops, serving LIKE/ILIKE/regex
+# matches anywhere in the text) or "btree" (equality, ranges and sorting).
+# `order` is the key's sort order for B-tree indexes, e.g. "DESC NULLS LAST".
+IndexProposal = namedtuple("IndexProposal", ["name", "column", "method", "order", "uses", "reasons"])
+
+_COLUMN = r"(?:\"?" + TABLE_NAME + r"\"?\.)?\"?([a-z_][a-z0-9_]*)\"?"
+_PATTERN_MATCH = re.compile(rf"\b{_COLUMN}\s*(?:NOT\s+)?(?:I?LIKE|~~\*?|~\*?|SIMILAR\s+TO)\s",
+                            re.IGNORECASE)
+_COMPARISON = re.compile(rf"\b{_COLUMN}\s*(?:=|<>|!=|<=|>=|<|>|\s(?:NOT\s+)?(?:BETWEEN|IN)\b)",
+                         re.IGNORECASE)
+_ORDER_ITEM = re.compile(rf"\s*{_COLUMN}\s*((?:ASC|DESC)?(?:\s+NULLS\s+(?:FIRST|LAST))?)\s*", re.IGNORECASE)
+
+
+def is_text_column(column: str) -> bool:
+    return COLUMN_DEFINITIONS.get(column, "").endswith("String")
+
+
+# ------------------- Query Log -------------------
+def load_query_log(paths) -> list:
+    """
+    Reads executed SQL from request trace logs (TRACE_LOG_PATH files, where the
+    guard span carries the SQL that was run) or from plain SQL files with
+    statements separated by semicolons.
+
+    Args:
+        paths: Files to read
+
+    Returns:
+        List of SQL statements, one entry per execution
+    """
+    queries = []
+    for path in paths:
+        with open(path) as f:
+            text = f.read()
+        for line in text.splitlines():
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                sql_query = json.loads(line).get("stages", {}).get("guard", {}).get("sql")
+            except ValueError:
+                continue
+            if sql_query:
+                queries.append(sql_query)
+        if not text.lstrip().startswith("{"):
+            queries.extend(part.strip() for part in split_top_level(text, ";") if part.strip())
+    return queries
+
+
+# ------------------- Column Usage -------------------
+def reads_table(sql_query: str) -> bool:
+    """Whether the statement is a single SELECT over tm_awards (rollup queries are not)."""
+    query = parse_select(sql_query)
+    return query is not None and base_table(query) == TABLE_NAME
+
+
+def column_usage(queries) -> dict:
+    """
+    Counts how tm_awards columns are used across queries.
+
+    Args:
+        queries: SQL statements
+
+    Returns:
+        Dictionary of usage kind ("pattern", "filter", "sort", "group") to a
+        Counter of column names; sort usage also records the sort order under
+        "sort_order" as (column, order) pairs
+    """
+    usage = {kind: Counter() for kind in ("pattern", "filter", "sort", "group", "sort_order")}
+    for sql_query in queries:
+        if not reads_table(sql_query):
+            continue
+        query = parse_select(sql_query)
+        where = " ".join(filter(None, [query.where, query.having]))
+        # String contents could look like column names or operators
+        where = re.sub(r"'(?:[^']|'')*'", "'' ", where)
+        # LOWER(column) LIKE ... is not counted: an index on the column itself cannot serve it
+        usage["pattern"].update(set(_PATTERN_MATCH.findall(where)) & set(COLUMN_DEFINITIONS))
+        usage["filter"].update(set(_COMPARISON.findall(where)) & set(COLUMN_DEFINITIONS))
+        for item in query.order_by:
+            match = _ORDER_ITEM.fullmatch(item)
+            if match and match.group(1).lower() in COLUMN_DEFINITIONS:
+                usage["sort"][match.group(1).lower()] += 1
+                order = re.sub(r"\s+", " ", match.group(2).upper()).strip()
+                usage["sort_order"][(match.group(1).lower(), "" if order == "ASC" else order)] += 1
+        for item in query.group_by:
+            column = item.strip().strip('"').lower()
+            if column in COLUMN_DEFINITIONS:
+                usage["group"][column] += 1
+    return usage
+
+
+def propose_indexes(queries, min_uses: int = None) -> list:
+    """
+    Proposes indexes for the columns the queries filter, sort and group on.
+    Text columns matched with LIKE/ILIKE (the prompt tells the model to use
+    ILIKE for text filters) get a pg_trgm GIN index, which a B-tree cannot
+    replace for '%...%' patterns. Columns compared, sorted or grouped get a
+    B-tree index, in the most common sort order.
+
+    Args:
+        queries: Executed SQL statements
+        min_uses: Minimum uses of a column before it gets an index
+
+    Returns:
+        List of IndexProposal, most used first
+    """
+    min_uses = ADVISOR_CONFIG["min_uses"] if min_uses is None else min_uses
+    usage = column_usage(queries)
+    proposals = []
+    for column, uses in usage["pattern"].items():
+        if uses >= min_uses and is_text_column(column):
+            proposals.append(IndexProposal(f"{TABLE_NAME}_{column}_trgm_idx", column, "trigram", "", uses,
+                                           ("pattern match",)))
+    btree_uses = usage["filter"] + usage["sort"] + usage["group"]
+    for column, uses in btree_uses.items():
+        if uses < min_uses:
+            continue
+        reasons = tuple(reason for kind, reason in (("filter", "comparison"), ("sort", "sort"), ("group", "group"))
+                        if usage[kind][column])
+        orders = [(count, order) for (name, order), count in usage["sort_order"].items() if name == column]
+        order = max(orders)[1] if orders else ""
+        # A B-tree is read backwards for the reverse order, so only these two need their own key order
+        if order not in ("DESC NULLS LAST", "NULLS FIRST"):
+            order = ""
+        proposals.append(IndexProposal(f"{TABLE_NAME}_{column}_idx", column, "btree", order, uses, reasons))
+    return sorted(proposals, key=lambda proposal: (-proposal.uses, proposal.name))
+
+
+def index_key(proposal: IndexProposal) -> str:
+    """Returns the method and key of a proposal's index, as written after ON tm_awards."""
+    if proposal.method == "trigram":
+        return f"USING gin ({proposal.column} gin_trgm_ops)"
+    return f"({proposal.column}{' ' + proposal.order if proposal.order else ''})"
+
+
+def index_ddl(proposal: IndexProposal, concurrently: bool = True) -> str:
+    """
+    Returns the idempotent CREATE INDEX statement for a proposal. On a
+    partitioned tm_awards apply_indexes() builds the concurrent form per
+    partition instead.
+    """
+    return (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {proposal.name} "
+            f"ON {TABLE_NAME} {index_key(proposal)}")
+
+
+# ------------------- Migration -------------------
+def existing_indexes(conn) -> dict:
+    """Returns {index name: (definition, valid)} for the indexes on tm_awards."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisvalid FROM pg_index i "
+                    "JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = to_regclass(%s)", (TABLE_NAME,))
+        return {name: (definition, valid) for name, definition, valid in cur.fetchall()}
+
+
+def covering_index(proposal: IndexProposal, indexes: dict):
+    """Returns the name of an existing valid index that already serves the proposal, or None."""
+    for name, (definition, valid) in indexes.items():
+        if not valid:
+            continue
+        if proposal.method == "trigram":
+            covered = re.search(rf"USING gin \({proposal.column} gin_trgm_ops", definition)
+        else:
+            covered = re.search(rf"USING btree \({proposal.column}[ ,)]", definition)
+        if covered:
+            return name
+    return None
+
+
+def apply_indexes(conn, proposals) -> list:
+    """
+    Creates the proposed indexes with CREATE INDEX CONCURRENTLY, so tm_awards
+    stays writable. When tm_awards is partitioned, each index is built
+    concurrently per partition and attached to a parent index (see
+    db.create_index_concurrently). Re-running is safe: indexes that exist (or
+    equivalent ones under another name) are skipped, and interrupted builds
+    are resumed.
+
+    Args:
+        conn: Database connection; switched to autocommit while indexes are built
+        proposals: IndexProposal list
+
+    Returns:
+        One dictionary per proposal with its name, status and seconds taken
+    """
+    results = []
+    conn.rollback()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            # Index builds scan the whole table; the pool's timeout is meant for interactive queries
+            cur.execute("SET statement_timeout = 0")
+            if any(proposal.method == "trigram" for proposal in proposals):
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for proposal in proposals:
+                indexes = existing_indexes(conn)
+                covering = covering_index(proposal, indexes)
+                if covering:
+                    results.append({"index": proposal.name, "status": f"exists ({covering})", "seconds": 0.0})
+                    continue
+                started = time.perf_counter()
+                status = create_index_concurrently(cur, proposal.name, TABLE_NAME, index_key(proposal))
+                results.append({"index": proposal.name, "status": status,
+                                "seconds": round(time.perf_counter() - started, 3)})
+            cur.execute("RESET statement_timeout")
+    finally:
+        conn.autocommit = False
+    return results
+
+
+# ------------------- Speedup Report -------------------
+def _explain_analyze(cur, sql_query: str) -> dict:
+    cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql_query.strip().rstrip(';')}")
+    plan = cur.fetchone()[0][0]
+    return {"cost": plan["Plan"]["Total Cost"], "ms": plan["Execution Time"]}
+
+
+def speedup_report(conn, queries, proposals, repeat: int = 3) -> list:
+    """
+    Measures each query with EXPLAIN ANALYZE before and after building the
+    proposed indexes, inside a transaction that is rolled back, so the database
+    is left as it was. Each query runs `repeat` times per side and the fastest
+    run is kept. Meant for a local fixture: the queries really execute.
+
+    Args:
+        conn: Database connection
+        queries: Distinct SQL statements to measure
+        proposals: IndexProposal list
+        repeat: Runs per query and side
+
+    Returns:
+        One dictionary per query with planner cost and execution time before
+        and after, and the estimated (cost) and actual (time) speedups
+    """
+    report = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = 0")
+            before = {sql_query: min((_explain_analyze(cur, sql_query) for _ in range(repeat)),
+                                     key=lambda run: run["ms"]) for sql_query in queries}
+            if any(proposal.method == "trigram" for proposal in proposals):
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for proposal in proposals:
+                cur.execute(index_ddl(proposal, concurrently=False))
+            cur.execute(f"ANALYZE {TABLE_NAME}")
+            for sql_query in queries:
+                after = min((_explain_analyze(cur, sql_query) for _ in range(repeat)), key=lambda run: run["ms"])
+                old = before[sql_query]
+                report.append({
+                    "sql": sql_query,
+                    "cost_before": old["cost"], "cost_after": after["cost"],
+                    "ms_before": round(old["ms"], 3), "ms_after": round(after["ms"], 3),
+                    "estimated_speedup": round(old["cost"] / after["cost"], 2) if after["cost"] else None,
+                    "actual_speedup": round(old["ms"] / after["ms"], 2) if after["ms"] else None,
+                })
+    finally:
+        conn.rollback()
+    return report
+
+
+def print_report(proposals, report=None, applied=None):
+    print(f"{'index':<56}{'method':>9}{'uses':>6}  reasons")
+    for proposal in proposals:
+        print(f"{proposal.name:<56}{proposal.method:>9}{proposal.uses:>6}  {', '.join(proposal.reasons)}")
+        print(f"    {index_ddl(proposal)}")
+    for result in applied or []:
+        print(f"{result['index']}: {result['status']} in {result['seconds']}s")
+    if report:
+        print(f"\n{'cost before':>14}{'cost after':>14}{'est. x':>9}{'ms before':>12}{'ms after':>12}{'actual x':>10}  query")
+        for row in report:
+            print(f"{row['cost_before']:>14.1f}{row['cost_after']:>14.1f}{row['estimated_speedup'] or 0:>9.2f}"
+                  f"{row['ms_before']:>12.2f}{row['ms_after']:>12.2f}{row['actual_speedup'] or 0:>10.2f}  "
+                  f"{row['sql'][:80]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose and apply tm_awards indexes from the executed-SQL log")
+    parser.add_argument("logs", nargs="*", help="trace logs or SQL files (default: TRACE_LOG_PATH)")
+    parser.add_argument("--min-uses", type=int, default=ADVISOR_CONFIG["min_uses"],
+                        help="uses of a column before it gets an index")
+    parser.add_argument("--apply", action="store_true", help="create the proposed indexes")
+    parser.add_argument("--report", action="store_true",
+                        help="EXPLAIN ANALYZE the logged queries with and without the indexes (rolled back)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query and side in the report")
+    args = parser.parse_args()
+
+    paths = args.logs or ([TRACE_LOG_PATH] if TRACE_LOG_PATH else [])
+    if not paths:
+        parser.error("no query log given and TRACE_LOG_PATH is not set")
+    queries = load_query_log(paths)
+    proposals = propose_indexes(queries, args.min_uses)
+    report = applied = None
+    if args.report or args.apply:
+        with get_pool().connection() as conn:
+            if args.report:
+                distinct = list(dict.fromkeys(query for query in queries if reads_table(query)))
+                report = speedup_report(conn, distinct, proposals, args.repeat)
+            if args.apply:
+                applied = apply_indexes(conn, proposals)
+    print(f"{len(queries)} logged queries")
+    print_report(proposals, report, applied)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Tracing Configuration -------------------
+# Finished request traces are appended to this file as JSON lines when set
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROWS_BUCKETS = (0, 1, 5, 20, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS = (1024, 16384, 131072, 1048576, 8388608, 67108864, 268435456)
+
+# Database time is split into these phases
+DB_PHASES = ("wait", "execute", "fetch")
+
+
+# ------------------- Metrics -------------------
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format."""
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, rendered in Prometheus text format."""
+    def __init__(self, name: str, documentation: str, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else repr(float(bound))
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+# Process-wide metrics; module state survives Streamlit reruns and API requests
+STAGE_SECONDS = Histogram("govsearch_stage_seconds", "Wall time per pipeline stage",
+                          SECONDS_BUCKETS, ["stage"])
+DB_SECONDS = Histogram("govsearch_db_seconds", "Database time split into pool wait, execute and fetch",
+                       SECONDS_BUCKETS, ["phase"])
+LLM_TOKENS = Counter("govsearch_llm_tokens_total", "Prompt and completion tokens per stage",
+                     ["stage", "kind"])
+RESULT_ROWS = Histogram("govsearch_result_rows", "Rows returned per executed query", ROWS_BUCKETS)
+RESULT_BYTES = Histogram("govsearch_result_bytes", "In-memory size of query results", BYTES_BUCKETS)
+CACHE_REQUESTS = Counter("govsearch_cache_requests_total", "Cache lookups by cache and outcome",
+                         ["cache", "outcome"])
+REQUESTS = Counter("govsearch_requests_total", "Questions processed by outcome", ["status"])
+FOLLOWUP_REWRITES = Counter("govsearch_followup_rewrites_total",
+                            "Follow-up questions answered by rewriting the previous SQL, by kind", ["kind"])
+COALESCED_CALLS = Counter("govsearch_coalesced_calls_total",
+                          "Calls that shared an identical in-flight call instead of running their own, by layer",
+                          ["layer"])
+METRICS = [STAGE_SECONDS, DB_SECONDS, LLM_TOKENS, RESULT_ROWS, RESULT_BYTES, CACHE_REQUESTS, REQUESTS,
+           FOLLOWUP_REWRITES, COALESCED_CALLS]
+
+
+def render_prometheus(extra_gauges: dict = None) -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+
+    Args:
+        extra_gauges: Optional {name: (documentation, {label dict as tuple of pairs: value})}
+            for point-in-time values such as pool usage
+
+    Returns:
+        The metrics page as text
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, (documentation, samples) in (extra_gauges or {}).items():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples.items():
+            names, values = zip(*labels) if labels else ((), ())
+            lines.append(f"{name}{_labels(names, values)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ------------------- Request Tracing -------------------
+class RequestTrace:
+    """
+    Timing and size details for one question: a span per pipeline stage with
+    its wall time and attributes (token counts, rows, bytes, cache hits), plus
+    database time split into pool wait, execute and fetch.
+    """
+    def __init__(self, session_id: str = None, question: str = None):
+        self.trace_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.question = question
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.spans = {}
+        self.db_ms = {phase: 0.0 for phase in DB_PHASES}
+        self.status = "ok"
+        self._lock = threading.Lock()
+
+    def _span(self, stage: str) -> dict:
+        return self.spans.setdefault(stage, {"start_ms": None, "duration_ms": 0.0, "attributes": {}})
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Times a pipeline stage; repeated stages accumulate."""
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                span = self._span(stage)
+                if span["start_ms"] is None:
+                    span["start_ms"] = round((started - self._start) * 1000, 2)
+                span["duration_ms"] += elapsed * 1000
+            STAGE_SECONDS.observe(elapsed, stage=stage)
+
+    def set(self, stage: str, **attributes):
+        """Attaches attributes to a stage's span."""
+        with self._lock:
+            self._span(stage)["attributes"].update(attributes)
+
+    def add_db_time(self, phase: str, seconds: float):
+        with self._lock:
+            self.db_ms[phase] += seconds * 1000
+
+    def finish(self, status: str = None) -> dict:
+        """
+        Closes the trace, counts the request and exports it as a JSON span.
+
+        Returns:
+            The trace as a dictionary
+        """
+        if status:
+            self.status = status
+        REQUESTS.inc(status=self.status)
+        trace = self.to_dict()
+        line = json.dumps(trace, default=str)
+        logger.info(line)
+        if TRACE_LOG_PATH:
+            with _trace_file_lock, open(TRACE_LOG_PATH, "a") as f:
+                f.write(line + "\n")
+        return trace
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "session_id": self.session_id,
+                "question": self.question,
+                "started": self.started,
+                "status": self.status,
+                "total_ms": round((time.perf_counter() - self._start) * 1000, 2),
+                "stages": {stage: {"start_ms": span["start_ms"], "duration_ms": round(span["duration_ms"], 2),
+                                   **span["attributes"]}
+                           for stage, span in self.spans.items()},
+                "db_ms": {phase: round(ms, 2) for phase, ms in self.db_ms.items()},
+            }
+
+
+_trace_file_lock = threading.Lock()
+
+# The trace of the request being processed; copied into worker threads by asyncio.to_thread
+_current_trace = ContextVar("govsearch_trace", default=None)
+
+
+def start_trace(session_id: str = None, question: str = None) -> RequestTrace:
+    """Starts a trace and makes it current for this thread or task."""
+    trace = RequestTrace(session_id, question)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    """Returns the current RequestTrace, or None outside a traced request."""
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Times a stage on the current trace; only the metric is recorded outside a trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        with trace.stage(name):
+            yield trace
+        return
+    started = time.perf_counter()
+    try:
+        yield None
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+def record(stage_name: str, **attributes):
+    """Attaches attributes to a stage of the current trace and updates the matching metrics."""
+    for kind in ("prompt", "completion"):
+        if attributes.get(f"{kind}_tokens") is not None:
+            LLM_TOKENS.inc(attributes[f"{kind}_tokens"], stage=stage_name, kind=kind)
+    if attributes.get("rows") is not None:
+        RESULT_ROWS.observe(attributes["rows"])
+    if attributes.get("bytes") is not None:
+        RESULT_BYTES.observe(attributes["bytes"])
+    for cache in ("sql", "result"):
+        if attributes.get(f"{cache}_cache_hit") is not None:
+            CACHE_REQUESTS.inc(cache=cache, outcome="hit" if attributes[f"{cache}_cache_hit"] else "miss")
+    if attributes.get("followup"):
+        FOLLOWUP_REWRITES.inc(kind=attributes["followup"])
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set(stage_name, **attributes)
+
+
+def record_db_time(phase: str, seconds: float):
+    """Records database time for a phase ("wait", "execute" or "fetch")."""
+    DB_SECONDS.observe(seconds, phase=phase)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_db_time(phase, seconds)
+
+
+@contextmanager
+def db_phase(phase: str):
+    """Times a block of database work as the given phase."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_db_time(phase, time.perf_counter() - started)
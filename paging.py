@@ -0,0 +1,157 @@
+import os
+import re
+from collections import namedtuple
+import psycopg2
+import pandas as pd
+from instrumentation import db_phase
+from sql_ast import strip_comments
+
+# ------------------- Paging Configuration -------------------
+# Rows returned per page of results
+PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "100"))
+# Exact count(*) is only run when the planner's cost estimate is below this
+COUNT_EXACT_MAX_COST = float(os.getenv("COUNT_EXACT_MAX_COST", "1000000"))
+# Exact counts slower than this fall back to the planner estimate
+COUNT_TIMEOUT_MS = int(os.getenv("COUNT_TIMEOUT_MS", "5000"))
+
+# Statements that write or lock rows, wherever they appear (a CTE can hold a DELETE)
+DATA_MODIFYING_KEYWORDS = r"\b(?:insert|update|delete|merge|truncate|for\s+(?:key\s+)?share)\b"
+
+# Total number of rows a query returns, and whether it was counted or estimated
+RowCount = namedtuple("RowCount", ["total", "exact"])
+
+
+def strip_sql(sql_query: str) -> str:
+    """Removes surrounding whitespace and trailing semicolons so the query can be nested."""
+    return sql_query.strip().rstrip(";").strip()
+
+
+def is_select(sql_query: str) -> bool:
+    """
+    Returns True for statements that can be wrapped as a subquery (SELECT, WITH,
+    VALUES). A WITH whose CTEs modify data (WITH d AS (DELETE ... RETURNING *)
+    SELECT ...) or a SELECT ... FOR UPDATE is not one: it writes or locks rows.
+    """
+    if re.match(r"^\s*\(*\s*(select|with|values)\b", sql_query, re.IGNORECASE) is None:
+        return False
+    # Keywords inside comments, string literals and quoted identifiers do not count
+    code = re.sub(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", "''", strip_comments(sql_query))
+    return re.search(DATA_MODIFYING_KEYWORDS, code, re.IGNORECASE) is None
+
+
+def paged_sql(sql_query: str, limit: int, offset: int = 0) -> str:
+    """
+    Wraps a SELECT so it returns at most `limit` rows starting at `offset`.
+    Any LIMIT already in the query still applies inside the subquery.
+    """
+    return f"SELECT * FROM ({strip_sql(sql_query)}) AS page_q LIMIT {int(limit)} OFFSET {int(offset)}"
+
+
+def count_sql(sql_query: str) -> str:
+    """Wraps a SELECT in a count(*) of its rows."""
+    return f"SELECT count(*) FROM ({strip_sql(sql_query)}) AS count_q"
+
+
+def read_frame(conn, sql_query: str) -> pd.DataFrame:
+    """
+    Runs a query and builds a DataFrame from its rows, timing the execute and
+    fetch phases separately. Matches pd.read_sql_query, including converting
+    Decimal values to float.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SQL statement to run
+
+    Returns:
+        DataFrame of the query's rows
+    """
+    with conn.cursor() as cur:
+        with db_phase("execute"):
+            cur.execute(sql_query)
+        with db_phase("fetch"):
+            columns = [column.name for column in cur.description] if cur.description else []
+            rows = cur.fetchall() if cur.description else []
+            return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+def explain_plan(conn, sql_query: str) -> dict:
+    """
+    Returns the planner's top plan node for a query without executing it.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SQL statement to plan
+
+    Returns:
+        The "Plan" dictionary from EXPLAIN (FORMAT JSON)
+    """
+    with conn.cursor() as cur, db_phase("execute"):
+        cur.execute(f"EXPLAIN (FORMAT JSON) {strip_sql(sql_query)}")
+        plan = cur.fetchone()[0]
+    return plan[0]["Plan"]
+
+
+def count_rows(conn, sql_query: str, max_exact_cost: float = COUNT_EXACT_MAX_COST,
+               timeout_ms: int = COUNT_TIMEOUT_MS) -> RowCount:
+    """
+    Counts the rows a query returns. A cheap query is counted exactly with
+    count(*) under a short timeout; an expensive one (or one that times out)
+    reports the planner's row estimate instead.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SELECT whose rows are counted
+        max_exact_cost: Highest planner cost for which an exact count is attempted
+        timeout_ms: Statement timeout for the exact count
+
+    Returns:
+        RowCount with the total and whether it is exact
+    """
+    plan = explain_plan(conn, sql_query)
+    estimate = RowCount(int(plan.get("Plan Rows", 0)), False)
+    if plan.get("Total Cost", 0) > max_exact_cost:
+        conn.rollback()
+        return estimate
+    try:
+        with conn.cursor() as cur, db_phase("execute"):
+            cur.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+            cur.execute(count_sql(sql_query))
+            total = cur.fetchone()[0]
+        return RowCount(int(total), True)
+    except psycopg2.extensions.QueryCanceledError:
+        return estimate
+    finally:
+        # Ends the transaction so SET LOCAL does not leak into later statements
+        conn.rollback()
+
+
+def fetch_page(conn, sql_query: str, page: int = 0, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+    """
+    Fetches one page of a query's results.
+
+    Args:
+        conn: Open database connection
+        sql_query: The SELECT to page through
+        page: Zero-based page number
+        page_size: Rows per page
+
+    Returns:
+        DataFrame holding at most page_size rows
+    """
+    if not is_select(sql_query):
+        return read_frame(conn, sql_query)
+    return read_frame(conn, paged_sql(sql_query, page_size, page * page_size))
+
+
+def fetch_page_with_count(conn, sql_query: str, page: int = 0, page_size: int = PAGE_SIZE):
+    """
+    Fetches one page of results plus the query's total row count. When the
+    first page is not full, its length is the exact total and no count query runs.
+
+    Returns:
+        Tuple of (page DataFrame, RowCount)
+    """
+    df = fetch_page(conn, sql_query, page, page_size)
+    if not is_select(sql_query) or (page == 0 and len(df) < page_size):
+        return df, RowCount(len(df), True)
+    return df, count_rows(conn, sql_query)
@@ -0,0 +1,1145 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+import pandas as pd
+from db import get_pool, close_pool
+from schema import TABLE_NAME
+from prompt_schema import build_schema_context, count_tokens, sample_payload
+from query_cache import MemoryBackend, get_sql_cache, make_cache_key
+from result_cache import get_result_cache, sql_fingerprint
+from copy_fetch import fetch_frame
+from query_guard import GuardDecision, check_query
+from paging import PAGE_SIZE, RowCount, is_select, paged_sql, count_sql, fetch_page, fetch_page_with_count
+from instrumentation import start_trace, stage, record
+from answer_templates import template_answer
+from conversation_memory import ConversationMemory
+from sql_ast import parse_select
+from followups import rewrite_followup
+from single_flight import LLM_FLIGHTS, DB_FLIGHTS
+from rollups import get_rollup_router
+from entity_index import resolve_entities, sql_values
+from partitions import pruning_context
+from resources import register_resource, get_resource, registry
+from sql_validation import VALIDATION_CONFIG, SqlCheck, validate_sql
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Azure OpenAI Configuration -------------------
+# The client, prompt templates and chains are built once per process by the
+# resource registry, on first use. LangChain and the OpenAI SDK are imported
+# inside the factories, as they are the slowest imports of the service.
+def _build_llm():
+    # The key has no default: without it the client is not built, rather than failing on its first request
+    api_key = os.getenv("AZURE_OPENAI_KEY")
+    if not api_key:
+        raise RuntimeError("AZURE_OPENAI_KEY is not set; add it to the environment or .env file")
+    from langchain_openai import AzureChatOpenAI
+    return AzureChatOpenAI(
+        azure_endpoint=os.getenv("AZURE_ENDPOINT", "https://tmopenaieastus2.openai.azure.com"),
+        api_key=api_key,
+        api_version=os.getenv("OPENAI_CHAT_API_VERSION", "2025-01-01-preview"),
+        deployment_name=os.getenv("OPENAI_API_DEPLOYMENT_NAME", "gpt-4o-2"),
+        temperature=0
+    )
+
+def _close_llm(model):
+    """
+    Closes the HTTP connection pools of the Azure client's OpenAI clients. The
+    async client can only be closed on an event loop, so its close is returned
+    for the caller to await.
+    """
+    client = getattr(getattr(model, "client", None), "_client", None)
+    if client is not None:
+        client.close()
+    async_client = getattr(getattr(model, "async_client", None), "_client", None)
+    return async_client.close() if async_client is not None else None
+
+# Set to a chat model to use it instead of the Azure client (e.g. the benchmark's replay stub)
+llm = None
+
+def chat_model():
+    """Returns the chat model in use: the override in `llm`, or the registry's Azure client."""
+    return llm if llm is not None else get_resource("llm")
+
+# ------------------- Prompt Templates -------------------
+def _build_sql_prompt():
+    from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+    return ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(
+            "You are an expert SQL analyst working with PostgreSQL."
+        ),
+        HumanMessagePromptTemplate.from_template(
+            """
+TABLE NAME: {table_name}
+TABLE SCHEMA: {schema}
+SAMPLE DATA: {samples}
+CONVERSATION HISTORY: {chat_history}
+PREVIOUSLY MENTIONED ENTITIES: {entity_context}
+{query_context}
+{list_request_context}
+{known_values}
+{partition_context}
+User Query: "{user_query}"
+
+Generate ONLY the raw SQL query (no explanations or code blocks). Use ILIKE for text filters (except names under KNOWN VALUES), include aggregation functions for counts/sums, and maintain previous context where applicable.
+When using STRING_AGG, cast non-text columns (e.g., integers) to TEXT using ::TEXT to avoid type errors.
+"""
+        )
+    ])
+
+def _build_answer_prompt():
+    from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+    return ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(
+            "You are an expert data analyst providing clear answers based on database query results."
+        ),
+        HumanMessagePromptTemplate.from_template(
+            """
+USER QUESTION: "{user_query}"
+CONVERSATION HISTORY: {chat_history}
+SQL QUERY EXECUTED: {sql_query}
+QUERY RESULTS: {data_summary}
+TOTAL RECORD COUNT: {record_count}
+
+Guidelines:
+1. Answer directly using the data provided.
+2. Detect if the user is asking for specific contract details (e.g., 'details of contract', 'list contracts', 'show contract info'). If so:
+   - Show up to the first 5 records with these fields: recipient_name, recipient_uei, naics, naics_description, awarding_agency_name.
+   - Format each record clearly (e.g., '1. Recipient: [name], UEI: [uei], NAICS: [naics] - [description], Agency: [agency]').
+   - Mention the total count and note full results availability.
+3. For no results, explain in business terms (e.g., 'No contracts match this criteria, possibly due to...').
+4. Format numbers with commas and $ for currency.
+5. Don't show SQL unless asked.
+6. If query seems off, suggest corrections.
+7. Confirm counts when listing previously mentioned entities.
+8. Include this text at the end based on record count:
+   - If 0 records: 'No results to display.'
+   - If 1-20 records: 'Full results can be viewed in the table below.'
+   - If >20 records: 'Full results can be viewed in the table below or downloaded as a CSV.'
+"""
+        )
+    ])
+
+def _build_sql_repair_prompt():
+    from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+    return ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(
+            "You are an expert SQL analyst working with PostgreSQL. You fix SQL queries that failed validation."
+        ),
+        HumanMessagePromptTemplate.from_template(
+            """
+TABLE NAME: {table_name}
+TABLE SCHEMA: {schema}
+User Query: "{user_query}"
+FAILED SQL: {sql_query}
+ERRORS:
+{errors}
+
+Rewrite the SQL so it answers the user query without these errors, using only column names listed in TABLE SCHEMA exactly as written there.
+When using STRING_AGG, cast non-text columns (e.g., integers) to TEXT using ::TEXT to avoid type errors.
+Generate ONLY the raw SQL query (no explanations or code blocks).
+"""
+        )
+    ])
+
+register_resource("llm", _build_llm, _close_llm)
+register_resource("sql_prompt", _build_sql_prompt)
+register_resource("answer_prompt", _build_answer_prompt)
+register_resource("sql_repair_prompt", _build_sql_repair_prompt)
+registry.on_close(close_pool)
+
+# Compiled prompt | model | parser chains, rebuilt only when the chat model is replaced
+_chains = {}
+
+def _chain(prompt_name: str, temperature: float = None):
+    """
+    Returns the compiled chain for a registered prompt and the current chat
+    model, bound to another sampling temperature when one is given.
+    """
+    from langchain_core.output_parsers import StrOutputParser
+    model = chat_model()
+    key = prompt_name if temperature is None else (prompt_name, temperature)
+    compiled = _chains.get(key)
+    if compiled is None or compiled[0] is not model:
+        bound = model if temperature is None else model.bind(temperature=temperature)
+        compiled = _chains[key] = (model, get_resource(prompt_name) | bound | StrOutputParser())
+    return compiled[1]
+
+# Questions asking to list the entities of the previous query
+LIST_REQUEST_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"(?:list|show|give|display)(?:\s+me)?(?:\s+the)?(?:\s+all)?(?:\s+those)?(?:\s+(\d+))?(?:\s+([a-zA-Z\s]+))",
+    r"what(?:\s+are)?(?:\s+those)?(?:\s+(\d+))?(?:\s+([a-zA-Z\s]+))",
+    r"name(?:\s+the)?(?:\s+(\d+))?(?:\s+([a-zA-Z\s]+))",
+)]
+
+# ------------------- Query Tracking System -------------------
+def extract_where_clause(sql_query: str):
+    """
+    Returns the top-level WHERE clause of a SQL query (without the keyword), or
+    None when it has none or is not a single SELECT statement.
+    """
+    query = parse_select(sql_query)
+    return query.where if query is not None else None
+
+class QueryTracker:
+    """
+    Maintains context across multiple queries by tracking previous SQL queries,
+    result counts, and entity mentions to enhance follow-up queries.
+    """
+    def __init__(self):
+        # Stores the most recent SQL query executed
+        self.last_sql_query = None
+        # Tracks how many records were returned by the last query
+        self.last_results_count = None
+        # Stores additional contextual information about queries
+        self.last_context = {}
+        # Maps entity types to their counts and associated queries
+        self.entity_mentions = {}
+        # Stores just the WHERE clause from the last SQL query for reuse
+        self.last_sql_where_clause = None
+
+    def store_query_info(self, sql_query, results_count, context=None):
+        """
+        Stores information about an executed query and extracts the WHERE clause
+        for potential reuse in follow-up queries.
+
+        Args:
+            sql_query: The SQL query that was executed
+            results_count: Number of rows returned by the query
+            context: Optional additional context to store
+        """
+        self.last_sql_query = sql_query
+        self.last_results_count = results_count
+        # Extract the WHERE clause for potential reuse in follow-up queries
+        where_clause = extract_where_clause(sql_query)
+        if where_clause:
+            self.last_sql_where_clause = where_clause
+        if context:
+            self.last_context.update(context)
+
+    def track_entity_mention(self, entity_type, count, query):
+        """
+        Records mentions of specific entities in responses, facilitating
+        follow-up questions about those entities.
+
+        Args:
+            entity_type: The type of entity mentioned (e.g., "contract", "award")
+            count: How many of these entities were mentioned
+            query: The SQL query that produced these entities
+        """
+        # Re-inserting keeps the most recently mentioned entities last, so limits drop the oldest
+        self.entity_mentions.pop(entity_type, None)
+        self.entity_mentions[entity_type] = {"count": count, "query": query}
+
+class ConversationSession:
+    """
+    State for one conversation: token-budgeted memory holding the chat history,
+    the QueryTracker used for follow-up context, the last response (for paging
+    and downloads), and details about the request currently being processed.
+    """
+    def __init__(self, session_id: str = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.memory = ConversationMemory()
+        self.tracker = QueryTracker()
+        self.last_response = None
+        # Per-request details such as cache hits, guard decisions, timings and errors
+        self.request_info = {}
+
+    def start_request(self):
+        """Clears the per-request details before a new question is processed."""
+        self.request_info = {}
+
+    def record_exchange(self, user_query: str, answer: str, sql_query: str = None, results_count: int = None):
+        """Adds a question and its answer to the conversation memory."""
+        self.memory.add_exchange(user_query, answer, extract_where_clause(sql_query) if sql_query else None,
+                                 results_count, analyze_previous_response(answer))
+
+    def to_state(self) -> dict:
+        """
+        Returns the conversation as a JSON-serializable dict for the session store.
+        The last response is kept without its first page of rows, which can be
+        fetched again from its SQL.
+        """
+        tracker = self.tracker
+        last_response = None
+        if self.last_response is not None:
+            last_response = {key: value for key, value in self.last_response.items() if key != "first_page"}
+        return {
+            "session_id": self.session_id,
+            "memory": self.memory.to_state(),
+            "tracker": {
+                "last_sql_query": tracker.last_sql_query,
+                "last_results_count": tracker.last_results_count,
+                "last_sql_where_clause": tracker.last_sql_where_clause,
+                "last_context": tracker.last_context,
+                "entity_mentions": tracker.entity_mentions,
+            },
+            "last_response": last_response,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """Rebuilds a conversation from a dict produced by to_state()."""
+        session = cls(state["session_id"])
+        session.memory = ConversationMemory.from_state(state.get("memory", {}))
+        for name, value in state.get("tracker", {}).items():
+            setattr(session.tracker, name, value)
+        session.last_response = state.get("last_response")
+        return session
+
+def _request_info(session) -> dict:
+    """Returns the session's per-request details, or a throwaway dict when no session is given."""
+    return session.request_info if session is not None else {}
+
+def _record_result(stage_name: str, df: pd.DataFrame, cache_hit: bool):
+    """Records a result's row count, in-memory size and whether it came from the result cache."""
+    record(stage_name, rows=len(df), bytes=int(df.memory_usage(deep=True).sum()), result_cache_hit=cache_hit)
+
+def _record_coalesced(stage_name: str, name: str, session, shared: bool):
+    """Records whether a call shared an identical in-flight call's result."""
+    _request_info(session)[name] = shared
+    record(stage_name, coalesced=shared)
+
+def _prompt_tokens(prompt_template, prompt_values: dict) -> int:
+    """Counts the tokens of a prompt once its values are filled in."""
+    return count_tokens("\n".join(message.content for message in prompt_template.format_messages(**prompt_values)))
+
+# ------------------- Database and Query Functions -------------------
+# Guard decisions (and the rollup used) of SQL that ran, keyed on its fingerprint;
+# one is reused only while the query's first page is still in the result cache
+GUARD_DECISIONS = MemoryBackend(max_entries=1000, ttl_seconds=3600.0)
+
+def guard_sql_query(sql_query: str, session: ConversationSession = None) -> GuardDecision:
+    """
+    Runs the EXPLAIN-based cost guard on generated SQL before it is executed.
+    If the query cannot be planned (e.g. invalid SQL) it is allowed through so
+    execution reports the database error as before.
+
+    Args:
+        sql_query: The generated SQL query
+        session: Conversation whose request details record the decision
+
+    Returns:
+        GuardDecision with the action, the SQL to execute and the pool to use
+    """
+    info = _request_info(session)
+    # Aggregates that a rollup can answer are rewritten to read it instead of tm_awards
+    routed = get_rollup_router().route(sql_query)
+    if routed is not None:
+        try:
+            with stage("guard"), get_pool().connection() as conn:
+                decision = check_query(conn, routed.sql)
+            info["rollup"] = routed.rollup
+        except Exception as e:
+            logger.warning("Rollup %s could not answer the query: %s", routed.rollup, e)
+            routed = None
+    if routed is None:
+        try:
+            with stage("guard"), get_pool().connection() as conn:
+                decision = check_query(conn, sql_query)
+        except Exception as e:
+            decision = GuardDecision("allow", sql_query, "default", f"EXPLAIN failed: {e}", {}, sql_query)
+    info["guard"] = {"action": decision.action, "reason": decision.reason}
+    # The executed SQL in the trace log is what index_advisor.py mines for index proposals
+    record("guard", action=decision.action, sql=decision.sql_query)
+    if decision.pool is not None:
+        GUARD_DECISIONS.set(sql_fingerprint(sql_query), (decision, info.get("rollup")))
+    return decision
+
+def cached_first_page(sql_query: str, session: ConversationSession = None):
+    """
+    Serves a repeated query's first page and exact row count from the result
+    cache before the guard runs, so a cache hit costs neither the guard's
+    EXPLAIN nor a database read. The guard decision made when the query first
+    ran is reused, so later pages keep its pool.
+
+    Args:
+        sql_query: The generated SQL query
+        session: Conversation whose request details record the decision and the cache hit
+
+    Returns:
+        Tuple of (GuardDecision, page DataFrame, RowCount), or None on a miss
+    """
+    memo = GUARD_DECISIONS.get(sql_fingerprint(sql_query))
+    if memo is None:
+        return None
+    decision, rollup = memo
+    cached = _cached_page(decision.page_sql, 0, True)
+    if cached is None:
+        return None
+    info = _request_info(session)
+    if rollup:
+        info["rollup"] = rollup
+    info["guard"] = {"action": decision.action, "reason": decision.reason}
+    info["result_cache_hit"] = True
+    _record_result("execute_sql", cached[0], True)
+    return (decision,) + cached
+
+def execute_sql_query(sql_query: str, session: ConversationSession = None) -> pd.DataFrame:
+    """
+    Executes a SQL query against the PostgreSQL database and returns the whole result as a DataFrame.
+    Serving reads pages with execute_sql_page() instead; this is for the benchmark and offline scripts.
+    Connections are borrowed from the shared pool rather than opened per query.
+    The full result is read with COPY into typed columns (see copy_fetch.py).
+    Results of repeated queries are served from the result cache until the table changes.
+    The query first passes the cost guard, which may limit, reroute or reject it.
+
+    Args:
+        sql_query: The SQL query to execute
+        session: Conversation whose request details record cache hits and errors
+
+    Returns:
+        DataFrame containing query results or empty DataFrame on error
+    """
+    info = _request_info(session)
+    try:
+        result_cache = get_result_cache(TABLE_NAME)
+        cached_df = result_cache.get(sql_query)
+        info["result_cache_hit"] = cached_df is not None
+        if cached_df is not None:
+            _record_result("execute_sql", cached_df, True)
+            return cached_df
+        decision = guard_sql_query(sql_query, session)
+        if decision.action == "reject":
+            info["error"] = f"Query not executed: {decision.reason}"
+            return pd.DataFrame()
+
+        def fetch():
+            with get_pool(decision.pool).connection() as conn:
+                return fetch_frame(conn, decision.sql_query)
+
+        # Identical queries running at the same moment share one database round trip
+        df, shared = DB_FLIGHTS.do((sql_fingerprint(decision.sql_query), decision.pool), fetch)
+        _record_coalesced("execute_sql", "result_coalesced", session, shared)
+        _record_result("execute_sql", df, False)
+        if shared:
+            return df.copy()
+        result_cache.put(sql_query, df)
+        return df
+    except Exception as e:
+        logger.exception("Database error")
+        info["error"] = f"Database error: {e}"
+        return pd.DataFrame()
+
+def _page_query(sql_query: str, page: int) -> str:
+    """The SQL reading one page of a query's result, which the result cache keys the page on."""
+    return paged_sql(sql_query, PAGE_SIZE, page * PAGE_SIZE) if is_select(sql_query) else sql_query
+
+def _cached_page(sql_query: str, page: int, with_count: bool):
+    """Returns (page DataFrame, RowCount or None) from the result cache, or None unless all of it is cached."""
+    result_cache = get_result_cache(TABLE_NAME)
+    cached_df = result_cache.get(_page_query(sql_query, page))
+    if cached_df is None:
+        return None
+    if not with_count:
+        return cached_df, None
+    if page == 0 and len(cached_df) < PAGE_SIZE:
+        return cached_df, RowCount(len(cached_df), True)
+    cached_count = result_cache.get(count_sql(sql_query))
+    if cached_count is None:
+        return None
+    return cached_df, RowCount(int(cached_count.iloc[0, 0]), True)
+
+def execute_sql_page(sql_query: str, session: ConversationSession = None, page: int = 0,
+                     with_count: bool = True, pool_name: str = "default"):
+    """
+    Executes a SQL query wrapped so it returns at most one page of rows, and
+    optionally counts the query's total rows with a separate cheap query.
+
+    Args:
+        sql_query: The SQL query to execute
+        session: Conversation whose request details record cache hits and errors
+        page: Zero-based page number
+        with_count: Whether to also determine the total row count
+        pool_name: Connection pool to run on ("default" or "background")
+
+    Returns:
+        Tuple of (page DataFrame, RowCount or None); an empty page on error
+    """
+    info = _request_info(session)
+    try:
+        # Serve the page (and its count, if known) from the result cache
+        cached = _cached_page(sql_query, page, with_count)
+        info["result_cache_hit"] = cached is not None
+        if cached is not None:
+            _record_result("execute_sql", cached[0], True)
+            return cached
+
+        result_cache = get_result_cache(TABLE_NAME)
+        page_query = _page_query(sql_query, page)
+        count_query = count_sql(sql_query)
+
+        def fetch():
+            with get_pool(pool_name).connection() as conn:
+                if with_count:
+                    return fetch_page_with_count(conn, sql_query, page, PAGE_SIZE)
+                return fetch_page(conn, sql_query, page, PAGE_SIZE), None
+
+        # Identical pages requested at the same moment share one database round trip
+        (df, row_count), shared = DB_FLIGHTS.do((sql_fingerprint(page_query), with_count, pool_name), fetch)
+        _record_coalesced("execute_sql", "result_coalesced", session, shared)
+        _record_result("execute_sql", df, False)
+        if shared:
+            # The caller that ran the query has cached it
+            return df.copy(), row_count
+        result_cache.put(page_query, df)
+        if row_count is not None and row_count.exact:
+            result_cache.put(count_query, pd.DataFrame({"count": [row_count.total]}))
+        return df, row_count
+    except Exception as e:
+        logger.exception("Database error")
+        info["error"] = f"Database error: {e}"
+        return pd.DataFrame(), RowCount(0, True) if with_count else None
+
+def analyze_previous_response(response: str) -> dict:
+    """
+    Extracts entity counts from AI responses using regex patterns.
+    Helps track what entities were discussed and their quantities.
+
+    Args:
+        response: The text of the AI's previous response
+
+    Returns:
+        Dictionary mapping entity types to their mentioned counts
+    """
+    # Regex patterns to match various ways entities might be counted in responses
+    # Counts may include thousands separators (e.g. "1,234")
+    count_patterns = [
+        r"There (?:are|were) (\d[\d,]*) ([a-zA-Z\s]+)",
+        r"Found (\d[\d,]*) ([a-zA-Z\s]+)",
+        r"Identified (\d[\d,]*) ([a-zA-Z\s]+)",
+        r"(\d[\d,]*) ([a-zA-Z\s]+) (?:are|were) found",
+        r"total of (\d[\d,]*) ([a-zA-Z\s]+)"
+    ]
+    entities = {}
+    for pattern in count_patterns:
+        matches = re.findall(pattern, response, re.IGNORECASE)
+        for match in matches:
+            count, entity_type = match
+            # Normalize entity types by removing plurals and extra spaces
+            normalized_type = entity_type.strip().lower()
+            if normalized_type.endswith('s'):
+                normalized_type = normalized_type[:-1]
+            entities[normalized_type] = int(count.replace(",", ""))
+    return entities
+
+def _prepare_sql_generation(user_query: str, session: ConversationSession):
+    """
+    Builds the context for SQL generation, rewriting recognised follow-ups from
+    the previous query and otherwise checking the SQL cache.
+
+    Returns:
+        Tuple of (SQL ready without the LLM or None, LangChain pipeline, its input, cache key, prompt tokens)
+    """
+    query_tracker = session.tracker
+    info = session.request_info
+
+    # Follow-ups that only re-present the previous result are rewritten from its SQL without the LLM
+    followup = rewrite_followup(user_query, query_tracker.last_sql_query)
+    if followup is not None:
+        turns = session.memory.turns
+        subject = query_tracker.last_context.get("subject") or (turns[-1]["user"] if turns else user_query)
+        # Rows of a grouped result are groups, so they are not named after the earlier question
+        info["followup"] = {"kind": followup.kind, "description": followup.description,
+                            "subject": user_query if followup.grouped else subject}
+        info["sql_cache_hit"] = False
+        record("generate_sql", followup=followup.kind)
+        return followup.sql, None, None, None, 0
+
+    # Entity mentions extracted from the most recent AI response, if any
+    previous_entity_mentions = session.memory.last_entities()
+
+    # Recent turns verbatim plus a summary of older ones, within the memory's token budget
+    chat_history_text = session.memory.history_text()
+
+    # Create context string for previously mentioned entities
+    entity_context = "".join([f"- You previously mentioned there are {count} {entity_type}s.\n"
+                              for entity_type, count in previous_entity_mentions.items()])
+
+    # Include the previous query context if available
+    query_context = (f"Previous SQL query: {query_tracker.last_sql_query}\n"
+                     f"Previous query result count: {query_tracker.last_results_count}\n"
+                     f"Previous WHERE clause: {query_tracker.last_sql_where_clause}\n"
+                     if query_tracker.last_sql_query and query_tracker.last_results_count is not None else "")
+
+    # Detect if the user is asking for a list based on previous query
+    is_list_request = any(pattern.search(user_query) for pattern in LIST_REQUEST_PATTERNS)
+
+    # If this is a list request, provide special context to reuse previous WHERE clause
+    list_request_context = (f"IMPORTANT: The user is asking to list entities from the previous query.\n"
+                            f"Reuse WHERE clause: {query_tracker.last_sql_where_clause}\n"
+                            f"Ensure {query_tracker.last_results_count} rows are returned.\n"
+                            if is_list_request and query_tracker.last_sql_where_clause else "")
+
+    # Agency and vendor names in the question, resolved to every spelling stored in the table,
+    # so the SQL can filter with indexable equality instead of ILIKE pattern scans
+    resolved = resolve_entities(user_query)
+    info["entities"] = [{"mention": match.mention, "column": match.column, "variants": len(match.variants)}
+                        for match in resolved]
+    record("generate_sql", entities=len(resolved))
+    known_values = ("KNOWN VALUES (filter these names with the exact condition shown instead of ILIKE; "
+                    "if a name is listed for several columns, use the column the question refers to):\n"
+                    + "".join(f'- "{match.mention}": {sql_values(match.column, match.variants)}\n'
+                              for match in resolved) if resolved else "")
+
+    # Time-scoped questions on a partitioned tm_awards are told how to filter date_signed so partitions are pruned
+    partition_context = pruning_context(user_query)
+
+    # Serve the SQL from cache when the question and prompt context match an earlier request; a new
+    # column profile changes the sample values in the prompt, so it starts a new set of entries
+    cache_key = make_cache_key(user_query, query_tracker.last_sql_where_clause, is_list_request,
+                               entity_context, query_tracker.last_results_count, known_values, partition_context,
+                               sample_payload().version)
+    cached_sql = get_sql_cache().get(cache_key)
+    info["sql_cache_hit"] = cached_sql is not None
+    record("generate_sql", sql_cache_hit=cached_sql is not None)
+    if cached_sql is not None:
+        return cached_sql, None, None, cache_key, 0
+
+    # Send only the columns and sample values relevant to the question, from the precompiled schema
+    schema_info = build_schema_context(user_query, " ".join([query_tracker.last_sql_query or ""]
+                                                            + [match.column for match in resolved]))
+    schema_context, sample_context = schema_info.schema, schema_info.samples
+    info["schema_tokens"] = schema_info.tokens
+
+    # Build the LangChain pipeline to generate SQL
+    prompt_values = {"table_name": TABLE_NAME, "schema": schema_context, "samples": sample_context,
+                     "chat_history": chat_history_text, "entity_context": entity_context,
+                     "query_context": query_context, "list_request_context": list_request_context,
+                     "known_values": known_values, "partition_context": partition_context,
+                     "user_query": user_query}
+    return None, _chain("sql_prompt"), prompt_values, cache_key, _prompt_tokens(get_resource("sql_prompt"),
+                                                                                 prompt_values)
+
+def _clean_sql(raw_sql: str) -> str:
+    """Strips whitespace and markdown code fences from LLM output."""
+    return raw_sql.strip().replace("```sql", "").replace("```", "")
+
+def generate_sql_query(user_query: str, session: ConversationSession) -> str:
+    """
+    Generates a SQL query from a natural language question using the LLM.
+    Incorporates conversation history and previous query context.
+    Follow-ups that only list, sort, limit or re-project the previous result are
+    rewritten from its SQL (followups.py), and previously generated SQL for the
+    same question and context is served from the SQL cache; neither calls the LLM.
+    Identical questions generated at the same moment share a single LLM call.
+    Generated SQL is validated before it is returned, and SQL that fails is
+    sent back to the LLM with the errors for a bounded number of repairs.
+    session.request_info["followup"], ["sql_cache_hit"], ["sql_coalesced"]
+    and ["sql_validation"] record which path was used.
+
+    Args:
+        user_query: The natural language question from the user
+        session: Conversation providing history and previous query context
+
+    Returns:
+        SQL query string ready to execute
+    """
+    ready_sql, chain, chain_input, cache_key, prompt_tokens = _prepare_sql_generation(user_query, session)
+    if ready_sql is not None:
+        return ready_sql
+
+    def call_llm():
+        # Generate the SQL query, then validate it and repair it if needed
+        completions = []
+        check = _generate_candidates(chain, chain_input, completions)
+        _record_generation(prompt_tokens, completions)
+        check, repairs = _repair_sql(user_query, check)
+        return _sql_generated(check, cache_key, repairs, session)
+
+    # The cache key covers the question and its prompt context, so it identifies identical requests
+    sql_query, shared = LLM_FLIGHTS.do(cache_key, call_llm)
+    _record_coalesced("generate_sql", "sql_coalesced", session, shared)
+    return sql_query
+
+async def agenerate_sql_query(user_query: str, session: ConversationSession) -> str:
+    """
+    Async version of generate_sql_query() that awaits the LLM call instead of blocking.
+    The preparation (entity resolution, schema selection and the SQL cache lookup) and
+    the SQL cache write can block on disk or the network, so they run on worker threads.
+    """
+    ready_sql, chain, chain_input, cache_key, prompt_tokens = await asyncio.to_thread(
+        _prepare_sql_generation, user_query, session)
+    if ready_sql is not None:
+        return ready_sql
+
+    async def call_llm():
+        completions = []
+        check = await _agenerate_candidates(chain, chain_input, completions)
+        _record_generation(prompt_tokens, completions)
+        check, repairs = await _arepair_sql(user_query, check)
+        return await asyncio.to_thread(_sql_generated, check, cache_key, repairs, session)
+
+    sql_query, shared = await LLM_FLIGHTS.ado(cache_key, call_llm)
+    _record_coalesced("generate_sql", "sql_coalesced", session, shared)
+    return sql_query
+
+def _record_generation(prompt_tokens: int, completions: list):
+    """Records the token counts of the SQL generation calls, one per candidate."""
+    record("generate_sql", prompt_tokens=prompt_tokens * len(completions), completion_tokens=sum(completions),
+           candidates=len(completions))
+
+def _sql_generated(check: SqlCheck, cache_key: str, repairs: int, session: ConversationSession) -> str:
+    """Records the validation outcome and caches the SQL when it passed validation."""
+    _request_info(session)["sql_validation"] = {"repairs": repairs, "valid": not check.errors,
+                                                "errors": check.errors[:3],
+                                                "candidates": _candidate_count()}
+    record("validate_sql", repairs=repairs, valid=not check.errors)
+    # SQL that still fails would be served again from the cache, so only valid SQL is kept
+    if not check.errors:
+        get_sql_cache().set(cache_key, check.sql)
+    return check.sql
+
+# ------------------- SQL Validation and Repair -------------------
+def _check_sql(sql_query: str) -> SqlCheck:
+    """
+    Validates generated SQL (sql_validation.py). When the database cannot be
+    reached, only the local checks run; the query then fails or succeeds at
+    execution as before.
+    """
+    if not VALIDATION_CONFIG["enabled"]:
+        return SqlCheck(sql_query, [])
+    try:
+        with get_pool().connection() as conn:
+            return validate_sql(conn, sql_query)
+    except Exception as e:
+        logger.warning("SQL validation could not plan the query: %s", e)
+        return validate_sql(None, sql_query)
+
+def _candidate_count() -> int:
+    return max(1, VALIDATION_CONFIG["candidates"]) if VALIDATION_CONFIG["enabled"] else 1
+
+def _candidate_chains(chain) -> list:
+    """The generation chain, plus higher-temperature variants when several candidates are generated."""
+    count = _candidate_count()
+    if count == 1:
+        return [chain]
+    return [chain] + [_chain("sql_prompt", VALIDATION_CONFIG["candidate_temperature"])] * (count - 1)
+
+def _generate_candidates(chain, chain_input: dict, completions: list) -> SqlCheck:
+    """
+    Generates SQL candidates concurrently on a thread pool and returns the
+    first one that passes validation, or the first one to finish when none
+    does. Candidates still running are abandoned.
+
+    Args:
+        chain: The SQL generation pipeline
+        chain_input: Its prompt values
+        completions: Receives the completion tokens of each finished candidate
+
+    Returns:
+        SqlCheck of the chosen candidate
+    """
+    def attempt(candidate):
+        sql_query = _clean_sql(candidate.invoke(chain_input))
+        completions.append(count_tokens(sql_query))
+        return _check_sql(sql_query)
+
+    chains = _candidate_chains(chain)
+    if len(chains) == 1:
+        return attempt(chain)
+    executor = ThreadPoolExecutor(max_workers=len(chains), thread_name_prefix="sql-candidate")
+    # Each candidate runs in a copy of this request's context, so its database time is traced
+    futures = [executor.submit(contextvars.copy_context().run, attempt, candidate) for candidate in chains]
+    first, error = None, None
+    try:
+        for future in as_completed(futures):
+            try:
+                check = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if not check.errors:
+                return check
+            first = first or check
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if first is None:
+        raise error
+    return first
+
+async def _agenerate_candidates(chain, chain_input: dict, completions: list) -> SqlCheck:
+    """Async version of _generate_candidates(); unfinished candidates are cancelled."""
+    async def attempt(candidate):
+        sql_query = _clean_sql(await candidate.ainvoke(chain_input))
+        completions.append(count_tokens(sql_query))
+        return await asyncio.to_thread(_check_sql, sql_query)
+
+    chains = _candidate_chains(chain)
+    if len(chains) == 1:
+        return await attempt(chain)
+    tasks = [asyncio.ensure_future(attempt(candidate)) for candidate in chains]
+    first, error = None, None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                check = await next_done
+            except Exception as e:
+                error = e
+                continue
+            if not check.errors:
+                return check
+            first = first or check
+    finally:
+        for task in tasks:
+            task.cancel()
+    if first is None:
+        raise error
+    return first
+
+def _repair_input(user_query: str, check: SqlCheck) -> dict:
+    """Prompt values asking the LLM to fix SQL that failed validation."""
+    # The schema covers the columns the question, the failed SQL and the suggested names point to
+    schema_info = build_schema_context(user_query, " ".join([check.sql] + check.errors))
+    return {"table_name": TABLE_NAME, "schema": schema_info.schema, "user_query": user_query,
+            "sql_query": check.sql, "errors": "".join(f"- {error}\n" for error in check.errors)}
+
+def _repair_sql(user_query: str, check: SqlCheck):
+    """
+    Feeds validation errors back to the LLM until the SQL passes or the
+    repair budget (SQL_REPAIR_ATTEMPTS) is spent.
+
+    Returns:
+        Tuple of (SqlCheck of the last SQL, repair calls made)
+    """
+    repairs = 0
+    while check.errors and repairs < VALIDATION_CONFIG["max_repairs"]:
+        repairs += 1
+        repair_input = _repair_input(user_query, check)
+        sql_query = _clean_sql(_chain("sql_repair_prompt").invoke(repair_input))
+        record("validate_sql", prompt_tokens=_prompt_tokens(get_resource("sql_repair_prompt"), repair_input),
+               completion_tokens=count_tokens(sql_query))
+        check = _check_sql(sql_query)
+    return check, repairs
+
+async def _arepair_sql(user_query: str, check: SqlCheck):
+    """Async version of _repair_sql()."""
+    repairs = 0
+    while check.errors and repairs < VALIDATION_CONFIG["max_repairs"]:
+        repairs += 1
+        repair_input = _repair_input(user_query, check)
+        sql_query = _clean_sql(await _chain("sql_repair_prompt").ainvoke(repair_input))
+        record("validate_sql", prompt_tokens=_prompt_tokens(get_resource("sql_repair_prompt"), repair_input),
+               completion_tokens=count_tokens(sql_query))
+        check = await asyncio.to_thread(_check_sql, sql_query)
+    return check, repairs
+
+def _prepare_answer(user_query: str, sql_query: str, df: pd.DataFrame, session: ConversationSession,
+                    total_count: int = None):
+    """
+    Records the executed query and builds the answer-generation pipeline.
+
+    Returns:
+        Tuple of (LangChain pipeline, pipeline input)
+    """
+    # Get recent conversation history for context
+    chat_history_text = session.memory.history_text()
+
+    # Store information about this query execution
+    record_total = len(df) if total_count is None else total_count
+    session.tracker.store_query_info(sql_query, record_total)
+
+    # Prepare data summary for the prompt
+    if df.empty:
+        data_summary = "No results found."
+        record_count = 0
+    else:
+        total_records = record_total
+        # Only use first 5 records for answer generation to keep responses concise
+        preview_df = df.head(5)  # Take first 5 rows for the answer
+        data_summary = (f"Showing first {min(5, total_records)} records:\n"
+                        f"{preview_df.to_string(index=False)}")
+        record_count = total_records
+
+    # Build the LangChain pipeline to generate the answer
+    prompt_values = {"user_query": user_query, "sql_query": sql_query, "data_summary": data_summary,
+                     "chat_history": chat_history_text, "record_count": record_count}
+    record("refine_answer", prompt_tokens=_prompt_tokens(get_resource("answer_prompt"), prompt_values))
+    return _chain("answer_prompt"), prompt_values
+
+def refine_answer(user_query: str, sql_query: str, df: pd.DataFrame, session: ConversationSession,
+                  stream: bool = False, total_count: int = None):
+    """
+    Takes raw SQL query results and generates a natural language answer.
+    Formats the results appropriately based on the type of query. Empty results,
+    single counts or dollar totals, and contract-detail lists are answered from
+    templates (answer_templates.py) without calling the LLM.
+
+    Args:
+        user_query: Original natural language question
+        sql_query: SQL query that was executed
+        df: DataFrame containing the query results
+        session: Conversation providing history and receiving tracked entities
+        stream: If True, return a generator that yields answer tokens as they arrive
+        total_count: Total rows in the result when df only holds a preview of it
+
+    Returns:
+        Natural language answer based on query results, or a token generator when streaming.
+        Entity tracking runs on the final text either way, and time-to-first-token and
+        total generation time are stored in session.request_info["answer_timing"].
+    """
+    # Answer common result shapes from a template without calling the LLM
+    fast_answer = _template_answer(user_query, sql_query, df, session, total_count)
+    if fast_answer is not None:
+        return iter([fast_answer]) if stream else fast_answer
+
+    chain, chain_input = _prepare_answer(user_query, sql_query, df, session, total_count)
+    if stream:
+        return _stream_answer(chain, chain_input, sql_query, session)
+
+    # Generate the answer
+    started = time.perf_counter()
+    answer = chain.invoke(chain_input).strip()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _answer_done(answer, sql_query, session, elapsed_ms, elapsed_ms)
+    return answer
+
+async def arefine_answer(user_query: str, sql_query: str, df: pd.DataFrame, session: ConversationSession,
+                         stream: bool = False, total_count: int = None):
+    """
+    Async version of refine_answer(). With stream=True it returns an async
+    generator of answer tokens; otherwise it must be awaited for the full answer.
+    """
+    fast_answer = _template_answer(user_query, sql_query, df, session, total_count)
+    if fast_answer is not None:
+        return _aiter_once(fast_answer) if stream else fast_answer
+
+    chain, chain_input = _prepare_answer(user_query, sql_query, df, session, total_count)
+    if stream:
+        return _astream_answer(chain, chain_input, sql_query, session)
+    started = time.perf_counter()
+    answer = (await chain.ainvoke(chain_input)).strip()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _answer_done(answer, sql_query, session, elapsed_ms, elapsed_ms)
+    return answer
+
+def _template_answer(user_query: str, sql_query: str, df: pd.DataFrame, session: ConversationSession,
+                     total_count: int = None):
+    """
+    Returns a template answer for results whose shape fully determines it, recording
+    the query and tracking entities as the LLM path does; None when the LLM is needed.
+    """
+    started = time.perf_counter()
+    followup = session.request_info.get("followup")
+    answer = template_answer(user_query, sql_query, df, total_count, followup["subject"] if followup else None,
+                             session.request_info.get("error"))
+    if answer is None:
+        return None
+    session.tracker.store_query_info(sql_query, len(df) if total_count is None else total_count)
+    session.request_info["answer_source"] = "template"
+    record("refine_answer", answer_source="template")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _answer_done(answer, sql_query, session, elapsed_ms, elapsed_ms)
+    return answer
+
+async def _aiter_once(text: str):
+    """Async generator yielding a single piece of text."""
+    yield text
+
+def _stream_answer(chain, chain_input, sql_query, session):
+    """
+    Yields answer tokens from the LLM as they arrive, then records timings and
+    tracks entity mentions once the full answer is known.
+    """
+    started = time.perf_counter()
+    first_token_ms = None
+    parts = []
+    for chunk in chain.stream(chain_input):
+        if first_token_ms is None:
+            first_token_ms = (time.perf_counter() - started) * 1000
+        parts.append(chunk)
+        yield chunk
+    total_ms = (time.perf_counter() - started) * 1000
+    _answer_done("".join(parts).strip(), sql_query, session, first_token_ms or total_ms, total_ms)
+
+async def _astream_answer(chain, chain_input, sql_query, session):
+    """Async counterpart of _stream_answer()."""
+    started = time.perf_counter()
+    first_token_ms = None
+    parts = []
+    async for chunk in chain.astream(chain_input):
+        if first_token_ms is None:
+            first_token_ms = (time.perf_counter() - started) * 1000
+        parts.append(chunk)
+        yield chunk
+    total_ms = (time.perf_counter() - started) * 1000
+    _answer_done("".join(parts).strip(), sql_query, session, first_token_ms or total_ms, total_ms)
+
+def _answer_done(answer: str, sql_query: str, session: ConversationSession, ttft_ms: float, total_ms: float):
+    """Records answer timing and completion tokens, then tracks entity mentions in the answer."""
+    session.request_info["answer_timing"] = {"ttft_ms": ttft_ms, "total_ms": total_ms}
+    record("refine_answer", completion_tokens=count_tokens(answer), ttft_ms=round(ttft_ms, 2))
+    _track_answer_entities(answer, sql_query, session)
+
+def _track_answer_entities(answer: str, sql_query: str, session: ConversationSession):
+    """Extracts and tracks any entity mentions in the generated answer."""
+    entities = analyze_previous_response(answer)
+    for entity_type, count in entities.items():
+        session.tracker.track_entity_mention(entity_type, count, sql_query)
+
+# ------------------- Query Pipeline -------------------
+def _build_response(session: ConversationSession, sql_query: str, decision: GuardDecision,
+                    df_page: pd.DataFrame, row_count: RowCount) -> dict:
+    """
+    Collects the generated SQL, first page of results and notes on how they
+    were produced into the response returned to clients.
+    """
+    info = session.request_info
+    notes = []
+    if info.get("followup"):
+        notes.append(f"Follow-up rewritten from the previous query without an LLM call "
+                     f"({info['followup']['description']})")
+    elif info.get("sql_cache_hit"):
+        notes.append("SQL served from cache")
+    else:
+        tokens = info.get("schema_tokens", {})
+        samples = f"profile v{tokens['profile_version']}" if tokens.get("profile_version") else "SAMPLE_DATA"
+        notes.append(f"Schema prompt: {tokens.get('sent')} tokens (full indented schema: {tokens.get('baseline')}; "
+                     f"samples from {samples})")
+    validation = info.get("sql_validation")
+    if validation and validation["candidates"] > 1:
+        notes.append(f"First valid of {validation['candidates']} SQL candidates")
+    if validation and validation["repairs"]:
+        outcome = "repaired after failing validation" if validation["valid"] else "still failed validation after"
+        notes.append(f"SQL {outcome} ({validation['repairs']} repair attempts)")
+    if validation and validation["errors"]:
+        notes.append("Validation errors: " + "; ".join(validation["errors"]))
+    if info.get("entities"):
+        notes.append("Names matched to stored spellings: " + ", ".join(
+            f"{entity['mention']} ({entity['column']}, {entity['variants']})" for entity in info["entities"]))
+    if info.get("rollup"):
+        notes.append(f"Answered from rollup {info['rollup']}")
+    if decision.action != "allow":
+        notes.append(f"Query guard: {decision.action} ({decision.reason})")
+    if info.get("sql_coalesced"):
+        notes.append("SQL shared with an identical question asked at the same time")
+    if info.get("result_cache_hit"):
+        notes.append("Results served from cache")
+    elif info.get("result_coalesced"):
+        notes.append("Results shared with an identical query running at the same time")
+    return {"sql_query": sql_query, "exec_sql": decision.page_sql, "pool": decision.pool,
+            "notes": notes, "first_page": df_page, "total_rows": row_count.total,
+            "count_exact": row_count.exact, "error": info.get("error"),
+            "answer": "", "answer_note": "", "timings": None}
+
+def _rejected_answer(decision: GuardDecision) -> str:
+    """Explains why the query was not run instead of asking the LLM to describe an empty result."""
+    return (f"This query was not run because it is estimated to be too expensive "
+            f"({decision.reason}). Try narrowing it, for example by agency, "
+            f"date range or state.")
+
+def _finish_response(session: ConversationSession, user_query: str, response: dict, answer: str):
+    """Stores the answer and its timing on the response and in the conversation memory."""
+    timing = session.request_info.get("answer_timing")
+    response["answer"] = answer
+    if session.request_info.get("answer_source") == "template":
+        response["answer_note"] = "Answer written from a template without an LLM call"
+    elif timing:
+        response["answer_note"] = (f"First token after {timing['ttft_ms']:.0f} ms, "
+                                   f"answer generated in {timing['total_ms']:.0f} ms")
+
+    # Follow-ups keep naming their records after the question that defined the result
+    followup = session.request_info.get("followup")
+    session.tracker.last_context["subject"] = followup["subject"] if followup else user_query
+
+    # Store conversation in memory for context retention
+    session.record_exchange(user_query, answer, response["sql_query"], response["total_rows"])
+    session.last_response = response
+
+def run_query(user_query: str, session: ConversationSession) -> dict:
+    """
+    Runs the full generate -> guard -> execute -> refine pipeline for a question.
+
+    Args:
+        user_query: The natural language question from the user
+        session: Conversation the question belongs to
+
+    Returns:
+        Response dictionary with the SQL, first page of results, row count, notes, answer
+        and the request's timing breakdown
+    """
+    session.start_request()
+    trace = start_trace(session.session_id, user_query)
+    try:
+        with trace.stage("generate_sql"):
+            sql_query = generate_sql_query(user_query, session)
+        cached = cached_first_page(sql_query, session)
+        decision = cached[0] if cached else guard_sql_query(sql_query, session)
+        with trace.stage("execute_sql"):
+            if cached:
+                _, df_page, row_count = cached
+            elif decision.action == "reject":
+                df_page, row_count = pd.DataFrame(), RowCount(0, True)
+            else:
+                df_page, row_count = execute_sql_page(decision.page_sql, session, pool_name=decision.pool)
+        response = _build_response(session, sql_query, decision, df_page, row_count)
+        with trace.stage("refine_answer"):
+            if decision.action == "reject":
+                answer = _rejected_answer(decision)
+            else:
+                answer = refine_answer(user_query, sql_query, df_page.head(5), session, total_count=row_count.total)
+        _finish_response(session, user_query, response, answer)
+    except Exception:
+        trace.finish("error")
+        raise
+    response["timings"] = trace.finish()
+    return response
+
+async def astream_query(user_query: str, session: ConversationSession):
+    """
+    Async pipeline that yields events as each stage completes: a "response"
+    event with the SQL and first page of results, "token" events while the
+    answer is generated, and a final "done" event with the full answer and
+    the request's timing breakdown.
+    Database work runs on worker threads so the event loop is never blocked.
+
+    Args:
+        user_query: The natural language question from the user
+        session: Conversation the question belongs to
+    """
+    session.start_request()
+    trace = start_trace(session.session_id, user_query)
+    try:
+        with trace.stage("generate_sql"):
+            sql_query = await agenerate_sql_query(user_query, session)
+        cached = await asyncio.to_thread(cached_first_page, sql_query, session)
+        decision = cached[0] if cached else await asyncio.to_thread(guard_sql_query, sql_query, session)
+        with trace.stage("execute_sql"):
+            if cached:
+                _, df_page, row_count = cached
+            elif decision.action == "reject":
+                df_page, row_count = pd.DataFrame(), RowCount(0, True)
+            else:
+                df_page, row_count = await asyncio.to_thread(execute_sql_page, decision.page_sql, session,
+                                                             0, True, decision.pool)
+        response = _build_response(session, sql_query, decision, df_page, row_count)
+        yield {"event": "response", "response": response}
+
+        with trace.stage("refine_answer"):
+            if decision.action == "reject":
+                answer = _rejected_answer(decision)
+            else:
+                # Only the first 5 rows are sent to the LLM
+                parts = []
+                tokens = await arefine_answer(user_query, sql_query, df_page.head(5), session, stream=True,
+                                              total_count=row_count.total)
+                async for token in tokens:
+                    parts.append(token)
+                    yield {"event": "token", "text": token}
+                answer = "".join(parts).strip()
+        _finish_response(session, user_query, response, answer)
+    except Exception:
+        trace.finish("error")
+        raise
+    response["timings"] = trace.finish()
+    yield {"event": "done", "answer": answer, "answer_note": response["answer_note"],
+           "timings": response["timings"]}
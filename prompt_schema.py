@@ -0,0 +1,280 @@
+import os
+import re
+import json
+from collections import namedtuple
+from functools import lru_cache
+from schema import COLUMN_DEFINITIONS, SAMPLE_DATA
+from column_profile import current_snapshot, column_kind
+
+# tiktoken is optional; without it token counts are estimated from text length
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# ------------------- Prompt Schema Configuration -------------------
+# Set SCHEMA_PRUNING=0 to always send the full (compact) schema
+SCHEMA_PRUNING = os.getenv("SCHEMA_PRUNING", "1") != "0"
+# Maximum sample values sent per column
+SAMPLE_LIMIT = int(os.getenv("SCHEMA_SAMPLE_LIMIT", "10"))
+# Model name used to pick the tokenizer for prompt size reporting
+TOKENIZER_MODEL = os.getenv("SCHEMA_TOKENIZER_MODEL", "gpt-4o")
+
+# Columns always sent because answers and follow-ups rely on them
+CORE_COLUMNS = [
+    "recipient_name", "recipient_uei", "naics", "naics_description", "awarding_agency_name",
+    "total_obligation", "date_signed", "active_task_order",
+]
+
+# Question words that refer to a column without naming it
+COLUMN_SYNONYMS = {
+    "agency": ["awarding_agency_name", "awarding_sub_agency_name"],
+    "department": ["awarding_agency_name"],
+    "dept": ["awarding_agency_name"],
+    "dod": ["awarding_agency_name", "awarding_sub_agency_name"],
+    "office": ["awarding_agency_office_name"],
+    "vendor": ["recipient_name", "recipient_uei"],
+    "contractor": ["recipient_name", "recipient_uei"],
+    "company": ["recipient_name", "recipient_uei"],
+    "recipient": ["recipient_name", "recipient_uei"],
+    "awardee": ["recipient_name", "recipient_uei"],
+    "parent": ["parent_recipient_name", "recipient_parent_uei"],
+    "value": ["total_obligation", "base_and_all_options"],
+    "worth": ["total_obligation", "base_and_all_options"],
+    "amount": ["total_obligation"],
+    "dollar": ["total_obligation"],
+    "spend": ["total_obligation"],
+    "spending": ["total_obligation"],
+    "obligated": ["total_obligation"],
+    "ceiling": ["base_and_all_options"],
+    "option": ["base_and_all_options", "base_exercised_options"],
+    "active": ["active_task_order", "end_date"],
+    "expired": ["active_task_order", "end_date"],
+    "industry": ["naics", "naics_description"],
+    "sector": ["naics", "naics_description"],
+    "psc": ["product_or_service_code", "product_or_service_code_description"],
+    "product": ["product_or_service_code", "product_or_service_code_description"],
+    "service": ["product_or_service_code", "product_or_service_code_description"],
+    "state": ["state_code", "state_name"],
+    "city": ["primary_place_of_performance_city_name"],
+    "country": ["country_code", "country_name"],
+    "small": ["type_of_set_aside", "contracting_offivers_determination_of_business_size"],
+    "business": ["type_of_set_aside", "contracting_offivers_determination_of_business_size"],
+    "veteran": ["type_of_set_aside"],
+    "hubzone": ["type_of_set_aside"],
+    "8a": ["type_of_set_aside"],
+    "year": ["date_signed"],
+    "signed": ["date_signed"],
+    "awarded": ["date_signed"],
+    "recent": ["date_signed"],
+    "latest": ["date_signed"],
+    "start": ["start_date"],
+    "end": ["end_date"],
+    "expire": ["end_date", "active_task_order"],
+    "competed": ["extent_competed", "extent_compete_description"],
+    "competition": ["extent_competed", "extent_compete_description"],
+    "offer": ["number_of_offers_received"],
+    "bid": ["number_of_offers_received"],
+    "pricing": ["type_of_contract_pricing", "type_of_contract_pricing_code"],
+    "type": ["type_description"],
+    "program": ["program_acronym", "dod_acquisition_program_description"],
+    "title": ["description"],
+    "about": ["description"],
+    "related": ["description", "naics_description"],
+}
+
+# Common words ignored when matching question text against column metadata
+STOPWORDS = {
+    "the", "and", "for", "from", "with", "that", "this", "what", "which", "who", "how", "many",
+    "much", "show", "list", "give", "all", "are", "was", "were", "there", "have", "has", "any",
+    "those", "these", "them", "their", "more", "than", "most", "top", "total", "number", "count",
+    "contract", "award", "task", "order", "details", "detail", "info", "information", "name",
+    "code", "per", "each", "into", "over", "under", "between", "about", "last", "first",
+    "of", "or", "by", "in", "to", "on", "at", "me", "is", "be", "it", "an", "as", "do", "did",
+}
+
+SchemaContext = namedtuple("SchemaContext", ["schema", "samples", "columns", "pruned", "tokens"])
+
+
+def _tokens(text: str) -> set:
+    """Lowercase word tokens with simple plural stripping, excluding stopwords."""
+    words = set()
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if len(word) >= 2 and word not in STOPWORDS:
+            words.add(word)
+    return words
+
+
+# ------------------- Precompiled Schema Payloads -------------------
+# Column metadata is tokenized once at import instead of on every request
+_COLUMN_NAME_TOKENS = {col: _tokens(col.replace("_", " ")) for col in COLUMN_DEFINITIONS}
+
+# Sample values (tokenized) and column statistics for one profile snapshot
+# (version 0 is the hand-written SAMPLE_DATA), with the full rendered payload
+SamplePayload = namedtuple("SamplePayload", ["version", "values", "stats", "full", "full_tokens"])
+_sample_payload = None
+
+
+def compact_schema(columns) -> str:
+    """Renders column definitions one per line, without JSON indentation."""
+    return "\n".join(f"{col}: {COLUMN_DEFINITIONS[col]}" for col in columns)
+
+
+def _profile_samples(snapshot):
+    """
+    Picks what the prompt shows per column from a profile snapshot: the most
+    common values of text columns (with the distinct count when there are more),
+    and the range of number and date columns, whose common values say little.
+    """
+    values, stats = {}, {}
+    for col, profile in snapshot.columns.items():
+        if column_kind(col) != "text" and profile.min is not None:
+            stats[col] = {"min": profile.min, "max": profile.max}
+            continue
+        if profile.values:
+            values[col] = profile.values
+        if profile.distinct > len(profile.values):
+            stats[col] = {"distinct": profile.distinct}
+    return values, stats
+
+
+def sample_payload() -> SamplePayload:
+    """
+    Returns the sample payload for the current profile snapshot, building it
+    once per snapshot version. Until a snapshot exists SAMPLE_DATA is used.
+    """
+    global _sample_payload
+    snapshot = current_snapshot()
+    version = snapshot.version if snapshot else 0
+    payload = _sample_payload
+    if payload is None or payload.version != version:
+        values, stats = _profile_samples(snapshot) if snapshot else (SAMPLE_DATA, {})
+        payload = SamplePayload(version, {col: [(value, _tokens(str(value))) for value in col_values]
+                                          for col, col_values in values.items()}, stats, None, None)
+        full = _render_samples(payload, COLUMN_DEFINITIONS)
+        payload = payload._replace(full=full, full_tokens=count_tokens(FULL_SCHEMA) + count_tokens(full))
+        _sample_payload = payload
+    return payload
+
+
+def _render_samples(payload: SamplePayload, columns, question_tokens=frozenset(), limit=SAMPLE_LIMIT) -> str:
+    samples = {}
+    for col in columns:
+        values = payload.values.get(col, [])
+        matching = [value for value, tokens in values if tokens & question_tokens]
+        others = [value for value, tokens in values if not tokens & question_tokens]
+        shown = (matching + others)[:limit]
+        if col in payload.stats:
+            samples[col] = dict(payload.stats[col], **({"top": shown} if shown else {}))
+        elif shown:
+            samples[col] = shown
+    return json.dumps(samples, separators=(",", ":"), default=str)
+
+
+def compact_samples(columns, question_tokens=frozenset(), limit=SAMPLE_LIMIT) -> str:
+    """
+    Renders sample values for the given columns as compact JSON. Values that
+    share words with the question are listed first, and each column is capped
+    at `limit` values. With a profile snapshot, text columns also report their
+    distinct count and number and date columns their range.
+    """
+    return _render_samples(sample_payload(), columns, question_tokens, limit)
+
+
+FULL_SCHEMA = compact_schema(COLUMN_DEFINITIONS)
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Encodings are downloaded on first use; fall back to estimates when offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Counts prompt tokens with tiktoken, or estimates roughly 4 characters per token."""
+    encoder = _encoder()
+    if encoder is None:
+        return len(text) // 4
+    return len(encoder.encode(text))
+
+
+@lru_cache(maxsize=1)
+def baseline_tokens() -> int:
+    """Tokens used by the original indented JSON schema and sample payload."""
+    return (count_tokens(json.dumps(COLUMN_DEFINITIONS, indent=2))
+            + count_tokens(json.dumps(SAMPLE_DATA, indent=2)))
+
+
+def full_compact_tokens() -> int:
+    """Tokens used by the full compact schema and sample payload."""
+    return sample_payload().full_tokens
+
+
+# ------------------- Column Relevance Selection -------------------
+def select_columns(question: str, context_text: str = "") -> list:
+    """
+    Picks the columns relevant to a question by matching its words against
+    column names, synonyms and sample values. Columns referenced in the
+    conversation context (e.g. the previous SQL query) are always included.
+
+    Args:
+        question: The user's question
+        context_text: Additional prompt context such as the previous SQL
+
+    Returns:
+        Relevant column names in schema order, or an empty list when nothing matched
+    """
+    question_tokens = _tokens(question)
+    selected = set()
+    for col, name_tokens in _COLUMN_NAME_TOKENS.items():
+        if name_tokens & question_tokens:
+            selected.add(col)
+    for word in question_tokens:
+        selected.update(COLUMN_SYNONYMS.get(word, []))
+    for col, values in sample_payload().values.items():
+        if any(tokens & question_tokens for _, tokens in values):
+            selected.add(col)
+    if context_text:
+        lowered = context_text.lower()
+        selected.update(col for col in COLUMN_DEFINITIONS if col in lowered)
+    if not selected:
+        return []
+    selected.update(CORE_COLUMNS)
+    return [col for col in COLUMN_DEFINITIONS if col in selected]
+
+
+def build_schema_context(question: str, context_text: str = "") -> SchemaContext:
+    """
+    Builds the schema and sample payload for the SQL generation prompt.
+    Only relevant columns are sent when pruning is enabled and the selector
+    finds a match; otherwise the full compact schema is used.
+
+    Args:
+        question: The user's question
+        context_text: Additional prompt context such as the previous SQL
+
+    Returns:
+        SchemaContext with schema text, sample text, selected columns,
+        whether pruning was applied, and token counts before and after
+    """
+    columns = select_columns(question, context_text) if SCHEMA_PRUNING else []
+    if columns:
+        schema = compact_schema(columns)
+        samples = compact_samples(columns, _tokens(question))
+        tokens = count_tokens(schema) + count_tokens(samples)
+    else:
+        columns = list(COLUMN_DEFINITIONS)
+        schema, samples = FULL_SCHEMA, sample_payload().full
+        tokens = full_compact_tokens()
+    token_report = {"baseline": baseline_tokens(), "sent": tokens, "profile_version": sample_payload().version}
+    return SchemaContext(schema, samples, columns, len(columns) < len(COLUMN_DEFINITIONS), token_report)
@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ------------------- SQL Cache Configuration -------------------
+# Backend is "memory" (per process) or "sqlite" (a file shared by all workers)
+SQL_CACHE_CONFIG = {
+    "backend": os.getenv("SQL_CACHE_BACKEND", "memory"),
+    "path": os.getenv("SQL_CACHE_PATH", ".cache/sql_cache.sqlite3"),
+    "max_entries": int(os.getenv("SQL_CACHE_MAX_ENTRIES", "1000")),
+    "ttl_seconds": float(os.getenv("SQL_CACHE_TTL", "3600")),
+}
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalizes a natural language question so trivially different phrasings
+    (case, spacing, trailing punctuation) share a cache entry.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        Lowercased question with collapsed whitespace and no trailing punctuation
+    """
+    normalized = re.sub(r"\s+", " ", question.strip().lower())
+    return normalized.rstrip(" ?.!")
+
+
+def make_cache_key(question: str, where_clause=None, is_list_request=False, entity_context="",
+                   results_count=None, known_values="", partition_context="", profile_version=0) -> str:
+    """
+    Builds a cache key from the normalized question and the conversation context
+    that is injected into the SQL generation prompt.
+
+    Args:
+        question: The user's question
+        where_clause: WHERE clause reused from the previous query, if any
+        is_list_request: Whether the question asks to list previous results
+        entity_context: Previously mentioned entities passed to the prompt
+        results_count: Previous result count, only relevant for list requests
+        known_values: Stored spellings resolved for names in the question
+        partition_context: Partition pruning guidance given for the question
+        profile_version: Column profile snapshot whose sample values the prompt shows
+
+    Returns:
+        Hex digest identifying the prompt inputs
+    """
+    payload = {
+        "question": normalize_question(question),
+        "where": where_clause or "",
+        "list": bool(is_list_request),
+        "entities": entity_context or "",
+        "count": results_count if is_list_request else None,
+        "values": known_values or "",
+        "partitions": partition_context or "",
+        "profile": profile_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# ------------------- Cache Backends -------------------
+class MemoryBackend:
+    """In-process LRU store with TTL expiry."""
+    def __init__(self, max_entries=1000, ttl_seconds=3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    LRU store with TTL expiry kept in a SQLite file, so every worker process
+    on the host shares the same entries.
+    """
+    def __init__(self, path, max_entries=1000, ttl_seconds=3600.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sql_cache ("
+                         "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                         "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sql_cache_accessed ON sql_cache (accessed_at)")
+
+    def _conn(self):
+        # SQLite connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT value, stored_at FROM sql_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE sql_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO sql_cache (key, value, stored_at, accessed_at) "
+                         "VALUES (?, ?, ?, ?)", (key, value, now, now))
+            conn.execute("DELETE FROM sql_cache WHERE stored_at < ?", (now - self.ttl_seconds,))
+            # Evict least recently used entries beyond the size limit
+            conn.execute("DELETE FROM sql_cache WHERE key IN (SELECT key FROM sql_cache "
+                         "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sql_cache")
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+
+
+# ------------------- SQL Cache -------------------
+class SQLCache:
+    """
+    Cache of generated SQL keyed on the question and its prompt context.
+    Tracks hit and miss counts for reporting.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached SQL for a key, or None on a miss."""
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, sql_query):
+        self.backend.set(key, sql_query)
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def stats(self) -> dict:
+        """
+        Returns cache counters for monitoring.
+
+        Returns:
+            Dictionary with hits, misses, hit rate and current size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self.backend.size(),
+        }
+
+
+def create_backend(backend="memory", path=None, max_entries=1000, ttl_seconds=3600.0):
+    """
+    Creates a cache backend by name.
+
+    Args:
+        backend: "memory" or "sqlite"
+        path: SQLite file path, used by the sqlite backend only
+        max_entries: Maximum number of entries kept before LRU eviction
+        ttl_seconds: Age after which entries expire
+
+    Returns:
+        A backend instance implementing get/set/delete/clear/size
+    """
+    if backend == "memory":
+        return MemoryBackend(max_entries, ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteBackend(path, max_entries, ttl_seconds)
+    raise ValueError(f"Unknown SQL cache backend: {backend}")
+
+
+# Module state survives Streamlit reruns, so the cache is built once per process
+_sql_cache = None
+_sql_cache_lock = threading.Lock()
+
+
+def get_sql_cache() -> SQLCache:
+    """Returns the process-wide SQL cache, creating it on first use."""
+    global _sql_cache
+    if _sql_cache is None:
+        with _sql_cache_lock:
+            if _sql_cache is None:
+                _sql_cache = SQLCache(create_backend(**SQL_CACHE_CONFIG))
+    return _sql_cache
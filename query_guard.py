@@ -0,0 +1,96 @@
+import os
+import logging
+from collections import namedtuple
+from paging import explain_plan, is_select, paged_sql
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Guard Configuration -------------------
+GUARD_CONFIG = {
+    # Planner cost above which a query is refused outright
+    "reject_cost": float(os.getenv("GUARD_REJECT_COST", "50000000")),
+    # Planner cost above which a query runs on the low-priority background pool
+    "background_cost": float(os.getenv("GUARD_BACKGROUND_COST", "5000000")),
+    # Estimated row count above which a LIMIT is added to the query
+    "max_rows": int(os.getenv("GUARD_MAX_ROWS", "100000")),
+    # Row cap applied when a LIMIT is added
+    "limit_rows": int(os.getenv("GUARD_LIMIT_ROWS", "100000")),
+}
+
+# Outcome of the guard: "allow", "limit", "background" or "reject"; `pool` names the
+# connection pool the query should run on and `sql_query` is the (possibly rewritten) SQL.
+# `page_sql` is the same SQL without the guard's LIMIT: pages, counts and exports read it
+# so a limited query still reports its true total and downloads in full
+GuardDecision = namedtuple("GuardDecision", ["action", "sql_query", "pool", "reason", "plan", "page_sql"])
+
+
+def summarize_plan(plan: dict) -> dict:
+    """
+    Condenses an EXPLAIN (FORMAT JSON) plan into the figures the guard logs.
+
+    Args:
+        plan: The top "Plan" node
+
+    Returns:
+        Dictionary with the top node type, cost, rows, width and sequential scans
+    """
+    seq_scans = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Node Type") == "Seq Scan":
+            seq_scans.append(node.get("Relation Name"))
+        nodes.extend(node.get("Plans", []))
+    return {
+        "node": plan.get("Node Type"),
+        "total_cost": plan.get("Total Cost", 0.0),
+        "rows": int(plan.get("Plan Rows", 0)),
+        "width": plan.get("Plan Width", 0),
+        "seq_scans": seq_scans,
+    }
+
+
+def check_query(conn, sql_query: str, config: dict = None) -> GuardDecision:
+    """
+    Plans a query with EXPLAIN and decides how it may run. Queries expected to
+    return too many rows get a LIMIT and are re-planned; the (limited) plan's
+    cost then decides between running normally, routing to the background pool,
+    or rejecting the query. The LIMIT only bounds whole-result reads: the
+    decision's `page_sql` keeps the unlimited SQL for paging, counting and export.
+
+    Args:
+        conn: Open database connection used for EXPLAIN
+        sql_query: The generated SQL
+        config: Threshold overrides; defaults to GUARD_CONFIG
+
+    Returns:
+        GuardDecision describing the action, the SQL to run and its pool
+    """
+    config = config or GUARD_CONFIG
+    if not is_select(sql_query):
+        decision = GuardDecision("reject", sql_query, None, "Only SELECT queries can be executed", {}, sql_query)
+        logger.warning("Query guard: %s | %s", decision.reason, sql_query)
+        return decision
+
+    page_sql = sql_query
+    plan = summarize_plan(explain_plan(conn, sql_query))
+    action, reason = "allow", "Within cost and row thresholds"
+    if plan["rows"] > config["max_rows"]:
+        sql_query = paged_sql(sql_query, config["limit_rows"])
+        plan = summarize_plan(explain_plan(conn, sql_query))
+        action, reason = "limit", f"Estimated rows above {config['max_rows']:,}; limited to {config['limit_rows']:,}"
+    conn.rollback()
+
+    limit_reason = f"{reason}; " if action == "limit" else ""
+    if plan["total_cost"] > config["reject_cost"]:
+        action = "reject"
+        reason = f"{limit_reason}Estimated cost {plan['total_cost']:,.0f} above {config['reject_cost']:,.0f}"
+    elif plan["total_cost"] > config["background_cost"]:
+        action = "background"
+        reason = f"{limit_reason}Estimated cost {plan['total_cost']:,.0f} above {config['background_cost']:,.0f}"
+    pool = None if action == "reject" else ("background" if action == "background" else "default")
+    decision = GuardDecision(action, sql_query, pool, reason, plan, page_sql)
+
+    log = logger.warning if action != "allow" else logger.info
+    log("Query guard: %s (%s) | plan=%s | sql=%s", action, reason, plan, " ".join(sql_query.split()))
+    return decision
@@ -0,0 +1,148 @@
+import sys
+import time
+import inspect
+import logging
+import threading
+import importlib
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# ------------------- Resource Registry -------------------
+class ResourceRegistry:
+    """
+    Builds expensive shared objects (the LLM client, prompt templates, compiled
+    chains) once per process, on first use, and closes them in reverse build
+    order at shutdown. Factories import their heavy dependencies themselves,
+    so importing a module that registers a resource stays cheap. Build times
+    are kept to show what a cold start costs.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._resources = {}
+        self._order = []
+        self._build_ms = {}
+        self._teardowns = []
+        # Re-entrant: a factory may get the resources it is built from
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory, close=None):
+        """
+        Registers how to build a resource.
+
+        Args:
+            name: Resource name passed to get()
+            factory: Callable with no arguments building the resource
+            close: Optional callable receiving the resource at teardown; it may
+                return an awaitable, which close() hands back to the caller
+        """
+        with self._lock:
+            self._factories[name] = (factory, close)
+
+    def on_close(self, teardown):
+        """Registers a callable run at teardown, for singletons built outside the registry."""
+        with self._lock:
+            self._teardowns.append(teardown)
+
+    def get(self, name: str):
+        """Returns a resource, building it on first use."""
+        resource = self._resources.get(name, _MISSING)
+        if resource is not _MISSING:
+            return resource
+        with self._lock:
+            resource = self._resources.get(name, _MISSING)
+            if resource is not _MISSING:
+                return resource
+            if name not in self._factories:
+                raise KeyError(f"Unknown resource: {name}")
+            started = time.perf_counter()
+            resource = self._factories[name][0]()
+            self._build_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+            self._resources[name] = resource
+            self._order.append(name)
+            logger.info("Built resource %s in %.1f ms", name, self._build_ms[name])
+            return resource
+
+    def close(self) -> list:
+        """
+        Closes built resources in reverse build order, then runs teardown callables.
+
+        Returns:
+            Awaitables returned by closers of async resources, for the caller's event loop to await
+        """
+        with self._lock:
+            order, self._order = self._order, []
+            resources, self._resources = self._resources, {}
+            teardowns, self._teardowns = self._teardowns, []
+        pending = []
+        for name in reversed(order):
+            close = self._factories[name][1]
+            if close is None:
+                continue
+            try:
+                closing = close(resources[name])
+                if inspect.isawaitable(closing):
+                    pending.append(closing)
+            except Exception as e:
+                logger.warning("Closing resource %s failed: %s", name, e)
+        for teardown in reversed(teardowns):
+            try:
+                teardown()
+            except Exception as e:
+                logger.warning("Teardown %s failed: %s", getattr(teardown, "__name__", teardown), e)
+        return pending
+
+    def stats(self) -> dict:
+        """
+        Returns build details for monitoring.
+
+        Returns:
+            Dictionary with registered names and milliseconds spent building each built resource
+        """
+        with self._lock:
+            return {"registered": sorted(self._factories), "build_ms": dict(self._build_ms)}
+
+
+# Process-wide registry; module state survives Streamlit reruns and is shared by API requests
+registry = ResourceRegistry()
+
+
+def register_resource(name: str, factory, close=None):
+    registry.register(name, factory, close)
+
+
+def get_resource(name: str):
+    """Returns the named process-wide resource, building it on first use."""
+    return registry.get(name)
+
+
+def close_resources() -> list:
+    """
+    Closes every built resource and runs the registered teardowns.
+
+    Returns:
+        Awaitables of async closers still to be awaited
+    """
+    return registry.close()
+
+
+def main():
+    """Reports the cold-start cost: import time of the pipeline, then the build time of each resource."""
+    logging.basicConfig(level=logging.WARNING)
+    started = time.perf_counter()
+    importlib.import_module("pipeline")
+    import_ms = (time.perf_counter() - started) * 1000
+    print(f"import pipeline: {import_ms:.1f} ms ({len(sys.modules)} modules loaded)")
+    # Run as a script this module is __main__; the pipeline registered with the imported copy
+    shared = importlib.import_module("resources").registry
+    for name in shared.stats()["registered"]:
+        shared.get(name)
+    for name, ms in shared.stats()["build_ms"].items():
+        print(f"build {name}: {ms:.1f} ms")
+    shared.close()
+
+
+if __name__ == "__main__":
+    main()
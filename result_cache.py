@@ -0,0 +1,294 @@
+import io
+import os
+import re
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+from db import get_pool
+from schema import TABLE_NAME
+from rollups import rollup_version
+
+# pyarrow is optional; without it results are stored as pickled DataFrames
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Result Cache Configuration -------------------
+RESULT_CACHE_CONFIG = {
+    "max_bytes": int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    # Results larger than this share of the cap are never cached
+    "max_entry_fraction": float(os.getenv("RESULT_CACHE_MAX_ENTRY_FRACTION", "0.25")),
+    # Seconds between data-version checks against PostgreSQL
+    "version_check_interval": float(os.getenv("RESULT_CACHE_VERSION_INTERVAL", "10")),
+}
+
+# "stats" reads pg_stat_user_tables counters, "last_modified" reads max(last_modified_date)
+RESULT_CACHE_VERSION_SOURCE = os.getenv("RESULT_CACHE_VERSION_SOURCE", "stats")
+
+
+def canonicalize_sql(sql_query: str) -> str:
+    """
+    Reduces a SQL statement to a canonical form so formatting differences
+    (comments, whitespace, keyword case, trailing semicolons) do not produce
+    separate cache entries. String literals and quoted identifiers are kept verbatim.
+
+    Args:
+        sql_query: The SQL statement
+
+    Returns:
+        Canonical SQL text
+    """
+    # Split into quoted and unquoted parts so literals are left untouched
+    parts = re.split(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")", sql_query)
+    canonical = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            canonical.append(part)
+            continue
+        part = re.sub(r"--[^\n]*", " ", part)
+        part = re.sub(r"/\*.*?\*/", " ", part, flags=re.DOTALL)
+        part = re.sub(r"\s+", " ", part).lower()
+        part = re.sub(r"\s*([(),=<>+*/-])\s*", r"\1", part)
+        canonical.append(part)
+    return "".join(canonical).strip().rstrip(";").strip()
+
+
+def sql_fingerprint(sql_query: str) -> str:
+    """Returns a stable hash of the canonicalized SQL statement."""
+    return hashlib.sha256(canonicalize_sql(sql_query).encode("utf-8")).hexdigest()
+
+
+def is_cacheable(sql_query: str) -> bool:
+    """
+    Only read-only SELECT statements whose result depends on nothing but the
+    table's data are cached; random values and the current time change it.
+    """
+    canonical = canonicalize_sql(sql_query)
+    return canonical.startswith(("select", "with")) and not re.search(
+        r"\b(insert|update|delete|truncate|alter|drop|create|grant|nextval|random|clock_timestamp)\b"
+        r"|\b(now|current_date|current_time|current_timestamp|localtime|localtimestamp|statement_timestamp"
+        r"|transaction_timestamp|timeofday)\b|\bfor update\b",
+        canonical)
+
+
+def read_table_version(conn, table_name: str, source: str = "stats"):
+    """
+    Reads a cheap marker that changes whenever the table's data changes.
+    For tm_awards it includes the latest rollup refresh, since queries routed
+    to a rollup read the rollup rather than the table.
+
+    Args:
+        conn: Open database connection
+        table_name: Table whose version is read
+        source: "stats" for pg_stat_user_tables write counters,
+                "last_modified" for max(last_modified_date)
+
+    Returns:
+        Tuple identifying the current data version
+    """
+    with conn.cursor() as cur:
+        if source == "last_modified":
+            cur.execute(f"SELECT max(last_modified_date) FROM {table_name}")
+        else:
+            # Writes to a partitioned table are counted on its partitions, so the whole tree is summed
+            cur.execute("SELECT sum(n_tup_ins), sum(n_tup_upd), sum(n_tup_del), sum(n_live_tup), "
+                        "max(coalesce(last_autoanalyze, last_analyze)), count(*) "
+                        "FROM pg_stat_user_tables "
+                        "WHERE relid IN (SELECT relid FROM pg_partition_tree(to_regclass(%s)))", (table_name,))
+        row = cur.fetchone()
+        if row and table_name == TABLE_NAME:
+            row = tuple(row) + (rollup_version(cur),)
+    conn.rollback()
+    return tuple(str(value) for value in row) if row else None
+
+
+# ------------------- DataFrame Serialization -------------------
+def serialize_frame(df: pd.DataFrame) -> bytes:
+    """
+    Encodes a DataFrame in compact columnar form (compressed Arrow IPC) when
+    the optional pyarrow package is installed. Without pyarrow, or for column
+    types Arrow cannot represent, the DataFrame is pickled.
+    """
+    if pa is not None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = io.BytesIO()
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            return b"A" + sink.getvalue()
+        except (pa.ArrowException, TypeError, ValueError):
+            pass
+    return b"P" + pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def deserialize_frame(payload: bytes) -> pd.DataFrame:
+    """Decodes a DataFrame produced by serialize_frame()."""
+    if payload[:1] == b"A":
+        return pa.ipc.open_stream(payload[1:]).read_all().to_pandas()
+    return pickle.loads(payload[1:])
+
+
+# ------------------- Result Cache -------------------
+class ResultCache:
+    """
+    Size-bounded cache of query results keyed on the SQL fingerprint.
+    All entries are dropped when the table's data version changes.
+    """
+    def __init__(self, version_loader=None, max_bytes=256 * 1024 * 1024, max_entry_fraction=0.25,
+                 version_check_interval=10.0):
+        self.version_loader = version_loader
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self.version_check_interval = version_check_interval
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._version_checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _refresh_version(self) -> bool:
+        """
+        Checks the data version at most once per interval and clears stale entries.
+
+        Returns:
+            False when the version could not be read, in which case the cache
+            is bypassed rather than failing the query
+        """
+        if self.version_loader is None:
+            return True
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return True
+        try:
+            version = self.version_loader()
+        except Exception as e:
+            logger.warning("Result cache version check failed, bypassing the cache: %s", e)
+            return False
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+        return True
+
+    def get(self, sql_query: str):
+        """
+        Returns the cached result for a query, or None on a miss.
+
+        Args:
+            sql_query: The SQL statement about to be executed
+
+        Returns:
+            A fresh DataFrame copy of the cached result, or None (also when the
+            data version cannot be read)
+        """
+        if not is_cacheable(sql_query):
+            return None
+        if not self._refresh_version():
+            with self._lock:
+                self.misses += 1
+            return None
+        key = sql_fingerprint(sql_query)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return deserialize_frame(payload)
+
+    def put(self, sql_query: str, df: pd.DataFrame):
+        """
+        Stores a query result, evicting least recently used entries until the
+        cache fits within its memory cap. Oversized results are not cached,
+        and nothing is stored while the data version cannot be read.
+
+        Args:
+            sql_query: The SQL statement that produced the result
+            df: The result DataFrame
+        """
+        if not is_cacheable(sql_query):
+            return
+        payload = serialize_frame(df)
+        if len(payload) > self.max_entry_bytes:
+            return
+        if not self._refresh_version():
+            return
+        key = sql_fingerprint(sql_query)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Returns cache counters for monitoring.
+
+        Returns:
+            Dictionary with hits, misses, entry count, memory use and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "data_version": self._version,
+            }
+
+
+# Module state survives Streamlit reruns, so the cache is built once per process
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache(table_name: str) -> ResultCache:
+    """
+    Returns the process-wide result cache, creating it on first use with a
+    version loader that reads the table's data version through the shared pool.
+
+    Args:
+        table_name: Table whose changes invalidate cached results
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                def load_version():
+                    with get_pool().connection() as conn:
+                        return read_table_version(conn, table_name, RESULT_CACHE_VERSION_SOURCE)
+
+                _result_cache = ResultCache(load_version, **RESULT_CACHE_CONFIG)
+    return _result_cache
@@ -0,0 +1,521 @@
+import os
+import re
+import time
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from db import get_pool, create_index_concurrently
+from schema import TABLE_NAME
+from sql_ast import parse_select, render_select, mask_sql, output_name
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Rollup Configuration -------------------
+ROLLUP_CONFIG = {
+    # Set ROLLUP_ROUTING=0 to always query tm_awards directly
+    "routing": os.getenv("ROLLUP_ROUTING", "1") != "0",
+    # Rollups not refreshed within this many seconds are not used
+    "max_staleness": float(os.getenv("ROLLUP_MAX_STALENESS", "86400")),
+    # Seconds between reads of which rollups exist and how fresh they are
+    "state_interval": float(os.getenv("ROLLUP_STATE_INTERVAL", "60")),
+}
+
+ROLLUP_PREFIX = f"{TABLE_NAME}_rollup_"
+STATE_TABLE = f"{TABLE_NAME}_rollup_state"
+
+# Grouping columns of each rollup. Every rollup is also grouped by the calendar
+# and fiscal year of date_signed. The router picks the smallest built rollup
+# holding every column a query uses.
+ROLLUPS = {
+    "agency": ["awarding_agency_name", "awarding_sub_agency_name"],
+    "naics": ["naics", "naics_description"],
+    "set_aside": ["type_of_set_aside"],
+    "state": ["state_code"],
+    "agency_naics": ["awarding_agency_name", "naics", "naics_description"],
+    "agency_set_aside": ["awarding_agency_name", "type_of_set_aside"],
+    "agency_state": ["awarding_agency_name", "state_code"],
+}
+
+# Year columns computed from date_signed; US federal fiscal years start on October 1
+TIME_DIMENSIONS = {
+    "signed_year": "EXTRACT(YEAR FROM date_signed::date)::int",
+    "fiscal_year": "EXTRACT(YEAR FROM date_signed::date + INTERVAL '3 months')::int",
+}
+
+# Dollar columns summarized by every rollup
+MEASURES = ["total_obligation", "base_and_all_options"]
+
+# Words that may appear in a routable query besides rollup columns and output names
+SQL_WORDS = {
+    "and", "or", "not", "in", "is", "null", "like", "ilike", "similar", "to", "between", "as", "asc", "desc",
+    "nulls", "first", "last", "true", "false", "distinct", "case", "when", "then", "else", "end", "coalesce",
+    "nullif", "round", "lower", "upper", "trim", "abs", "cast", "numeric", "int", "integer", "bigint", "text",
+    "float", "real", "double", "precision", "varchar", "any", "array", "sum", "min", "max", "count",
+}
+
+RoutedQuery = namedtuple("RoutedQuery", ["sql", "rollup"])
+
+_AGGREGATE = re.compile(r"\b(count|sum|avg|min|max)\s*\(\s*(distinct\s+)?(\*|1|[a-z_][a-z0-9_]*)\s*"
+                        r"(?:::\s*[a-z]+(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?)?\s*\)", re.IGNORECASE)
+_DATE_LITERAL = r"(?:DATE\s+)?'(\d{4})-(\d{2})-(\d{2})'(?:::\s*(?:date|timestamp))?"
+_YEAR_OF_DATE = re.compile(r"(?:EXTRACT\s*\(\s*YEAR\s+FROM\s+date_signed\s*\)"
+                           r"|DATE_PART\s*\(\s*'year'\s*,\s*date_signed\s*\))", re.IGNORECASE)
+_DATE_COMPARISON = re.compile(rf"\bdate_signed\s*(>=|>|<=|<)\s*{_DATE_LITERAL}", re.IGNORECASE)
+_DATE_BETWEEN = re.compile(rf"\bdate_signed\s+BETWEEN\s+{_DATE_LITERAL}\s+AND\s+{_DATE_LITERAL}", re.IGNORECASE)
+
+
+def rollup_table(name: str) -> str:
+    return ROLLUP_PREFIX + name
+
+
+def rollup_columns(name: str) -> list:
+    """Grouping columns of a rollup, including the year columns."""
+    return ROLLUPS[name] + list(TIME_DIMENSIONS)
+
+
+def _all_dimensions() -> set:
+    return {column for columns in ROLLUPS.values() for column in columns} | set(TIME_DIMENSIONS)
+
+
+# ------------------- Query Routing -------------------
+def _year_bound(operator: str, year: int, month: int, day: int):
+    """Translates a date_signed bound on a year boundary to a year-column predicate, or None."""
+    if (month, day) == (1, 1) and operator in (">=", "<"):
+        return f"signed_year {operator} {year}"
+    if (month, day) == (12, 31) and operator in ("<=", ">"):
+        return f"signed_year {operator} {year}"
+    if (month, day) == (10, 1) and operator in (">=", "<"):
+        return f"fiscal_year {operator} {year + 1}"
+    if (month, day) == (9, 30) and operator in ("<=", ">"):
+        return f"fiscal_year {operator} {year}"
+    return None
+
+
+def _translate_dates(text: str) -> str:
+    """
+    Rewrites date_signed expressions that only depend on the year into the year
+    columns. Other uses of date_signed are left alone, so the query is not routed.
+    """
+    text = _YEAR_OF_DATE.sub("signed_year", text)
+
+    def between(match):
+        low = _year_bound(">=", int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        high = _year_bound("<=", int(match.group(4)), int(match.group(5)), int(match.group(6)))
+        if low and high and low.split()[0] == high.split()[0]:
+            return f"{low} AND {high}"
+        return match.group(0)
+
+    def comparison(match):
+        bound = _year_bound(match.group(1), int(match.group(2)), int(match.group(3)), int(match.group(4)))
+        return bound or match.group(0)
+
+    text = _DATE_BETWEEN.sub(between, text)
+    return _DATE_COMPARISON.sub(comparison, text)
+
+
+def _rollup_aggregate(match, dimensions: set):
+    """Returns the rollup expression for an aggregate over tm_awards rows, or None."""
+    function, distinct, argument = match.group(1).lower(), match.group(2), match.group(3).lower()
+    if distinct:
+        # Distinct grouping values are the same in the rollup
+        return f"COUNT(DISTINCT {argument})" if function == "count" and argument in dimensions else None
+    if function == "count":
+        if argument in ("*", "1"):
+            return "COALESCE(SUM(award_count), 0)::bigint"
+        if argument in MEASURES:
+            return f"COALESCE(SUM({argument}_count), 0)::bigint"
+        if argument in dimensions:
+            return f"COALESCE(SUM(CASE WHEN {argument} IS NOT NULL THEN award_count END), 0)::bigint"
+        return None
+    if argument in MEASURES:
+        if function == "avg":
+            return f"(SUM({argument}_sum) / NULLIF(SUM({argument}_count), 0))"
+        return f"{function.upper()}({argument}_{function})"
+    if function in ("min", "max") and argument in dimensions:
+        return f"{function.upper()}({argument})"
+    return None
+
+
+def _strip_literals(text: str) -> str:
+    return re.sub(r"'(?:[^']|'')*'", "''", text).replace('"', "")
+
+
+def route_query(sql_query: str, available: dict):
+    """
+    Rewrites an aggregate query over tm_awards to read a rollup instead, when
+    the rollup holds everything it needs: grouping and filter columns among the
+    rollup's columns (years of date_signed included), and aggregates that can be
+    recomputed from the rollup's counts, sums, minimums and maximums.
+
+    Args:
+        sql_query: Generated SQL
+        available: Built and fresh rollups, mapping name to row count
+
+    Returns:
+        RoutedQuery with the rewritten SQL and rollup name, or None
+    """
+    query = parse_select(sql_query)
+    if (query is None or query.distinct or query.from_clause.strip().lower() != TABLE_NAME
+            or not available):
+        return None
+    dimensions = _all_dimensions()
+    # Names given to projection items (ORDER BY and GROUP BY may refer to them); bare columns are not aliases
+    aliases = {output_name(column) for column in query.columns
+               if re.search(r"\bAS\s+\"?[a-z_]", column, re.IGNORECASE)}
+
+    placeholders = []
+    # Grouping columns read inside rewritten aggregates, which the placeholders hide
+    aggregated = set()
+
+    def rewrite(text):
+        if not text:
+            return text, True
+        ok = True
+
+        def aggregate(match):
+            nonlocal ok
+            replacement = _rollup_aggregate(match, dimensions)
+            if replacement is None:
+                ok = False
+                return match.group(0)
+            placeholders.append(replacement)
+            aggregated.add(match.group(3).lower())
+            return f"__rollup_{len(placeholders) - 1}__"
+
+        text = _AGGREGATE.sub(aggregate, _translate_dates(text))
+        return text, ok
+
+    parts = {}
+    for name in ("columns", "group_by", "order_by"):
+        items = []
+        for item in getattr(query, name):
+            rewritten, ok = rewrite(item)
+            if not ok:
+                return None
+            items.append(rewritten)
+        parts[name] = items
+    for name in ("where", "having"):
+        rewritten, ok = rewrite(getattr(query, name))
+        if not ok:
+            return None
+        parts[name] = rewritten
+
+    # Only rollup columns, output names and SQL keywords may remain
+    text = " ".join(parts["columns"] + parts["group_by"] + parts["order_by"]
+                    + [parts["where"] or "", parts["having"] or ""])
+    identifiers = set(re.findall(r"\b[a-z_][a-z0-9_]*\b", _strip_literals(text).lower()))
+    identifiers = {word for word in identifiers if not re.fullmatch(r"__rollup_\d+__", word)}
+    used = (identifiers | aggregated) & dimensions
+    if identifiers - dimensions - aliases - SQL_WORDS:
+        return None
+    if not placeholders and not query.group_by:
+        # Row-level queries cannot be answered from a rollup
+        return None
+
+    # The smallest rollup holding every column used
+    candidates = [name for name in available if name in ROLLUPS and used <= set(rollup_columns(name))]
+    if not candidates:
+        return None
+    rollup = min(candidates, key=lambda name: available[name])
+
+    def restore(text):
+        return re.sub(r"__rollup_(\d+)__", lambda m: placeholders[int(m.group(1))], text) if text else text
+
+    columns = []
+    for original, item in zip(query.columns, parts["columns"]):
+        item = restore(item).strip()
+        # Keep the result's column names: an unnamed function call is named after the function
+        if output_name(original) == original.strip().lower():
+            function = re.fullmatch(r"\s*([a-z_]+)\s*\(\s*\)\s*", mask_sql(original), re.IGNORECASE)
+            if function:
+                item = f"{item} AS {function.group(1).lower()}"
+        columns.append(item)
+    routed = query._replace(columns=tuple(columns), from_clause=rollup_table(rollup),
+                            where=restore(parts["where"]), having=restore(parts["having"]),
+                            group_by=tuple(restore(item).strip() for item in parts["group_by"]),
+                            order_by=tuple(restore(item).strip() for item in parts["order_by"]))
+    return RoutedQuery(render_select(routed), rollup)
+
+
+class RollupRouter:
+    """
+    Routes queries to the rollups that are built and fresh. Which rollups exist
+    is read from the state table at most every state_interval seconds.
+    """
+    def __init__(self, config: dict = None):
+        self.config = config or ROLLUP_CONFIG
+        self._available = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.routed = 0
+
+    def available(self) -> dict:
+        """Returns fresh rollups as {name: row count}, re-reading the state table when due."""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.config["state_interval"]:
+                self._checked_at = now
+                self._available = self._load_available()
+            return self._available
+
+    def _load_available(self) -> dict:
+        try:
+            with get_pool().connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (STATE_TABLE,))
+                if not cur.fetchone()[0]:
+                    return {}
+                cur.execute(f"SELECT name, row_count FROM {STATE_TABLE} "
+                            f"WHERE refreshed_at > now() - make_interval(secs => %s)",
+                            (self.config["max_staleness"],))
+                return {name: row_count for name, row_count in cur.fetchall()}
+        except Exception as e:
+            logger.warning("Could not read rollup state: %s", e)
+            return {}
+
+    def route(self, sql_query: str):
+        """Returns a RoutedQuery reading a rollup, or None to query tm_awards directly."""
+        if not self.config["routing"]:
+            return None
+        routed = route_query(sql_query, self.available())
+        if routed is not None:
+            self.routed += 1
+        return routed
+
+    def stats(self) -> dict:
+        return {"routed": self.routed, "available": dict(self._available)}
+
+
+# Module state survives Streamlit reruns, so the router is built once per process
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_rollup_router() -> RollupRouter:
+    """Returns the process-wide rollup router, creating it on first use."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = RollupRouter()
+    return _router
+
+
+# ------------------- Building and Refreshing -------------------
+def rollup_select(name: str, source: str = TABLE_NAME, join: str = "") -> str:
+    """SELECT computing a rollup's rows from tm_awards (optionally joined to restrict its groups)."""
+    keys = [f"t.{column}" for column in ROLLUPS[name]] + [expr.replace("date_signed", "t.date_signed")
+                                                          for expr in TIME_DIMENSIONS.values()]
+    select = [f"t.{column}" for column in ROLLUPS[name]]
+    select += [f"{expr.replace('date_signed', 't.date_signed')} AS {column}" for column, expr in TIME_DIMENSIONS.items()]
+    select.append("COUNT(*) AS award_count")
+    for measure in MEASURES:
+        select += [f"SUM(t.{measure}) AS {measure}_sum", f"COUNT(t.{measure}) AS {measure}_count",
+                   f"MIN(t.{measure}) AS {measure}_min", f"MAX(t.{measure}) AS {measure}_max"]
+    return f"SELECT {', '.join(select)} FROM {source} t {join} GROUP BY {', '.join(keys)}"
+
+
+def _null_safe_key(alias: str, column: str, expression: str = None) -> str:
+    # Text keys compare NULLs as equal and still allow a hash join
+    return f"COALESCE(({expression or f'{alias}.{column}'})::text, '')"
+
+
+def ensure_state_table(cur):
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+                "name text PRIMARY KEY, dimensions text NOT NULL, watermark text, row_count bigint, "
+                "built_at timestamptz, refreshed_at timestamptz)")
+
+
+def rollup_version(cur):
+    """
+    Time of the latest rollup build or refresh, or None before any rollup
+    exists. Results answered from a rollup change when it does, so this is
+    part of the data version the result and export caches key on.
+    """
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (STATE_TABLE,))
+    if not cur.fetchone()[0]:
+        return None
+    cur.execute(f"SELECT max(refreshed_at)::text FROM {STATE_TABLE}")
+    return cur.fetchone()[0]
+
+
+def _save_state(cur, name: str, watermark, built: bool):
+    table = rollup_table(name)
+    cur.execute(f"SELECT count(*) FROM {table}")
+    row_count = cur.fetchone()[0]
+    cur.execute(f"INSERT INTO {STATE_TABLE} (name, dimensions, watermark, row_count, built_at, refreshed_at) "
+                "VALUES (%s, %s, %s, %s, now(), now()) "
+                "ON CONFLICT (name) DO UPDATE SET dimensions = EXCLUDED.dimensions, watermark = EXCLUDED.watermark, "
+                "row_count = EXCLUDED.row_count, refreshed_at = EXCLUDED.refreshed_at"
+                + (", built_at = EXCLUDED.built_at" if built else ""),
+                (name, ",".join(ROLLUPS[name]), watermark, row_count))
+    return row_count
+
+
+def build_rollup(conn, name: str) -> dict:
+    """
+    Builds a rollup from scratch into a new table and swaps it in, so readers
+    never see a partial rollup.
+
+    Args:
+        conn: Database connection (committed on success)
+        name: Rollup name from ROLLUPS
+
+    Returns:
+        Dictionary with the rollup name, mode, row count and seconds taken
+    """
+    started = time.perf_counter()
+    table = rollup_table(name)
+    with conn.cursor() as cur:
+        # Builds scan all of tm_awards; the pool's statement timeout is meant for interactive queries
+        cur.execute("SET LOCAL statement_timeout = 0")
+        ensure_state_table(cur)
+        # Rows changed after this point are picked up by the next incremental refresh
+        cur.execute(f"SELECT max(last_modified_date)::text FROM {TABLE_NAME}")
+        watermark = cur.fetchone()[0]
+        cur.execute(f"DROP TABLE IF EXISTS {table}__new")
+        cur.execute(f"CREATE TABLE {table}__new AS {rollup_select(name)}")
+        cur.execute(f"CREATE INDEX ON {table}__new ({', '.join(rollup_columns(name))})")
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(f"ALTER TABLE {table}__new RENAME TO {table.split('.')[-1]}")
+        cur.execute(f"ANALYZE {table}")
+        row_count = _save_state(cur, name, watermark, built=True)
+    conn.commit()
+    return {"rollup": name, "mode": "build", "rows": row_count, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def refresh_rollup(conn, name: str) -> dict:
+    """
+    Brings a rollup up to date incrementally: every group containing a row with
+    last_modified_date on or after the rollup's watermark is recomputed from
+    tm_awards. last_modified_date is a date, so rows changed later on the
+    watermark day are only seen by including that day; recomputing a group
+    twice gives the same rows. Rollups never built (or built on an empty table) are built.
+    Rows deleted from tm_awards, or updated so that they move to another group,
+    leave their old group stale until the next full build.
+
+    Args:
+        conn: Database connection (committed on success)
+        name: Rollup name from ROLLUPS
+
+    Returns:
+        Dictionary with the rollup name, mode, groups recomputed, row count and seconds taken
+    """
+    started = time.perf_counter()
+    table = rollup_table(name)
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL statement_timeout = 0")
+        ensure_state_table(cur)
+        cur.execute(f"SELECT watermark FROM {STATE_TABLE} WHERE name = %s AND to_regclass(%s) IS NOT NULL",
+                    (name, table))
+        row = cur.fetchone()
+    if row is None or row[0] is None:
+        conn.commit()
+        return build_rollup(conn, name)
+
+    watermark = row[0]
+    columns = rollup_columns(name)
+    expressions = {**{column: f"t.{column}" for column in ROLLUPS[name]},
+                   **{column: expr.replace("date_signed", "t.date_signed") for column, expr in TIME_DIMENSIONS.items()}}
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT max(last_modified_date)::text FROM {TABLE_NAME}")
+        new_watermark = cur.fetchone()[0]
+        # Groups touched since the watermark
+        cur.execute("DROP TABLE IF EXISTS rollup_changed")
+        cur.execute(f"CREATE TEMP TABLE rollup_changed ON COMMIT DROP AS SELECT DISTINCT "
+                    + ", ".join(f"{_null_safe_key('t', column, expressions[column])} AS {column}" for column in columns)
+                    + f" FROM {TABLE_NAME} t WHERE t.last_modified_date >= %s", (watermark,))
+        groups = cur.rowcount
+        if groups:
+            matches = " AND ".join(f"{_null_safe_key('r', column)} = c.{column}" for column in columns)
+            cur.execute(f"DELETE FROM {table} r USING rollup_changed c WHERE {matches}")
+            join = "JOIN rollup_changed c ON " + " AND ".join(
+                f"{_null_safe_key('t', column, expressions[column])} = c.{column}" for column in columns)
+            cur.execute(f"INSERT INTO {table} {rollup_select(name, join=join)}")
+        row_count = _save_state(cur, name, new_watermark or watermark, built=False)
+    conn.commit()
+    return {"rollup": name, "mode": "refresh", "groups": groups, "rows": row_count,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def refresh_rollups(names=None, full: bool = False) -> list:
+    """
+    Builds or incrementally refreshes rollups, one transaction each.
+
+    Args:
+        names: Rollup names to process (all by default)
+        full: Rebuild from scratch instead of refreshing incrementally
+
+    Returns:
+        One report dictionary per rollup
+    """
+    reports = []
+    with get_pool().connection() as conn:
+        for name in names or ROLLUPS:
+            try:
+                reports.append(build_rollup(conn, name) if full else refresh_rollup(conn, name))
+            except Exception as e:
+                conn.rollback()
+                logger.exception("Rollup %s failed", name)
+                reports.append({"rollup": name, "error": str(e)})
+    return reports
+
+
+def create_watermark_index(conn) -> str:
+    """
+    Creates the last_modified_date index incremental refreshes look changed
+    rows up by. It is a one-time migration step: it is built with CREATE INDEX
+    CONCURRENTLY, so tm_awards stays writable (per partition when tm_awards is
+    partitioned), and an interrupted build is resumed.
+
+    Args:
+        conn: Database connection; switched to autocommit while the index is built
+
+    Returns:
+        "exists", "created" or "rebuilt"
+    """
+    conn.rollback()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET statement_timeout = 0")
+            status = create_index_concurrently(cur, f"{TABLE_NAME}_last_modified_idx", TABLE_NAME,
+                                               "(last_modified_date)")
+            cur.execute("RESET statement_timeout")
+    finally:
+        conn.autocommit = False
+    return status
+
+
+def rollup_status() -> list:
+    """Returns one dictionary per built rollup from the state table."""
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        ensure_state_table(cur)
+        cur.execute(f"SELECT name, dimensions, watermark, row_count, built_at, refreshed_at FROM {STATE_TABLE} "
+                    "ORDER BY name")
+        columns = [column[0] for column in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+        conn.commit()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the tm_awards aggregate rollups")
+    parser.add_argument("--full", action="store_true", help="rebuild from scratch instead of refreshing")
+    parser.add_argument("--only", nargs="+", choices=list(ROLLUPS), help="rollups to process (default: all)")
+    parser.add_argument("--status", action="store_true", help="print the built rollups and exit")
+    parser.add_argument("--create-index", action="store_true",
+                        help="create the last_modified_date index refreshes use (CONCURRENTLY) and exit")
+    args = parser.parse_args()
+    if args.create_index:
+        with get_pool().connection() as conn:
+            print(f"{TABLE_NAME}_last_modified_idx: {create_watermark_index(conn)}")
+        return
+    reports = rollup_status() if args.status else refresh_rollups(args.only, args.full)
+    for report in reports:
+        print(report)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from conversation_memory import ConversationMemory
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# ------------------- Session Store Configuration -------------------
+# Backend is "memory" (per process), "sqlite" (a file shared by workers on one host)
+# or "redis" (any Redis-protocol server, shared by workers on every host)
+SESSION_STORE_CONFIG = {
+    "backend": os.getenv("SESSION_STORE_BACKEND", "memory"),
+    "path": os.getenv("SESSION_STORE_PATH", ".cache/sessions.sqlite3"),
+    "url": os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0"),
+    # Most conversations kept; the least recently used is dropped beyond this
+    "max_sessions": int(os.getenv("SESSION_MAX_COUNT", "1000")),
+    # Conversations idle longer than this many seconds are dropped
+    "idle_ttl": float(os.getenv("SESSION_IDLE_TTL", "3600")),
+}
+
+# Per-session limits applied whenever a conversation is saved
+SESSION_LIMITS = {
+    "max_turns": int(os.getenv("SESSION_MAX_TURNS", "20")),
+    "max_entities": int(os.getenv("SESSION_MAX_ENTITIES", "50")),
+    "max_bytes": int(os.getenv("SESSION_MAX_BYTES", "262144")),
+}
+
+
+# ------------------- Store Backends -------------------
+class MemoryStateBackend:
+    """In-process LRU store of serialized sessions with idle expiry."""
+    def __init__(self, max_sessions=1000, idle_ttl=3600.0):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, session_id):
+        payload, _ = self._entries.pop(session_id)
+        self._bytes -= len(payload)
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            payload, accessed_at = entry
+            if time.time() - accessed_at > self.idle_ttl:
+                self._remove(session_id)
+                self.evictions += 1
+                return None
+            self._entries[session_id] = (payload, time.time())
+            self._entries.move_to_end(session_id)
+            return payload
+
+    def set(self, session_id, payload):
+        now = time.time()
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+            self._entries[session_id] = (payload, now)
+            self._bytes += len(payload)
+            # Drop idle sessions from the LRU end, then any beyond the session limit
+            while self._entries:
+                oldest_id, (_, accessed_at) = next(iter(self._entries.items()))
+                if now - accessed_at <= self.idle_ttl and len(self._entries) <= self.max_sessions:
+                    break
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def total_bytes(self) -> int:
+        return self._bytes
+
+
+class SQLiteStateBackend:
+    """
+    LRU store of serialized sessions with idle expiry kept in a SQLite file,
+    so every worker process on the host serves the same conversations.
+    """
+    def __init__(self, path, max_sessions=1000, idle_ttl=3600.0):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.evictions = 0
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                         "session_id TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                         "bytes INTEGER NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions (accessed_at)")
+
+    def _conn(self):
+        # SQLite connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT payload, accessed_at FROM sessions WHERE session_id = ?",
+                               (session_id,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.idle_ttl:
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self.evictions += 1
+                return None
+            conn.execute("UPDATE sessions SET accessed_at = ? WHERE session_id = ?", (now, session_id))
+            return row[0]
+
+    def set(self, session_id, payload):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (session_id, payload, bytes, accessed_at) "
+                         "VALUES (?, ?, ?, ?)", (session_id, payload, len(payload), now))
+            expired = conn.execute("DELETE FROM sessions WHERE accessed_at < ?", (now - self.idle_ttl,)).rowcount
+            # Evict least recently used sessions beyond the session limit
+            evicted = conn.execute("DELETE FROM sessions WHERE session_id IN (SELECT session_id FROM sessions "
+                                   "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_sessions,)).rowcount
+            self.evictions += expired + evicted
+
+    def delete(self, session_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions")
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def total_bytes(self) -> int:
+        return self._conn().execute("SELECT COALESCE(SUM(bytes), 0) FROM sessions").fetchone()[0]
+
+
+class RedisStateBackend:
+    """
+    Store of serialized sessions in a Redis-protocol server (Redis, Valkey or a
+    local stand-in), shared by worker processes on any host. Idle expiry uses
+    key TTLs, renewed on every read and write; the server's maxmemory policy
+    bounds the number of sessions.
+    """
+    KEY_PREFIX = "govsearch:session:"
+
+    def __init__(self, url, idle_ttl=3600.0):
+        if redis is None:
+            raise RuntimeError("The redis session store backend requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.idle_ttl = int(idle_ttl)
+        self.evictions = 0
+
+    def get(self, session_id):
+        key = self.KEY_PREFIX + session_id
+        payload = self.client.get(key)
+        if payload is None:
+            return None
+        self.client.expire(key, self.idle_ttl)
+        return payload.decode("utf-8")
+
+    def set(self, session_id, payload):
+        self.client.set(self.KEY_PREFIX + session_id, payload, ex=self.idle_ttl)
+
+    def delete(self, session_id):
+        self.client.delete(self.KEY_PREFIX + session_id)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.KEY_PREFIX + "*"):
+            self.client.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.KEY_PREFIX + "*"))
+
+    def total_bytes(self) -> int:
+        return sum(self.client.strlen(key) for key in self.client.scan_iter(match=self.KEY_PREFIX + "*"))
+
+
+# ------------------- Session Store -------------------
+class SessionStore:
+    """
+    Session-keyed store of conversation state. Sessions are serialized with
+    ConversationSession.to_state() and trimmed to the per-session limits on
+    every save, so no conversation grows without bound.
+    """
+    def __init__(self, backend, limits=None):
+        self.backend = backend
+        self.limits = limits or SESSION_LIMITS
+        self.trimmed = 0
+
+    def load(self, session_id, factory):
+        """
+        Returns the stored state for a session rebuilt with factory, or None.
+
+        Args:
+            session_id: The session identifier
+            factory: Callable building a session object from its state dict
+        """
+        payload = self.backend.get(session_id)
+        return factory(json.loads(payload)) if payload is not None else None
+
+    def save(self, session_id, state: dict) -> int:
+        """
+        Trims a session's state to the limits and stores it.
+
+        Args:
+            session_id: The session identifier
+            state: The session's state dict (modified in place when trimmed)
+
+        Returns:
+            Size of the stored state in bytes
+        """
+        payload = self._trimmed_payload(state)
+        self.backend.set(session_id, payload)
+        return len(payload)
+
+    def _trimmed_payload(self, state: dict) -> str:
+        """
+        Serializes a session within the limits. Turns over the limits are
+        folded into the memory's rolling summary rather than dropped, so the
+        conversation keeps the questions, filters and counts they held.
+        """
+        trimmed = False
+        memory = ConversationMemory.from_state(state["memory"]) if "memory" in state else None
+        if memory is not None and len(memory.turns) > self.limits["max_turns"]:
+            memory.fold_oldest(len(memory.turns) - self.limits["max_turns"])
+            state["memory"] = memory.to_state()
+            trimmed = True
+        entities = state.get("tracker", {}).get("entity_mentions", {})
+        while len(entities) > self.limits["max_entities"]:
+            entities.pop(next(iter(entities)))
+            trimmed = True
+        payload = json.dumps(state, default=str)
+        while len(payload) > self.limits["max_bytes"] and self._shrink(state, memory):
+            trimmed = True
+            payload = json.dumps(state, default=str)
+        self.trimmed += trimmed
+        return payload
+
+    @staticmethod
+    def _shrink(state: dict, memory) -> bool:
+        """
+        Removes the least useful remaining part of a session over its byte budget:
+        the oldest turn, then the oldest summary entry, the oldest tracked entity,
+        the last response and finally the rest of the tracker.
+
+        Returns:
+            False when only the session id is left
+        """
+        if memory is not None and (memory.fold_oldest(1) or memory.drop_summary_item()):
+            state["memory"] = memory.to_state()
+            return True
+        tracker = state.get("tracker") or {}
+        entities = tracker.get("entity_mentions")
+        if entities:
+            entities.pop(next(iter(entities)))
+            return True
+        if state.get("last_response") is not None:
+            # Paging and downloads then need the question asked again
+            state["last_response"] = None
+            return True
+        if tracker:
+            state["tracker"] = {}
+            return True
+        return False
+
+    def delete(self, session_id):
+        self.backend.delete(session_id)
+
+    def stats(self) -> dict:
+        """
+        Returns store counters for monitoring.
+
+        Returns:
+            Dictionary with session count, stored bytes, evictions and trims
+        """
+        return {
+            "backend": type(self.backend).__name__,
+            "sessions": self.backend.size(),
+            "bytes": self.backend.total_bytes(),
+            "evictions": self.backend.evictions,
+            "trimmed_saves": self.trimmed,
+        }
+
+
+def create_state_backend(backend="memory", path=None, url=None, max_sessions=1000, idle_ttl=3600.0):
+    """
+    Creates a session store backend by name.
+
+    Args:
+        backend: "memory", "sqlite" or "redis"
+        path: SQLite file path, used by the sqlite backend only
+        url: Server URL, used by the redis backend only
+        max_sessions: Maximum number of sessions kept before LRU eviction
+        idle_ttl: Seconds of inactivity after which a session is dropped
+
+    Returns:
+        A backend instance implementing get/set/delete/clear/size/total_bytes
+    """
+    if backend == "memory":
+        return MemoryStateBackend(max_sessions, idle_ttl)
+    if backend == "sqlite":
+        return SQLiteStateBackend(path, max_sessions, idle_ttl)
+    if backend == "redis":
+        return RedisStateBackend(url, idle_ttl)
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+
+# Module state survives Streamlit reruns, so the store is built once per process
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide session store, creating it on first use."""
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = SessionStore(create_state_backend(**SESSION_STORE_CONFIG))
+    return _session_store
@@ -0,0 +1,123 @@
+import os
+import asyncio
+import threading
+from instrumentation import COALESCED_CALLS
+
+# ------------------- Request Coalescing Configuration -------------------
+# Set COALESCE_REQUESTS=0 to run every LLM call and query independently
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "1") != "0"
+
+
+class _Call:
+    """An in-flight call shared by every thread asking for the same key."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent identical work: while a call for a key is running,
+    further callers with the same key wait for it and share its result (or its
+    exception) instead of starting their own. Nothing is kept once the call
+    finishes; repeated work over time is the caches' job.
+
+    do() is for worker threads, ado() for coroutines on the event loop.
+    """
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def _joined(self):
+        self.coalesced += 1
+        COALESCED_CALLS.inc(layer=self.name)
+
+    def do(self, key, fn):
+        """
+        Runs fn() unless an identical call is already in flight, then shares its outcome.
+
+        Args:
+            key: Hashable identity of the work
+            fn: Callable doing the work
+
+        Returns:
+            Tuple of (result, whether it was shared from another caller's call)
+        """
+        if not self.enabled:
+            return fn(), False
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self._joined()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key, factory):
+        """
+        Async version of do(). The work runs as its own task, so a caller that
+        disconnects does not cancel it for the others waiting on it.
+
+        Args:
+            key: Hashable identity of the work
+            factory: Callable returning the coroutine doing the work
+
+        Returns:
+            Tuple of (result, whether it was shared from another caller's call)
+        """
+        if not self.enabled:
+            return await factory(), False
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self._joined()
+        else:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Returns coalescing counters for monitoring.
+
+        Returns:
+            Dictionary with calls executed, calls that shared one, and calls in flight
+        """
+        with self._lock:
+            in_flight = len(self._calls) + len(self._tasks)
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": in_flight}
+
+
+# Process-wide flights for SQL generation (LLM) and query execution (database)
+LLM_FLIGHTS = SingleFlight("llm", COALESCE_REQUESTS)
+DB_FLIGHTS = SingleFlight("db", COALESCE_REQUESTS)
@@ -0,0 +1,210 @@
+import re
+from collections import namedtuple
+
+# ------------------- SQL Statement Structure -------------------
+# A single SELECT statement split into its top-level clauses. Expressions are
+# kept as SQL text; columns, GROUP BY and ORDER BY items are split on their
+# top-level commas. limit and offset are integers or None.
+SelectQuery = namedtuple("SelectQuery", ["distinct", "columns", "from_clause", "where", "group_by",
+                                         "having", "order_by", "limit", "offset"])
+
+# Top-level keywords that start a clause, in the order they must appear
+CLAUSE_KEYWORDS = [
+    ("from_clause", r"FROM"),
+    ("where", r"WHERE"),
+    ("group_by", r"GROUP\s+BY"),
+    ("having", r"HAVING"),
+    ("order_by", r"ORDER\s+BY"),
+    ("limit", r"LIMIT"),
+    ("offset", r"OFFSET"),
+]
+
+# Top-level keywords of statements this parser does not represent
+UNSUPPORTED_KEYWORDS = r"\b(?:UNION|INTERSECT|EXCEPT|WINDOW|FETCH|FOR\s+(?:UPDATE|SHARE)|INTO)\b"
+
+# Functions that make a projection an aggregate
+AGGREGATE_PATTERN = re.compile(r"\b(?:count|sum|avg|min|max|string_agg|array_agg|bool_and|bool_or|"
+                               r"stddev|variance|percentile_cont|percentile_disc)\s*\(", re.IGNORECASE)
+
+_COMMENT_PATTERN = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+_CLAUSE_PATTERN = re.compile(r"\b(?:" + "|".join(f"(?P<{name}>{keyword})" for name, keyword in CLAUSE_KEYWORDS)
+                             + r")\b", re.IGNORECASE)
+
+
+def mask_sql(sql: str) -> str:
+    """
+    Returns the SQL with comments, quoted strings and identifiers, and everything
+    inside parentheses replaced by spaces, keeping positions. Keyword searches on
+    the result only see the statement's top level.
+    """
+    masked = []
+    depth = 0
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = len(sql) if end == -1 else end
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = len(sql) if end == -1 else end + 2
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if char in ("'", '"'):
+            # Quotes are escaped by doubling them
+            end = i + 1
+            while end < len(sql):
+                if sql[end] == char:
+                    if sql[end + 1:end + 2] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            end = min(end + 1, len(sql))
+            masked.append(char + " " * (end - i - 2) + char if end - i >= 2 else " ")
+            i = end
+            continue
+        if char == "(":
+            depth += 1
+            masked.append("(" if depth == 1 else " ")
+        elif char == ")":
+            masked.append(")" if depth == 1 else " ")
+            depth = max(depth - 1, 0)
+        else:
+            masked.append(char if depth == 0 else " ")
+        i += 1
+    return "".join(masked)
+
+
+def strip_comments(sql: str) -> str:
+    """Replaces SQL comments with a space, leaving quoted text untouched."""
+    return _COMMENT_PATTERN.sub(lambda match: match.group(1) or " ", sql)
+
+
+def split_top_level(text: str, separator: str = ",") -> list:
+    """Splits SQL text on separators outside parentheses, strings and comments."""
+    masked = mask_sql(text)
+    parts, start = [], 0
+    for index, char in enumerate(masked):
+        if char == separator:
+            parts.append(text[start:index].strip())
+            start = index + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def parse_select(sql: str):
+    """
+    Parses a single SELECT statement into its clauses.
+
+    Args:
+        sql: The SQL statement
+
+    Returns:
+        SelectQuery, or None for statements it does not represent (CTEs, set
+        operations, SELECT INTO, FETCH clauses or anything that is not a SELECT)
+    """
+    # Comments are dropped so clauses can be re-rendered on one line
+    sql = strip_comments(sql).strip().rstrip(";").strip()
+    masked = mask_sql(sql)
+    head = re.match(r"\s*SELECT\b(\s+DISTINCT\b)?", masked, re.IGNORECASE)
+    if head is None or ";" in masked or re.search(UNSUPPORTED_KEYWORDS, masked, re.IGNORECASE):
+        return None
+
+    # Locate each clause keyword at the top level; they must appear in order, at most once
+    clauses = {}
+    positions = []
+    order = [name for name, _ in CLAUSE_KEYWORDS]
+    for match in _CLAUSE_PATTERN.finditer(masked, head.end()):
+        name = match.lastgroup
+        if positions and order.index(name) <= order.index(positions[-1][0]):
+            return None
+        positions.append((name, match.start(), match.end()))
+    if not positions or positions[0][0] != "from_clause":
+        return None
+    select_text = sql[head.end():positions[0][1]].strip()
+    for index, (name, _, body_start) in enumerate(positions):
+        body_end = positions[index + 1][1] if index + 1 < len(positions) else len(sql)
+        clauses[name] = sql[body_start:body_end].strip()
+
+    limit = offset = None
+    for name in ("limit", "offset"):
+        if name in clauses:
+            value = re.fullmatch(r"(\d+)(?:\s+ROWS?)?", clauses[name], re.IGNORECASE)
+            if value is None:
+                return None
+            if name == "limit":
+                limit = int(value.group(1))
+            else:
+                offset = int(value.group(1))
+
+    return SelectQuery(
+        distinct=head.group(1) is not None,
+        columns=tuple(split_top_level(select_text)),
+        from_clause=clauses["from_clause"],
+        where=clauses.get("where"),
+        group_by=tuple(split_top_level(clauses.get("group_by", ""))),
+        having=clauses.get("having"),
+        order_by=tuple(split_top_level(clauses.get("order_by", ""))),
+        limit=limit,
+        offset=offset,
+    )
+
+
+def render_select(query: SelectQuery) -> str:
+    """Renders a SelectQuery back to a single-line SQL statement."""
+    parts = ["SELECT DISTINCT" if query.distinct else "SELECT", ", ".join(query.columns),
+             "FROM", query.from_clause]
+    if query.where:
+        parts += ["WHERE", query.where]
+    if query.group_by:
+        parts += ["GROUP BY", ", ".join(query.group_by)]
+    if query.having:
+        parts += ["HAVING", query.having]
+    if query.order_by:
+        parts += ["ORDER BY", ", ".join(query.order_by)]
+    if query.limit is not None:
+        parts.append(f"LIMIT {query.limit}")
+    if query.offset:
+        parts.append(f"OFFSET {query.offset}")
+    return " ".join(parts)
+
+
+def output_name(column: str) -> str:
+    """
+    Returns the name a projection item appears under in the result: its alias,
+    or the bare column name for a (possibly qualified) column reference.
+    Returns the lowercased expression text for unnamed expressions.
+    """
+    masked = mask_sql(column)
+    alias = re.search(r"\bAS\s+(\"?)([A-Za-z_][\w$]*)\1\s*$", masked, re.IGNORECASE)
+    if alias:
+        return column[alias.start(2):alias.end(2)].lower()
+    reference = re.fullmatch(r'\s*(?:"?\w+"?\.)?"?([A-Za-z_][\w$]*)"?\s*', column)
+    if reference:
+        return reference.group(1).lower()
+    trailing = re.search(r"[\w)\"']\s+\"?([A-Za-z_][\w$]*)\"?\s*$", masked)
+    if trailing and not re.fullmatch(r"(?i)asc|desc|end|null", trailing.group(1)):
+        return column[trailing.start(1):trailing.end(1)].lower()
+    return column.strip().lower()
+
+
+def is_aggregate(query: SelectQuery) -> bool:
+    """Whether the query returns aggregated rows (GROUP BY, or aggregate functions in the projection)."""
+    if query.group_by:
+        return True
+    # Window functions keep one output row per input row
+    return any(AGGREGATE_PATTERN.search(column) and not re.search(r"\bOVER\b", mask_sql(column), re.IGNORECASE)
+               for column in query.columns)
+
+
+def base_table(query: SelectQuery):
+    """Returns the lowercased table name when the query reads from a single table, else None."""
+    match = re.fullmatch(r'\s*"?([A-Za-z_][\w$]*)"?(?:\s+(?:AS\s+)?"?[A-Za-z_][\w$]*"?)?\s*', query.from_clause,
+                         re.IGNORECASE)
+    return match.group(1).lower() if match else None
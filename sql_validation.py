@@ -0,0 +1,124 @@
+import os
+import re
+import difflib
+import logging
+from collections import namedtuple
+import psycopg2
+from schema import TABLE_NAME, COLUMN_DEFINITIONS
+from paging import explain_plan, is_select
+from sql_ast import strip_comments
+
+logger = logging.getLogger(__name__)
+
+# ------------------- Validation Configuration -------------------
+VALIDATION_CONFIG = {
+    # Set SQL_VALIDATION=0 to execute generated SQL unchecked
+    "enabled": os.getenv("SQL_VALIDATION", "1") != "0",
+    # LLM calls allowed to fix SQL that failed validation
+    "max_repairs": int(os.getenv("SQL_REPAIR_ATTEMPTS", "2")),
+    # SQL candidates generated concurrently for each question; the first valid one is used
+    "candidates": int(os.getenv("SQL_CANDIDATES", "1")),
+    # Temperature of the candidates after the first, so they differ from it
+    "candidate_temperature": float(os.getenv("SQL_CANDIDATE_TEMPERATURE", "0.7")),
+}
+
+# Outcome of validating SQL; the SQL is valid when errors is empty
+SqlCheck = namedtuple("SqlCheck", ["sql", "errors"])
+
+# Bare words that are not columns even though they look like identifiers
+SQL_VALUE_WORDS = {"current_date", "current_time", "current_timestamp", "localtime", "localtimestamp",
+                   "current_user", "session_user"}
+
+_IDENTIFIER = re.compile(r"(?<![\w.:$])(?:[a-z_][a-z0-9_]*\.)?\"?([a-z_][a-z0-9_]*)(?!\w)\"?(?!\s*\(|\s*\.)",
+                         re.IGNORECASE)
+_NAMED = re.compile(r"\bAS\s+\"?([a-z_][a-z0-9_]*)|\b([a-z_][a-z0-9_]*)\s+AS\s*\(", re.IGNORECASE)
+_TABLE = re.compile(r"\b(?:FROM|JOIN)\s+\"?([a-z_][a-z0-9_]*)\"?(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|GROUP|ORDER|"
+                    r"LIMIT|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|USING|HAVING|OFFSET)\b)([a-z_][a-z0-9_]*))?",
+                    re.IGNORECASE)
+# Aliases written without AS: a name after an expression, column or subquery, ending the item or clause
+_IMPLICIT_ALIAS = re.compile(r"((?<!\w)\w+|[\"')])\s+\"?([a-z_][a-z0-9_]*)\"?(?=\s*(?:[,)]|$|(?:FROM|WHERE|GROUP|ORDER|"
+                             r"HAVING|LIMIT|OFFSET|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|UNION)\b))", re.IGNORECASE)
+# Keywords a column reference can follow, so the word after them is not an alias
+ALIAS_PRECEDING_KEYWORDS = {"select", "distinct", "by", "on", "and", "or", "not", "where", "having", "when", "then",
+                            "else", "in", "is", "like", "ilike", "between", "as", "from", "join", "using", "case",
+                            "all", "any", "partition", "with", "limit", "offset"}
+_CAST_TYPE = re.compile(r"::\s*[a-z_][a-z0-9_ ]*(?:\([^)]*\))?", re.IGNORECASE)
+
+
+def unknown_columns(sql_query: str) -> list:
+    """
+    Finds column-like names in the SQL that are not tm_awards columns. A word
+    counts as column-like when it contains an underscore or is a near-miss
+    of a column name; plain words are left to the EXPLAIN check, as they are
+    more likely keywords than columns.
+
+    Args:
+        sql_query: Generated SQL
+
+    Returns:
+        List of error messages, with the closest column name when there is one
+    """
+    text = _CAST_TYPE.sub(" ", re.sub(r"'(?:[^']|'')*'", "''", strip_comments(sql_query)))
+    # Output names (with or without AS), CTE names, tables and table aliases are not columns
+    named = {name.lower() for pair in _NAMED.findall(text) for name in pair if name}
+    for table, alias in _TABLE.findall(text):
+        named.update({table.lower(), alias.lower()})
+    named.update(alias.lower() for preceding, alias in _IMPLICIT_ALIAS.findall(text)
+                 if preceding.lower() not in ALIAS_PRECEDING_KEYWORDS)
+    columns = list(COLUMN_DEFINITIONS)
+    errors = []
+    for word in dict.fromkeys(match.lower() for match in _IDENTIFIER.findall(text)):
+        if word in COLUMN_DEFINITIONS or word in named or word in SQL_VALUE_WORDS:
+            continue
+        close = difflib.get_close_matches(word, columns, n=1, cutoff=0.8)
+        if "_" not in word and not close:
+            continue
+        hint = f"; did you mean {close[0]}?" if close else ""
+        errors.append(f'column "{word}" is not a column of {TABLE_NAME}{hint}')
+    return errors
+
+
+def explain_errors(conn, sql_query: str) -> list:
+    """
+    Plans the SQL with EXPLAIN, which runs nothing, and returns the database's
+    error for SQL it cannot plan: syntax errors, unknown columns or functions,
+    and type errors such as STRING_AGG over an integer.
+
+    Args:
+        conn: Open database connection
+        sql_query: Generated SQL
+
+    Returns:
+        List holding the database error, or empty when the SQL can be planned
+    """
+    try:
+        explain_plan(conn, sql_query)
+        return []
+    except (psycopg2.ProgrammingError, psycopg2.DataError) as e:
+        message = (e.pgerror or str(e)).strip()
+        return [" ".join(line.strip() for line in message.splitlines() if line.strip())]
+    finally:
+        conn.rollback()
+
+
+def validate_sql(conn, sql_query: str) -> SqlCheck:
+    """
+    Checks generated SQL before it runs: it must be a single SELECT, name only
+    tm_awards columns, and be accepted by the planner. The EXPLAIN step is
+    skipped when the local checks already failed.
+
+    Args:
+        conn: Open database connection, or None to run only the local checks
+        sql_query: Generated SQL
+
+    Returns:
+        SqlCheck with the SQL and the errors found
+    """
+    if not is_select(sql_query):
+        return SqlCheck(sql_query, ["the response is not a single SELECT statement"])
+    errors = unknown_columns(sql_query)
+    if not errors and conn is not None:
+        errors = explain_errors(conn, sql_query)
+    if errors:
+        logger.info("Generated SQL failed validation: %s | %s", errors, " ".join(sql_query.split()))
+    return SqlCheck(sql_query, errors)
@@ -0,0 +1,51 @@
+import pandas as pd
+from answer_templates import bare_aggregate, template_answer
+
+
+def scalar(value, column="value"):
+    return pd.DataFrame({column: [value]})
+
+
+def test_bare_aggregates_are_recognised():
+    assert bare_aggregate("SELECT COUNT(*) FROM tm_awards") == ("count", None)
+    assert bare_aggregate("SELECT SUM(total_obligation) AS total FROM tm_awards") == ("sum", "total_obligation")
+    assert bare_aggregate("SELECT max(t.total_obligation) highest FROM tm_awards t") == ("max", "total_obligation")
+    assert bare_aggregate("SELECT COUNT(DISTINCT recipient_name) FROM tm_awards") == ("count", "recipient_name")
+
+
+def test_computed_projections_are_not_bare_aggregates():
+    for sql in ["SELECT SUM(total_obligation)/COUNT(*) AS avg_award FROM tm_awards",
+                "SELECT COUNT(*) FILTER (WHERE active_task_order <> 0)*100.0/COUNT(*) FROM tm_awards",
+                "SELECT MAX(total_obligation)-MIN(total_obligation) AS spread FROM tm_awards",
+                "SELECT COUNT(*), SUM(total_obligation) FROM tm_awards",
+                "WITH t AS (SELECT 1) SELECT COUNT(*) FROM t"]:
+        assert bare_aggregate(sql) is None, sql
+
+
+def test_count_and_sum_templates():
+    answer = template_answer("How many contracts?", "SELECT COUNT(*) FROM tm_awards", scalar(12))
+    assert answer.startswith("There are 12 contracts.")
+    answer = template_answer("Total obligations?", "SELECT SUM(total_obligation) AS total FROM tm_awards",
+                             scalar(1234.5))
+    assert answer.startswith("The total obligation is $1,234.50.")
+
+
+def test_computed_expressions_go_to_the_llm():
+    assert template_answer("Average award?", "SELECT SUM(total_obligation)/COUNT(*) FROM tm_awards",
+                           scalar(10.0)) is None
+    assert template_answer("What share of contracts are active?",
+                           "SELECT COUNT(*) FILTER (WHERE active_task_order <> 0)*100.0/COUNT(*) AS pct "
+                           "FROM tm_awards", scalar(37.5, "pct")) is None
+    assert template_answer("Range of obligations?",
+                           "SELECT MAX(total_obligation)-MIN(total_obligation) FROM tm_awards",
+                           scalar(99.0)) is None
+
+
+def test_empty_result_and_failed_query():
+    empty = pd.DataFrame()
+    answer = template_answer("contracts for ACME", "SELECT * FROM tm_awards WHERE recipient_name = 'ACME'", empty)
+    assert "filters may be too narrow" in answer
+    answer = template_answer("contracts for ACME", "SELECT * FROM tm_awards", empty,
+                             error="Database error: canceling statement due to statement timeout")
+    assert "filters may be too narrow" not in answer
+    assert "statement timeout" in answer
@@ -0,0 +1,55 @@
+from collections import namedtuple
+
+from copy_fetch import FETCH_CONFIG, fetch_frame
+
+Column = namedtuple("Column", ["name", "type_code"])
+
+
+class _NamedCursor:
+    """Stands in for a server-side cursor handing out its rows in fetchmany-sized chunks."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = None
+        self.fetches = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql_query):
+        self.sql_query = sql_query
+
+    def fetchmany(self, size):
+        self.description = [Column("recipient_name", 25), Column("total_obligation", 1700)]
+        self.fetches += 1
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        return chunk
+
+
+class _Connection:
+    def __init__(self, rows):
+        self.cursors = []
+        self.rows = rows
+
+    def cursor(self, name=None):
+        assert name, "the cursor engine must use a named (server-side) cursor"
+        self.cursors.append(_NamedCursor(self.rows))
+        return self.cursors[-1]
+
+
+def test_cursor_engine_reads_a_server_side_cursor_in_chunks():
+    conn = _Connection([(f"recipient {i}", float(i)) for i in range(5)])
+    df = fetch_frame(conn, "SELECT recipient_name, total_obligation FROM tm_awards;",
+                     dict(FETCH_CONFIG, engine="cursor", chunk_rows=2))
+    assert list(df["recipient_name"]) == [f"recipient {i}" for i in range(5)]
+    assert conn.cursors[0].fetches == 3
+    assert conn.cursors[0].sql_query == "SELECT recipient_name, total_obligation FROM tm_awards"
+
+
+def test_cursor_engine_keeps_the_columns_of_an_empty_result():
+    df = fetch_frame(_Connection([]), "SELECT recipient_name, total_obligation FROM tm_awards",
+                     dict(FETCH_CONFIG, engine="cursor"))
+    assert df.empty and list(df.columns) == ["recipient_name", "total_obligation"]
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+from db import ConnectionPool, PoolTimeout, create_index_concurrently
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(monkeypatch, connect, **kwargs):
+    monkeypatch.setattr(ConnectionPool, "_connect", lambda self: connect())
+    return ConnectionPool({}, **kwargs)
+
+
+def test_slow_connect_does_not_block_returns(monkeypatch):
+    release = threading.Event()
+
+    def connect():
+        if pool is not None:
+            release.wait(5)
+        return FakeConnection()
+
+    pool = None
+    pool = make_pool(monkeypatch, connect, min_size=1, max_size=2)
+    first = pool.getconn()
+    opener = threading.Thread(target=pool.getconn)
+    opener.start()
+    time.sleep(0.05)
+    # The second checkout is connecting; returning a connection must not wait on it
+    started = time.monotonic()
+    pool.putconn(first)
+    assert time.monotonic() - started < 1
+    assert pool.metrics()["connecting"] == 1
+    release.set()
+    opener.join(5)
+    assert pool.metrics()["in_use"] == 1
+
+
+def test_failed_connect_gives_the_slot_back(monkeypatch):
+    def connect():
+        raise psycopg2.OperationalError("connection refused")
+
+    pool = make_pool(monkeypatch, connect, min_size=0, max_size=1, checkout_timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+    assert pool.metrics()["connecting"] == 0
+
+
+def test_unhealthy_idle_connection_is_replaced(monkeypatch):
+    pool = make_pool(monkeypatch, FakeConnection, min_size=1, max_size=1, health_check_interval=0)
+    stale = pool.getconn()
+    pool.putconn(stale)
+    stale.broken = True
+    fresh = pool.getconn()
+    assert fresh is not stale and stale.closed
+    metrics = pool.metrics()
+    assert metrics["connections_discarded"] == 1 and metrics["connections_created"] == 2
+
+
+def test_checkout_times_out_when_pool_is_full(monkeypatch):
+    pool = make_pool(monkeypatch, FakeConnection, min_size=1, max_size=1, checkout_timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+
+class CatalogCursor:
+    """Answers the catalog queries of create_index_concurrently and records the DDL."""
+    def __init__(self, relkinds, partitions, indexes=None):
+        self.relkinds = relkinds
+        self.partitions = partitions
+        self.indexes = indexes or {}
+        self.ddl = []
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if "pg_index" in sql:
+            valid = self.indexes.get(params[0])
+            self.rows = [] if valid is None else [(valid,)]
+        elif "relkind" in sql:
+            self.rows = [(self.relkinds[params[0]],)] if params[0] in self.relkinds else []
+        elif "pg_inherits" in sql:
+            self.rows = [(name,) for name in self.partitions.get(params[0], [])]
+        else:
+            self.ddl.append(sql)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_index_on_plain_table_is_built_concurrently():
+    cur = CatalogCursor({"tm_awards": "r"}, {}, {"tm_awards_x_idx": False})
+    assert create_index_concurrently(cur, "tm_awards_x_idx", "tm_awards", "(x)") == "rebuilt"
+    assert cur.ddl == ["DROP INDEX CONCURRENTLY IF EXISTS tm_awards_x_idx",
+                       "CREATE INDEX CONCURRENTLY tm_awards_x_idx ON tm_awards (x)"]
+
+
+def test_index_on_partitioned_table_is_built_per_partition_and_attached():
+    cur = CatalogCursor({"tm_awards": "p", "tm_awards_fy2024": "r", "tm_awards_default": "r"},
+                        {"tm_awards": ["tm_awards_default", "tm_awards_fy2024"]},
+                        {"tm_awards_fy2024_x_idx": True})
+    assert create_index_concurrently(cur, "tm_awards_x_idx", "tm_awards", "(x)") == "created"
+    assert cur.ddl == [
+        "CREATE INDEX IF NOT EXISTS tm_awards_x_idx ON ONLY tm_awards (x)",
+        "CREATE INDEX CONCURRENTLY tm_awards_default_x_idx ON tm_awards_default (x)",
+        "ALTER INDEX tm_awards_x_idx ATTACH PARTITION tm_awards_default_x_idx",
+        "ALTER INDEX tm_awards_x_idx ATTACH PARTITION tm_awards_fy2024_x_idx",
+    ]
+    assert not any("CONCURRENTLY" in sql and "ON tm_awards " in sql for sql in cur.ddl)
@@ -0,0 +1,20 @@
+from entity_index import EntityIndex, canonical_name, sql_values
+
+
+def test_spellings_share_a_canonical_name():
+    assert canonical_name("HOMELAND SECURITY, DEPARTMENT OF") == "department of homeland security"
+    assert canonical_name("Department of Homeland Security") == "department of homeland security"
+    assert canonical_name("Dept. of Defense") == "department of defense"
+    assert canonical_name("ACME CORP, INC.") == canonical_name("Acme Corp LLC")
+
+
+def test_adding_a_name_twice_changes_nothing():
+    index = EntityIndex()
+    index.add("recipient_name", ["ACME CORP, INC."])
+    once = {name: {column: list(values) for column, values in entry.items()} for name, entry in index.entries.items()}
+    index.add("recipient_name", ["ACME CORP, INC."])
+    assert index.entries == once
+
+
+def test_sql_values_quotes_spellings():
+    assert sql_values("recipient_name", ["O'NEIL LLC"]) == "recipient_name = ANY(ARRAY['O''NEIL LLC'])"
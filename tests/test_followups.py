@@ -0,0 +1,45 @@
+from followups import rewrite_followup
+
+TOP_TEN = ("SELECT recipient_name, SUM(total_obligation) AS total FROM tm_awards "
+           "GROUP BY recipient_name ORDER BY total DESC LIMIT 10")
+
+
+def test_count_becomes_list_of_records():
+    followup = rewrite_followup("list those 12 contracts",
+                                "SELECT COUNT(*) FROM tm_awards WHERE awarding_agency_name = 'X'")
+    assert followup.kind == "list"
+    assert followup.sql.startswith("SELECT recipient_name, recipient_uei")
+    assert "WHERE awarding_agency_name = 'X'" in followup.sql
+
+
+def test_distinct_count_lists_distinct_values():
+    followup = rewrite_followup("list them", "SELECT COUNT(DISTINCT recipient_name) FROM tm_awards WHERE naics = 1")
+    assert followup.sql == ("SELECT DISTINCT recipient_name FROM tm_awards WHERE naics = 1 "
+                            "ORDER BY recipient_name")
+
+
+def test_resort_of_limited_result_keeps_the_same_rows():
+    followup = rewrite_followup("sort them by total ascending", TOP_TEN)
+    assert followup.sql == f"SELECT * FROM ({TOP_TEN}) AS previous ORDER BY total ASC"
+
+
+def test_resort_without_limit_replaces_order_by():
+    followup = rewrite_followup("sort them by amount, highest first",
+                                "SELECT recipient_name, total_obligation FROM tm_awards WHERE naics = 1")
+    assert followup.sql.endswith("WHERE naics = 1 ORDER BY total_obligation DESC NULLS LAST")
+
+
+def test_limit_narrows_but_never_widens_previous_limit():
+    assert rewrite_followup("just the first 3", TOP_TEN).sql.endswith("LIMIT 3")
+    assert rewrite_followup("just the first 20", TOP_TEN).sql.endswith("LIMIT 10")
+
+
+def test_show_all_drops_the_limit():
+    followup = rewrite_followup("show all of them", "SELECT recipient_name FROM tm_awards ORDER BY date_signed LIMIT 5")
+    assert followup.kind == "all"
+    assert followup.sql == "SELECT recipient_name FROM tm_awards ORDER BY date_signed"
+
+
+def test_new_conditions_need_the_llm():
+    assert rewrite_followup("only those from 2021", TOP_TEN) is None
+    assert rewrite_followup("list them", "WITH t AS (SELECT 1) SELECT COUNT(*) FROM t") is None
@@ -0,0 +1,66 @@
+from paging import count_sql, is_select, paged_sql
+from query_guard import check_query
+
+
+def test_selects_ctes_and_values_are_selects():
+    assert is_select("SELECT * FROM tm_awards")
+    assert is_select("  (SELECT 1)")
+    assert is_select("WITH t AS (SELECT recipient_name FROM tm_awards) SELECT * FROM t")
+    assert is_select("VALUES (1), (2)")
+
+
+def test_data_modifying_ctes_are_not_selects():
+    assert not is_select("WITH d AS (DELETE FROM tm_awards RETURNING *) SELECT count(*) FROM d")
+    assert not is_select("WITH u AS (UPDATE tm_awards SET total_obligation = 0 RETURNING 1) SELECT * FROM u")
+    assert not is_select("with i as (insert into tm_awards default values returning *) select * from i")
+    assert not is_select("SELECT * FROM tm_awards FOR UPDATE")
+    assert not is_select("DELETE FROM tm_awards")
+
+
+def test_keywords_in_strings_comments_and_names_are_ignored():
+    assert is_select("SELECT * FROM tm_awards WHERE description ILIKE '%delete%' -- update later")
+    assert is_select('SELECT last_update, "Insert Date" FROM tm_awards')
+
+
+def test_guard_rejects_data_modifying_cte_without_planning():
+    decision = check_query(None, "WITH d AS (DELETE FROM tm_awards RETURNING *) SELECT * FROM d")
+    assert decision.action == "reject" and decision.pool is None
+
+
+def test_wrapping_keeps_the_inner_limit():
+    assert paged_sql("SELECT * FROM tm_awards LIMIT 5;", 100, 200) == \
+        "SELECT * FROM (SELECT * FROM tm_awards LIMIT 5) AS page_q LIMIT 100 OFFSET 200"
+    assert count_sql("SELECT 1 ") == "SELECT count(*) FROM (SELECT 1) AS count_q"
+
+
+class _PlanConnection:
+    """Stands in for a connection whose EXPLAIN reports a fixed row estimate and cost."""
+
+    def __init__(self, rows, cost):
+        self.plan = [{"Plan": {"Node Type": "Seq Scan", "Plan Rows": rows, "Total Cost": cost}}]
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql_query):
+        pass
+
+    def fetchone(self):
+        return (self.plan,)
+
+    def rollback(self):
+        pass
+
+
+def test_limit_action_keeps_the_unlimited_sql_for_paging_and_export():
+    sql_query = "SELECT * FROM tm_awards"
+    decision = check_query(_PlanConnection(500000, 1000.0), sql_query)
+    assert decision.action == "limit"
+    assert decision.sql_query == paged_sql(sql_query, 100000)
+    assert decision.page_sql == sql_query
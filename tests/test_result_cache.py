@@ -0,0 +1,73 @@
+import pandas as pd
+
+from export import ExportCache
+from result_cache import ResultCache, canonicalize_sql, is_cacheable, sql_fingerprint
+
+
+def test_formatting_does_not_change_the_fingerprint():
+    first = "SELECT recipient_name, SUM(total_obligation)\nFROM tm_awards -- top vendors\nGROUP BY recipient_name;"
+    second = "select recipient_name,sum( total_obligation ) from tm_awards /* note */ group by recipient_name"
+    assert canonicalize_sql(first) == canonicalize_sql(second)
+    assert sql_fingerprint(first) == sql_fingerprint(second)
+
+
+def test_literals_and_quoted_identifiers_are_kept_verbatim():
+    canonical = canonicalize_sql("SELECT \"Total\" FROM tm_awards WHERE recipient_name = 'ACME  -- Corp'")
+    assert "\"Total\"" in canonical
+    assert "'ACME  -- Corp'" in canonical
+
+
+def test_only_read_only_selects_are_cacheable():
+    assert is_cacheable("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert not is_cacheable("DELETE FROM tm_awards")
+    assert not is_cacheable("SELECT random() FROM tm_awards")
+
+
+def test_time_dependent_selects_are_not_cached_or_reused_as_exports():
+    for sql_query in ("SELECT * FROM tm_awards WHERE end_date >= now()",
+                      "SELECT * FROM tm_awards WHERE end_date >= CURRENT_DATE - 30",
+                      "SELECT current_timestamp, count(*) FROM tm_awards",
+                      "SELECT LOCALTIMESTAMP",
+                      "SELECT statement_timestamp() FROM tm_awards"):
+        assert not is_cacheable(sql_query)
+        # Uncacheable exports get a fresh key each time, without reading the table version
+        assert ExportCache()._key(None, sql_query, "csv") != ExportCache()._key(None, sql_query, "csv")
+    assert is_cacheable("SELECT nowhere, current_dates FROM t")
+
+
+def test_failed_version_check_bypasses_the_cache():
+    def load_version():
+        raise ConnectionError("database unavailable")
+
+    cache = ResultCache(load_version, version_check_interval=0)
+    frame = pd.DataFrame({"total": [1]})
+    cache.put("SELECT 1 FROM tm_awards", frame)
+    assert cache.get("SELECT 1 FROM tm_awards") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["misses"] == 1
+
+
+def test_cache_is_cleared_when_the_version_changes():
+    versions = iter(["v1", "v1", "v2"])
+    cache = ResultCache(lambda: next(versions), version_check_interval=0)
+    cache.put("SELECT 1 FROM tm_awards", pd.DataFrame({"total": [1]}))
+    assert cache.get("SELECT 1 FROM tm_awards")["total"].tolist() == [1]
+    assert cache.get("SELECT 1 FROM tm_awards") is None
+
+
+def test_cached_first_page_skips_the_guard(monkeypatch):
+    import pipeline
+    from query_guard import GuardDecision
+
+    cache = ResultCache(lambda: "v1", version_check_interval=0)
+    monkeypatch.setattr(pipeline, "get_result_cache", lambda table_name: cache)
+    monkeypatch.setattr(pipeline, "GUARD_DECISIONS", pipeline.MemoryBackend())
+    sql_query = "SELECT state_code, count(*) FROM tm_awards GROUP BY state_code"
+    assert pipeline.cached_first_page(sql_query) is None
+
+    decision = GuardDecision("background", sql_query, "background", "Estimated cost above threshold", {}, sql_query)
+    pipeline.GUARD_DECISIONS.set(sql_fingerprint(sql_query), (decision, None))
+    assert pipeline.cached_first_page(sql_query) is None
+    cache.put(pipeline.paged_sql(sql_query, pipeline.PAGE_SIZE, 0), pd.DataFrame({"state_code": ["VA"], "count": [3]}))
+    cached_decision, df_page, row_count = pipeline.cached_first_page(sql_query)
+    assert cached_decision.pool == "background"
+    assert df_page["count"].tolist() == [3] and row_count.total == 1 and row_count.exact
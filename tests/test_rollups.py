@@ -0,0 +1,52 @@
+from rollups import route_query
+
+# Every rollup built, the smallest first
+AVAILABLE = {"set_aside": 10, "state": 50, "agency": 200, "agency_set_aside": 900, "agency_state": 3000,
+             "naics": 5000, "agency_naics": 40000}
+
+
+def test_year_ranges_are_translated_to_year_columns():
+    routed = route_query("SELECT state_code, SUM(total_obligation) AS total FROM tm_awards "
+                         "WHERE date_signed >= '2022-01-01' AND date_signed < '2023-01-01' "
+                         "GROUP BY state_code", AVAILABLE)
+    assert routed.rollup == "state"
+    assert "signed_year >= 2022 AND signed_year < 2023" in routed.sql
+    assert "SUM(total_obligation_sum)" in routed.sql
+
+    routed = route_query("SELECT COUNT(*) FROM tm_awards WHERE date_signed BETWEEN '2022-10-01' AND '2023-09-30'",
+                         AVAILABLE)
+    assert "fiscal_year >= 2023 AND fiscal_year <= 2023" in routed.sql
+
+
+def test_dates_off_year_boundaries_are_not_routed():
+    assert route_query("SELECT COUNT(*) FROM tm_awards WHERE date_signed >= '2022-03-15'", AVAILABLE) is None
+
+
+def test_columns_inside_each_aggregate_pick_the_rollup():
+    for aggregate, expected in (
+            ("COUNT(DISTINCT awarding_agency_name)", "COUNT(DISTINCT awarding_agency_name)"),
+            ("COUNT(awarding_agency_name)",
+             "COALESCE(SUM(CASE WHEN awarding_agency_name IS NOT NULL THEN award_count END), 0)::bigint"),
+            ("MIN(awarding_agency_name)", "MIN(awarding_agency_name)"),
+            ("MAX(awarding_agency_name)", "MAX(awarding_agency_name)")):
+        routed = route_query(f"SELECT type_of_set_aside, {aggregate} FROM tm_awards GROUP BY type_of_set_aside",
+                             AVAILABLE)
+        assert routed.rollup == "agency_set_aside"
+        assert expected in routed.sql
+
+    routed = route_query("SELECT COUNT(DISTINCT awarding_agency_name) FROM tm_awards", AVAILABLE)
+    assert routed.rollup == "agency"
+
+
+def test_measures_are_recomputed_from_rollup_sums():
+    routed = route_query("SELECT AVG(total_obligation), COUNT(*), MAX(base_and_all_options) FROM tm_awards "
+                         "WHERE state_code = 'VA'", AVAILABLE)
+    assert routed.rollup == "state"
+    assert "(SUM(total_obligation_sum) / NULLIF(SUM(total_obligation_count), 0)) AS avg" in routed.sql
+    assert "COALESCE(SUM(award_count), 0)::bigint AS count" in routed.sql
+    assert "MAX(base_and_all_options_max) AS max" in routed.sql
+
+
+def test_row_level_and_unknown_columns_are_not_routed():
+    assert route_query("SELECT state_code FROM tm_awards", AVAILABLE) is None
+    assert route_query("SELECT COUNT(DISTINCT recipient_name) FROM tm_awards", AVAILABLE) is None
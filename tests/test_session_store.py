@@ -0,0 +1,53 @@
+import json
+
+from conversation_memory import ConversationMemory
+from session_store import MemoryStateBackend, SessionStore
+
+
+def session_state(turns: int) -> dict:
+    memory = ConversationMemory({"token_budget": 10 ** 6, "message_max_tokens": 200, "summary_max_items": 5})
+    for i in range(turns):
+        memory.add_exchange(f"question {i}", f"answer {i}", where_clause=f"naics = '{i}'", results_count=i)
+    return {"memory": memory.to_state(), "tracker": {"entity_mentions": {}}}
+
+
+def test_turns_over_the_limit_are_folded_into_the_summary():
+    store = SessionStore(MemoryStateBackend(), {"max_turns": 3, "max_entities": 50, "max_bytes": 10 ** 6})
+    store.save("s", session_state(5))
+    memory = json.loads(store.backend.get("s"))["memory"]
+    assert [turn["user"] for turn in memory["turns"]] == ["question 2", "question 3", "question 4"]
+    assert memory["summary"]["turns"] == 2
+    assert memory["summary"]["questions"] == ["question 0", "question 1"]
+    assert memory["summary"]["filters"] == ["naics = '0'", "naics = '1'"]
+    assert store.stats()["trimmed_saves"] == 1
+
+
+def test_sessions_over_the_byte_budget_keep_a_summary():
+    state = session_state(4)
+    budget = len(json.dumps(state)) - 1
+    store = SessionStore(MemoryStateBackend(), {"max_turns": 20, "max_entities": 50, "max_bytes": budget})
+    size = store.save("s", state)
+    memory = json.loads(store.backend.get("s"))["memory"]
+    assert size <= budget
+    assert memory["summary"]["turns"] >= 1
+    assert memory["summary"]["questions"][0] == "question 0"
+
+
+def test_summary_keeps_the_most_recent_entity_types():
+    memory = ConversationMemory({"token_budget": 10 ** 6, "message_max_tokens": 200, "summary_max_items": 2})
+    for entities in ({"agency": 3}, {"contract": 10}, {"recipient": 4}, {"contract": 7}):
+        memory.add_exchange("question", "answer", entities=entities)
+    memory.fold_oldest(4)
+    assert memory.summary["entities"] == {"recipient": 4, "contract": 7}
+
+
+def test_sessions_without_turns_left_shrink_their_summary():
+    state = session_state(6)
+    store = SessionStore(MemoryStateBackend(), {"max_turns": 20, "max_entities": 50, "max_bytes": 10 ** 6})
+    budget = store.save("s", state) // 3
+    store.limits["max_bytes"] = budget
+    size = store.save("s", session_state(6))
+    memory = json.loads(store.backend.get("s"))["memory"]
+    assert size <= budget
+    assert not memory["turns"] and memory["summary"]["turns"] == 6
+    assert len(memory["summary"]["questions"]) < 5
@@ -0,0 +1,48 @@
+from sql_ast import (base_table, is_aggregate, mask_sql, output_name, parse_select, render_select,
+                     split_top_level)
+
+
+def test_clauses_are_split_and_rendered_back():
+    query = parse_select("SELECT DISTINCT recipient_name, SUM(total_obligation) AS spend FROM tm_awards "
+                         "WHERE naics = '541511' GROUP BY recipient_name HAVING SUM(total_obligation) > 0 "
+                         "ORDER BY spend DESC LIMIT 10 OFFSET 20;")
+    assert query.distinct
+    assert query.columns == ("recipient_name", "SUM(total_obligation) AS spend")
+    assert query.where == "naics = '541511'"
+    assert query.group_by == ("recipient_name",)
+    assert query.order_by == ("spend DESC",)
+    assert (query.limit, query.offset) == (10, 20)
+    assert parse_select(render_select(query)) == query
+
+
+def test_keywords_inside_strings_subqueries_and_comments_are_not_clauses():
+    query = parse_select("SELECT * FROM (SELECT naics FROM tm_awards ORDER BY naics) AS s -- LIMIT 5\n"
+                         "WHERE description ILIKE '%order by%'")
+    assert query.from_clause == "(SELECT naics FROM tm_awards ORDER BY naics) AS s"
+    assert query.order_by == () and query.limit is None
+
+
+def test_unsupported_statements_are_not_parsed():
+    assert parse_select("WITH t AS (SELECT 1) SELECT * FROM t") is None
+    assert parse_select("SELECT naics FROM tm_awards UNION SELECT naics FROM tm_awards") is None
+    assert parse_select("SELECT 1; DELETE FROM tm_awards") is None
+    assert parse_select("SELECT naics FROM tm_awards LIMIT ALL") is None
+
+
+def test_output_names():
+    assert output_name("SUM(total_obligation) AS Spend") == "spend"
+    assert output_name("t.recipient_name") == "recipient_name"
+    assert output_name("COUNT(*) awards") == "awards"
+    assert output_name("total_obligation DESC") == "total_obligation desc"
+
+
+def test_aggregates_and_base_table():
+    assert is_aggregate(parse_select("SELECT COUNT(*) FROM tm_awards"))
+    assert not is_aggregate(parse_select("SELECT SUM(total_obligation) OVER () FROM tm_awards"))
+    assert base_table(parse_select("SELECT * FROM tm_awards AS t")) == "tm_awards"
+    assert base_table(parse_select("SELECT * FROM tm_awards JOIN other USING (id)")) is None
+
+
+def test_masking_and_splitting_respect_nesting():
+    assert mask_sql("a('x, y') -- z") == "a('    ')     "
+    assert split_top_level("a, f(b, c), 'd, e'") == ["a", "f(b, c)", "'d, e'"]
@@ -0,0 +1,43 @@
+from sql_validation import unknown_columns, validate_sql
+
+
+def test_misspelled_column_gets_a_suggestion():
+    errors = unknown_columns("SELECT DISTINCT recipent_name FROM tm_awards")
+    assert errors == ['column "recipent_name" is not a column of tm_awards; did you mean recipient_name?']
+
+
+def test_aliases_with_and_without_as_are_not_columns():
+    assert unknown_columns("SELECT recipient_name, SUM(total_obligation) AS total_spend FROM tm_awards "
+                           "GROUP BY recipient_name ORDER BY total_spend DESC") == []
+    assert unknown_columns("SELECT recipient_name, SUM(total_obligation) total_spend FROM tm_awards "
+                           "GROUP BY recipient_name ORDER BY total_spend DESC") == []
+    assert unknown_columns("SELECT COUNT(*) award_count FROM tm_awards") == []
+
+
+def test_subquery_and_table_aliases_are_not_columns():
+    sql_query = ("SELECT sub_totals.recipient_name, sub_totals.spend FROM (SELECT recipient_name, "
+                 "SUM(total_obligation) spend FROM tm_awards GROUP BY recipient_name) sub_totals "
+                 "JOIN tm_awards award_rows ON award_rows.recipient_name = sub_totals.recipient_name")
+    assert unknown_columns(sql_query) == []
+
+
+def test_cte_names_are_not_columns():
+    sql_query = ("WITH agency_totals AS (SELECT awarding_agency_name, SUM(total_obligation) AS spend "
+                 "FROM tm_awards GROUP BY awarding_agency_name) SELECT * FROM agency_totals")
+    assert unknown_columns(sql_query) == []
+
+
+def test_columns_after_keywords_are_still_checked():
+    errors = unknown_columns("SELECT recipient_name FROM tm_awards WHERE total_obligation > 0 "
+                             "AND awarding_agncy_name ILIKE '%defense%'")
+    assert len(errors) == 1 and "awarding_agency_name" in errors[0]
+
+
+def test_strings_and_casts_are_ignored():
+    assert unknown_columns("SELECT STRING_AGG(naics::TEXT, ', ') FROM tm_awards "
+                           "WHERE recipient_name ILIKE '%some_vendor%'") == []
+
+
+def test_non_select_is_rejected_without_a_connection():
+    check = validate_sql(None, "DELETE FROM tm_awards")
+    assert check.errors == ["the response is not a single SELECT statement"]